@@ -1,3 +1,8 @@
+import operator
+
+from django.contrib.auth import get_backends
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
 from tastypie.authorization import DjangoAuthorization
 from tastypie.exceptions import Unauthorized
 
@@ -28,11 +33,26 @@ class GeoNodeAuthorization(DjangoAuthorization):
 
     def read_list(self, object_list, bundle):
         # this applies permissions preserving the queryset for future use (faceting)
-        for obj in object_list:
-            if not bundle.request.user.has_perm(perms[obj.class_name]['view'], obj):
-                object_list = object_list.exclude(id__exact=obj.id)
-        
-        return object_list
+        user = bundle.request.user
+        if user.is_active and user.is_superuser:
+            return object_list
+        backends = [b for b in get_backends() if hasattr(b, 'objects_with_perm_q')]
+        if not backends:
+            for obj in object_list:
+                if not user.has_perm(perms[obj.class_name]['view'], obj):
+                    object_list = object_list.exclude(id__exact=obj.id)
+            return object_list
+
+        filters = []
+        # the owners have all the permissions on their resources
+        if user.is_authenticated():
+            filters.append(Q(owner=user))
+        for class_name, class_perms in perms.items():
+            app_label = class_perms['view'].split('.')[0]
+            model = ContentType.objects.get_by_natural_key(app_label, class_name.lower()).model_class()
+            for backend in backends:
+                filters.append(backend.objects_with_perm_q(user, class_perms['view'], model))
+        return object_list.filter(reduce(operator.or_, filters))
 
     def read_detail(self, object_list, bundle):
         return bundle.request.user.has_perm(perms[bundle.obj.class_name]['view'], bundle.obj)
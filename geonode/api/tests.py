@@ -79,6 +79,25 @@ class PermissionsApiTests(ResourceTestCase):
         resp = self.api_client.get(self.list_url)
         self.assertEquals(len(self.deserialize(resp)['objects']), 8)
 
+    def test_layer_get_list_private_to_owner(self):
+        """
+        Test that the owner of a layer without any role sees it in the list,
+        as well as the layers that are readable by everybody
+        """
+        perm_spec = {"anonymous":"_none","authenticated":"_none","users":[]}
+        layer = Layer.objects.all()[0]
+        layer.owner = User.objects.get(username='bobby')
+        layer.save()
+        layer.set_permissions(perm_spec)
+        layer.get_user_levels().delete()
+
+        resp = self.api_client.get(self.list_url)
+        self.assertEquals(len(self.deserialize(resp)['objects']), 7)
+
+        self.api_client.client.login(username='bobby', password='bob')
+        resp = self.api_client.get(self.list_url)
+        self.assertEquals(len(self.deserialize(resp)['objects']), 8)
+
     def test_layer_get_detail_unauth_layer_not_public(self):
         """
         Test that layer detail gives 401 when not public and not logged in
@@ -0,0 +1,55 @@
+#########################################################################
+#
+# Copyright (C) 2012 OpenPlans
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import datetime
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from geonode.base.models import Thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Delete the thumbnails of no resource and the thumbnail files no thumbnail uses'
+    option_list = BaseCommand.option_list + (
+        make_option('--dry-run',
+            action='store_true',
+            dest='dry_run',
+            default=False,
+            help='Only report what would be deleted.'),
+        make_option('--chunk-size', dest="chunk_size", type="int", default=1000,
+            help="Number of thumbnails read or deleted at a time"),
+        make_option('--grace', dest="grace", type="int", default=60,
+            help="Keep the unused files modified less than this many minutes ago"),
+        )
+
+    def handle(self, **options):
+        verbosity = int(options.get('verbosity'))
+        dry_run = options.get('dry_run')
+        rows, files = Thumbnail.objects.collect_garbage(
+            chunk_size=options.get('chunk_size'),
+            grace=datetime.timedelta(minutes=options.get('grace')),
+            dry_run=dry_run)
+        if verbosity > 1:
+            for name in files:
+                print "%s %s" % ('Would delete' if dry_run else 'Deleted', name)
+        if verbosity > 0:
+            print "%s %d orphan thumbnails and %d files" % (
+                'Would delete' if dry_run else 'Deleted', rows, len(files))
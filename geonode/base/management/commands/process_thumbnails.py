@@ -0,0 +1,88 @@
+#########################################################################
+#
+# Copyright (C) 2012 OpenPlans
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import time
+import datetime
+import threading
+from optparse import make_option
+from multiprocessing.pool import ThreadPool
+
+from django.core.management.base import BaseCommand
+from django.db import close_connection
+
+from geonode.base.models import ThumbnailJob
+
+
+def _run(job):
+    try:
+        return job.run()
+    finally:
+        if threading.current_thread().name != 'MainThread':
+            # database connections are per thread, do not leak them
+            # from the worker threads of the pool.
+            close_connection()
+
+
+class Command(BaseCommand):
+    help = 'Render the pending thumbnails of the layers, maps and documents'
+    option_list = BaseCommand.option_list + (
+        make_option('--workers', dest="workers", type="int", default=2,
+            help="Number of thumbnails rendered at the same time"),
+        make_option('--loop',
+            action='store_true',
+            dest='loop',
+            default=False,
+            help='Keep waiting for new jobs instead of stopping when there are none left.'),
+        make_option('--interval', dest="interval", type="int", default=10,
+            help="With --loop, number of seconds to wait when there are no jobs"),
+        make_option('--stale', dest="stale", type="int", default=30,
+            help="Retry the jobs that have been running for more than this many minutes"),
+        )
+
+    def handle(self, **options):
+        workers = options.get('workers')
+        verbosity = int(options.get('verbosity'))
+        pool = ThreadPool(workers) if workers > 1 else None
+        done = failed = 0
+        try:
+            while True:
+                ThumbnailJob.objects.reset_stale(
+                    datetime.datetime.now() - datetime.timedelta(minutes=options.get('stale')))
+                jobs = ThumbnailJob.objects.claim(workers * 10)
+                if not jobs:
+                    if not options.get('loop'):
+                        break
+                    time.sleep(options.get('interval'))
+                    continue
+                results = pool.map(_run, jobs) if pool else map(_run, jobs)
+                for job, result in zip(jobs, results):
+                    if result:
+                        done += 1
+                    else:
+                        failed += 1
+                    if verbosity > 1:
+                        print "%s thumbnail of resource %s %s" % (
+                            'Rendered' if result else 'Could not render', job.resource_id, job.error or '')
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        if verbosity > 0:
+            print "%d thumbnails rendered, %d failed" % (done, failed)
@@ -1,7 +1,11 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import json
 import hashlib
 import logging
+from urlparse import urlparse, urljoin
+from collections import OrderedDict
+from cStringIO import StringIO
 
 from django.db import models
 from django.db.models import Q
@@ -9,6 +13,7 @@ from django.contrib.auth.models import User
 from django.utils.translation import ugettext_lazy as _
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from django.core.files.base import ContentFile
+from django.core.urlresolvers import reverse
 from django.conf import settings
 from django.contrib.staticfiles.templatetags import staticfiles
 
@@ -125,29 +130,167 @@ class RestrictionCodeType(models.Model):
         ordering = ("identifier",)
         verbose_name_plural = 'Metadata Restriction Code Types'
 
+THUMBNAIL_FORMATS = (('png', 'PNG'), ('webp', 'WEBP'))
+
+
+def thumbnail_variants(image):
+    """Returns the image, and its smaller versions of the THUMBNAIL_SIZES,
+       in the THUMBNAIL_FORMATS PIL can write. They are in a dict by size,
+       'original' for the image itself, then by format. Only the image
+       itself is returned if PIL is missing or cannot read it.
+    """
+    variants = {'original': {'png': image}}
+    try:
+        from PIL import Image
+        img = Image.open(StringIO(image))
+        img.load()
+    except (ImportError, IOError):
+        return variants
+    Image.init()
+    formats = [(ext, format) for ext, format in THUMBNAIL_FORMATS if format in Image.SAVE]
+    # the thumbnails of the map layers are palette images
+    img = img.convert('RGBA')
+
+    sizes = [('original', img.size)]
+    for width, height in getattr(settings, 'THUMBNAIL_SIZES', ()):
+        if width < img.size[0] and height < img.size[1]:
+            sizes.append(('%dx%d' % (width, height), (width, height)))
+    for key, size in sizes:
+        resized = img.copy()
+        resized.thumbnail(size, Image.ANTIALIAS)
+        for ext, format in formats:
+            if key == 'original' and ext == 'png':
+                continue
+            data = StringIO()
+            resized.save(data, format=format)
+            variants.setdefault(key, {})[ext] = data.getvalue()
+    return variants
+
+
+class ThumbnailManager(models.Manager):
+
+    def orphans(self, grace=None):
+        """The thumbnails no resource refers to anymore. With grace, only
+           those created before it, the others may not be linked to their
+           resource yet, see ThumbnailMixin.save_thumbnail.
+        """
+        orphans = self.get_query_set().filter(resourcebase__id=None)
+        if grace is not None:
+            orphans = orphans.filter(created__lt=datetime.now() - grace)
+        return orphans
+
+    def referenced_files(self, chunk_size=1000):
+        """Returns the names of all the files of the thumbnails in use,
+           reading them chunk_size at a time.
+        """
+        names = set()
+        last = 0
+        while True:
+            rows = list(self.get_query_set().exclude(resourcebase__id=None).filter(id__gt=last).order_by('id').values_list(
+                'id', 'thumb_file', 'variants')[:chunk_size])
+            if not rows:
+                return names
+            for id, thumb_file, variants in rows:
+                names.update(Thumbnail(thumb_file=thumb_file, variants=variants).file_names())
+            last = rows[-1][0]
+
+    def collect_garbage(self, chunk_size=1000, grace=timedelta(hours=1), dry_run=False):
+        """Deletes the orphan thumbnails created before grace, then the
+           files under thumbs/ that no thumbnail refers to and that were
+           not modified during grace, as both may belong to a thumbnail
+           being saved. The rows are
+           deleted chunk_size at a time. It returns the number of rows
+           and the names of the files deleted, or that would be with
+           dry_run.
+        """
+        rows = 0
+        last = 0
+        while True:
+            ids = list(self.orphans(grace).filter(id__gt=last).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            if not dry_run:
+                # checked again in case one was given to a resource meanwhile
+                self.orphans(grace).filter(id__in=ids).delete()
+            rows += len(ids)
+            last = ids[-1]
+
+        storage = Thumbnail._meta.get_field('thumb_file').storage
+        referenced = self.referenced_files(chunk_size)
+        try:
+            dirs, files = storage.listdir('thumbs')
+        except OSError:
+            files = []
+        deleted = []
+        for name in sorted('thumbs/%s' % f for f in files):
+            if name in referenced:
+                continue
+            try:
+                if datetime.now() - storage.modified_time(name) < grace:
+                    continue
+            except (NotImplementedError, OSError):
+                continue
+            if not dry_run:
+                storage.delete(name)
+            deleted.append(name)
+        return rows, deleted
+
+
 class Thumbnail(models.Model):
 
     thumb_file = models.FileField(upload_to='thumbs')
     thumb_spec = models.TextField(null=True, blank=True)
     version = models.PositiveSmallIntegerField(null=True, default=0)
+    # names of the files of the variants, as JSON, see thumbnail_variants
+    variants = models.TextField(null=True, blank=True)
+    created = models.DateTimeField(default=datetime.now)
+
+    objects = ThumbnailManager()
 
     def save_thumb(self, image, id):
-        """image must be png data in a string for now"""
-        self._delete_thumb()
-        md5 = hashlib.md5()
-        md5.update(id + str(self.version))
-        self.version = self.version + 1
-        self.thumb_file.save(md5.hexdigest() + ".png", ContentFile(image))
-
-    def _delete_thumb(self):
-        try:
-            self.thumb_file.delete()
-        except OSError:
-            pass
+        """image must be png data in a string for now
 
-    def delete(self):
-        self._delete_thumb()
-        super(Thumbnail,self).delete()
+           The image and its variants are stored under the hash of their
+           content, so identical images are only written once and the
+           names of the files never change, they can be cached forever.
+           The files that are not used anymore are deleted by the
+           collect_thumbnails command.
+        """
+        variants = {}
+        for size, formats in thumbnail_variants(image).iteritems():
+            variants[size] = dict((ext, self._store(data, ext)) for ext, data in formats.iteritems())
+        self.thumb_file = variants['original']['png']
+        self.variants = json.dumps(variants)
+        self.version = (self.version or 0) + 1
+        self.save()
+
+    def _store(self, data, ext):
+        storage = self.thumb_file.storage
+        name = 'thumbs/%s.%s' % (hashlib.sha1(data).hexdigest(), ext)
+        if not storage.exists(name):
+            storage.save(name, ContentFile(data))
+        return name
+
+    def get_variants(self):
+        return json.loads(self.variants) if self.variants else {}
+
+    def file_names(self):
+        names = set(name for formats in self.get_variants().values() for name in formats.values())
+        if self.thumb_file:
+            names.add(self.thumb_file.name)
+        return names
+
+    def get_url(self, size=None, format='png'):
+        """Returns the url of the image in one of the THUMBNAIL_SIZES, as
+           'WIDTHxHEIGHT', or of the image itself, in a format, or None if
+           there is no such variant.
+        """
+        name = self.get_variants().get(size or 'original', {}).get(format)
+        if name is None and size is None and format == 'png' and self.thumb_file:
+            name = self.thumb_file.name
+        if name is None:
+            return None
+        return reverse('thumbnail', args=(os.path.basename(name),))
 
     def __unicode__(self):
         return self.thumb_file.name
@@ -162,7 +305,8 @@ class ThumbnailMixin(object):
     def save_thumbnail(self, spec, save=True):
         """
         Generic support for saving. `render` implementation must exist
-        and return image as bytes of a png image (for now)
+        and return image as bytes of a png image (for now). Returns
+        whether a thumbnail was rendered.
         """
         render = getattr(self, '_render_thumbnail', None)
         if render is None:
@@ -170,18 +314,18 @@ class ThumbnailMixin(object):
         image = render(spec)
 
         if not image:
-            return
+            return False
 
-        #Clean any orphan Thumbnail before
-        Thumbnail.objects.filter(resourcebase__id=None).delete()
-        
-        self.thumbnail, created = Thumbnail.objects.get_or_create(resourcebase__id=self.id)
+        # the orphan thumbnails are deleted by the collect_thumbnails command
+        if self.thumbnail is None:
+            self.thumbnail = Thumbnail.objects.create()
         path = self._thumbnail_path()
         self.thumbnail.thumb_spec = spec
         self.thumbnail.save_thumb(image, path)
         # have to save the thumb ref if new but also trigger XML regeneration
         if save:
             self.save()
+        return True
 
     def _thumbnail_path(self):
         return '%s-%s' % (self._meta.object_name, self.pk)
@@ -189,9 +333,16 @@ class ThumbnailMixin(object):
     def _get_default_thumbnail(self):
         return getattr(self, "_missing_thumbnail", staticfiles.static(settings.MISSING_THUMBNAIL))
 
-    def get_thumbnail_url(self):
+    def get_thumbnail_url(self, size=None, format='png'):
+        """Returns the url of the thumbnail, in one of the THUMBNAIL_SIZES
+           if given, see Thumbnail.get_url. The placeholder is served until
+           the thumbnail is rendered.
+        """
         thumb = self.thumbnail
-        return thumb == None and self._get_default_thumbnail() or thumb.thumb_file.url
+        url = None
+        if thumb is not None and thumb.thumb_file:
+            url = thumb.get_url(size, format) or thumb.get_url()
+        return url or self._get_default_thumbnail()
  
     def has_thumbnail(self):
         '''Determine if the thumbnail object exists and an image exists'''
@@ -453,6 +604,38 @@ class LinkManager(models.Manager):
     def original(self):
         return self.get_query_set().filter(link_type='original')
 
+    def sync(self, resource, links, link_types, hosts=None):
+        """Makes the links of a resource of the given types match links,
+           a list of dicts with the extension, name, mime, url and
+           link_type of each of them.
+
+           The existing links are read at once, the missing ones are
+           created in bulk and the ones that are not wanted anymore, or
+           changed, are deleted in one query. If hosts is given, only the
+           links to those hosts are kept, whatever their type. It returns
+           the number of links created and deleted.
+        """
+        fields = ('extension', 'name', 'mime', 'url', 'link_type')
+        wanted = OrderedDict()
+        for link in links:
+            if hosts is None or urlparse(link['url']).hostname in hosts:
+                wanted[tuple(unicode(link[field]) for field in fields)] = True
+
+        obsolete = []
+        for link in self.get_query_set().filter(resource=resource):
+            key = tuple(unicode(getattr(link, field)) for field in fields)
+            if key in wanted:
+                # so that its duplicates are not wanted
+                del wanted[key]
+            elif link.link_type in link_types or (hosts is not None and urlparse(link.url).hostname not in hosts):
+                obsolete.append(link.id)
+
+        if obsolete:
+            self.get_query_set().filter(id__in=obsolete).delete()
+        if wanted:
+            self.bulk_create([self.model(resource=resource, **dict(zip(fields, key))) for key in wanted])
+        return len(wanted), len(obsolete)
+
 class Link(models.Model):
     """Auxiliary model for storing links for resources.
 
@@ -474,6 +657,94 @@ class Link(models.Model):
 
     objects = LinkManager()
 
+class ThumbnailJobManager(models.Manager):
+
+    def enqueue(self, resource, spec):
+        """Requests a thumbnail of a resource rendered from spec, unless it
+           already has one rendered from the same spec. There is at most
+           one job per resource, a new request replaces the spec of the
+           pending one. It returns the job, or None.
+        """
+        thumbnail = resource.thumbnail
+        if thumbnail is not None and thumbnail.thumb_file and thumbnail.thumb_spec == spec:
+            return None
+        job, created = self.get_or_create(resource_id=resource.id, defaults={'spec': spec})
+        if not created:
+            job.spec = spec
+            job.status = ThumbnailJob.PENDING
+            job.attempts = 0
+            job.error = None
+            job.save()
+        return job
+
+    def claim(self, limit):
+        """Marks up to limit pending jobs as running and returns them. A
+           job claimed by another worker in the meantime is left out.
+        """
+        jobs = []
+        for job in self.filter(status=ThumbnailJob.PENDING).order_by('updated')[:limit]:
+            if self.filter(id=job.id, status=ThumbnailJob.PENDING).update(
+                    status=ThumbnailJob.RUNNING, updated=datetime.now()):
+                job.status = ThumbnailJob.RUNNING
+                jobs.append(job)
+        return jobs
+
+    def reset_stale(self, before):
+        """Makes the jobs running since before pending again, their worker
+           must have stopped.
+        """
+        return self.filter(status=ThumbnailJob.RUNNING, updated__lt=before).update(
+            status=ThumbnailJob.PENDING, updated=datetime.now())
+
+
+class ThumbnailJob(models.Model):
+    """Rendering of the thumbnail of a resource, done by the
+       process_thumbnails command outside of the requests.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    # number of times a job is tried before it fails
+    MAX_ATTEMPTS = 3
+
+    resource = models.OneToOneField(ResourceBase, related_name='thumbnail_job')
+    spec = models.TextField(null=True, blank=True)
+    status = models.CharField(max_length=16, default=PENDING, db_index=True,
+                              choices=[(x, x) for x in (PENDING, RUNNING, DONE, FAILED)])
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = ThumbnailJobManager()
+
+    def run(self):
+        """Renders the thumbnail and records the outcome. The job is left
+           pending if it was enqueued again while running.
+        """
+        status, error = self.DONE, None
+        try:
+            resource = ResourceBase.objects.get(id=self.resource_id)
+            if not resource.save_thumbnail(self.spec, save=False):
+                raise RuntimeError('No thumbnail could be rendered from %s' % self.spec)
+            # saving the resource again would run all its save handlers
+            ResourceBase.objects.filter(id=resource.id).update(thumbnail=resource.thumbnail)
+            # the url of the thumbnail changes with its content
+            Link.objects.filter(resource=resource, link_type='image', name='Thumbnail').update(
+                url=urljoin(settings.SITEURL, resource.get_thumbnail_url()))
+        except Exception, e:
+            logger.warn('Could not render the thumbnail of resource %s', self.resource_id, exc_info=True)
+            self.attempts += 1
+            status = self.FAILED if self.attempts >= self.MAX_ATTEMPTS else self.PENDING
+            error = str(e)
+        ThumbnailJob.objects.filter(id=self.id, status=self.RUNNING, spec=self.spec).update(
+            status=status, attempts=self.attempts, error=error, updated=datetime.now())
+        self.status, self.error = status, error
+        return status == self.DONE
+
+
 def resourcebase_post_save(instance, sender, **kwargs):
     """
     Since django signals are not propagated from child to parent classes we need to call this 
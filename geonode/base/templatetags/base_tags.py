@@ -25,4 +25,14 @@ def categories():
     for c in counts:
         topics = topics.annotate(**{ '%s_count' % c : Count('resourcebase__%s__category' % c)})
     return topics
-    
\ No newline at end of file
+    
+
+@register.assignment_tag
+def thumbnail_url(obj, size=None, format='png'):
+    """Returns the url of the thumbnail of a resource in a size and a
+       format, or None if there is no such variant of it.
+    """
+    thumb = getattr(obj, 'thumbnail', None)
+    if thumb is None or not thumb.thumb_file:
+        return None
+    return thumb.get_url(size or None, format)
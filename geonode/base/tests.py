@@ -1,7 +1,7 @@
 from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase
 from django.test.utils import override_settings
-from geonode.base.models import ResourceBase
+from geonode.base.models import ResourceBase, Link, ThumbnailJob
 
 
 class ThumbnailTests(TestCase):
@@ -33,3 +33,187 @@ class ThumbnailTests(TestCase):
         self.assertEqual(content, thumb.thumb_file.read())
         self.assertEqual(content, thumb.thumb_spec)
 
+    def test_variants(self):
+        """Verify that the smaller variants are stored by content and served with caching headers
+        """
+        from cStringIO import StringIO
+        from PIL import Image
+
+        data = StringIO()
+        Image.new('RGB', (200, 150), 'red').save(data, format='PNG')
+        self.rb._render_thumbnail = lambda *a, **kw: data.getvalue()
+        self.rb.save_thumbnail('red')
+        thumb = self.rb.thumbnail
+
+        variants = thumb.get_variants()
+        self.assertEquals(set(variants.keys()), set(['original', '100x75', '60x45']))
+        name = variants['original']['png']
+        self.assertEquals(thumb.thumb_file.name, name)
+        self.assertEquals(Image.open(thumb.thumb_file).size, (200, 150))
+        url = self.rb.get_thumbnail_url('60x45')
+        self.assertEquals(url, '/thumbs/%s' % variants['60x45']['png'].split('/')[-1])
+        # a size that was not generated falls back to the image itself
+        self.assertEquals(self.rb.get_thumbnail_url('10x10'), '/thumbs/%s' % name.split('/')[-1])
+
+        # the same image is stored under the same names
+        other = ResourceBase.objects.create()
+        other._render_thumbnail = self.rb._render_thumbnail
+        other.save_thumbnail('red')
+        self.assertEquals(other.thumbnail.thumb_file.name, name)
+        other.thumbnail.delete()
+        self.assertTrue(thumb.thumb_file.storage.exists(name))
+
+        response = self.client.get(url)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response['Content-Type'], 'image/png')
+        self.assertTrue('max-age=31536000' in response['Cache-Control'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(response.status_code, 304)
+        self.assertEquals(self.client.get('/thumbs/missing.png').status_code, 404)
+
+
+
+class ThumbnailGarbageTests(TestCase):
+
+    def test_collect_garbage(self):
+        """Verify that the orphan thumbnails and the unused files are collected
+        """
+        import datetime
+        from django.core.files.base import ContentFile
+        from geonode.base.models import Thumbnail
+
+        rb = ResourceBase.objects.create()
+        rb._render_thumbnail = lambda spec: spec
+        rb.save_thumbnail('kept')
+        orphan = ResourceBase.objects.create()
+        orphan._render_thumbnail = rb._render_thumbnail
+        orphan.save_thumbnail('orphan')
+        orphan_files = orphan.thumbnail.file_names()
+        orphan.delete()
+        storage = rb.thumbnail.thumb_file.storage
+        stray = storage.save('thumbs/stray.png', ContentFile('stray'))
+
+        # the recent rows and files are kept, they may not be linked yet
+        self.assertEquals(Thumbnail.objects.collect_garbage(dry_run=True), (0, []))
+        unlinked = Thumbnail.objects.create()
+        self.assertEquals(Thumbnail.objects.collect_garbage(), (0, []))
+        self.assertTrue(Thumbnail.objects.filter(id=unlinked.id).exists())
+        unlinked.delete()
+        rows, files = Thumbnail.objects.collect_garbage(grace=datetime.timedelta(0), dry_run=True, chunk_size=1)
+        self.assertEquals(rows, 1)
+        self.assertEquals(set(files), orphan_files | set([stray]))
+
+        orphan_thumb = Thumbnail.objects.create(thumb_file='thumbs/stray.png')
+        self.assertEquals(Thumbnail.objects.orphans().count(), 2)
+        rows, files = Thumbnail.objects.collect_garbage(grace=datetime.timedelta(0), chunk_size=1)
+        self.assertEquals(rows, 2)
+        self.assertFalse(Thumbnail.objects.filter(id=orphan_thumb.id).exists())
+        self.assertEquals(set(files), orphan_files | set([stray]))
+        for name in files:
+            self.assertFalse(storage.exists(name))
+        rb = ResourceBase.objects.get(id=rb.id)
+        self.assertEqual(rb.thumbnail.thumb_file.read(), 'kept')
+
+
+class LinkTests(TestCase):
+
+    def test_sync(self):
+        """Verify that sync only creates and deletes the links that changed
+        """
+        rb = ResourceBase.objects.create()
+
+        def link(name, url, link_type='data'):
+            return dict(extension='html', name=name, mime='text/html', url=url, link_type=link_type)
+
+        metadata = Link.objects.create(resource=rb, extension='xml', name='ISO', mime='text/xml',
+                                       url='http://localhost/csw', link_type='metadata')
+        links = [link('WFS', 'http://localhost/wfs'), link('WMS', 'http://localhost/wms', 'image')]
+        self.assertEquals(Link.objects.sync(rb, links, ['data', 'image']), (2, 0))
+        self.assertEquals(Link.objects.sync(rb, links, ['data', 'image']), (0, 0))
+
+        kept = Link.objects.get(resource=rb, name='WFS')
+        Link.objects.create(resource=rb, **links[0])
+        Link.objects.create(resource=rb, **link('Old', 'http://oldhost/wms', 'html'))
+        links = [links[0], link('WMS', 'http://localhost/wms?v=2', 'image')]
+        self.assertEquals(Link.objects.sync(rb, links, ['data', 'image'], hosts=['localhost']), (1, 3))
+        self.assertEquals(sorted(rb.link_set.values_list('url', flat=True)),
+                          ['http://localhost/csw', 'http://localhost/wfs', 'http://localhost/wms?v=2'])
+        self.assertEquals(rb.link_set.filter(id__in=[kept.id, metadata.id]).count(), 2)
+
+
+class ThumbnailJobTests(TestCase):
+
+    def setUp(self):
+        self.rb = ResourceBase.objects.create()
+        ResourceBase._render_thumbnail = lambda self, spec: spec
+
+    def tearDown(self):
+        del ResourceBase._render_thumbnail
+        rb = ResourceBase.objects.get(id=self.rb.id)
+        if rb.thumbnail:
+            rb.thumbnail.delete()
+
+    def test_jobs(self):
+        """Verify that the thumbnail jobs are deduplicated and skipped when the spec did not change
+        """
+        job = ThumbnailJob.objects.enqueue(self.rb, 'abc')
+        self.assertEquals(ThumbnailJob.objects.enqueue(self.rb, 'xyz').id, job.id)
+        self.assertEquals(ThumbnailJob.objects.count(), 1)
+        self.assertEquals(self.rb.get_thumbnail_url(), '/static/geonode/img/missing_thumb.png')
+
+        jobs = ThumbnailJob.objects.claim(10)
+        self.assertEquals([j.id for j in jobs], [job.id])
+        self.assertEquals(ThumbnailJob.objects.claim(10), [])
+        self.assertTrue(jobs[0].run())
+
+        rb = ResourceBase.objects.get(id=self.rb.id)
+        self.assertEquals(rb.thumbnail.thumb_spec, 'xyz')
+        self.assertEqual(rb.thumbnail.thumb_file.read(), 'xyz')
+        self.assertEquals(ThumbnailJob.objects.get(id=job.id).status, ThumbnailJob.DONE)
+        self.assertEquals(ThumbnailJob.objects.enqueue(rb, 'xyz'), None)
+
+        # a job enqueued again while it runs is left pending
+        job = ThumbnailJob.objects.enqueue(rb, 'abc')
+        job = ThumbnailJob.objects.claim(10)[0]
+        ThumbnailJob.objects.enqueue(rb, 'def')
+        job.run()
+        self.assertEquals(ThumbnailJob.objects.get(id=job.id).status, ThumbnailJob.PENDING)
+
+        ThumbnailJob.objects.enqueue(rb, '')
+        for i in range(ThumbnailJob.MAX_ATTEMPTS):
+            self.assertFalse(ThumbnailJob.objects.claim(10)[0].run())
+        self.assertEquals(ThumbnailJob.objects.get(id=job.id).status, ThumbnailJob.FAILED)
+
+    def test_job_errors(self):
+        """Verify that the failed thumbnail jobs record their error and are retried, as are the stale ones
+        """
+        import datetime
+        from django.core.management import call_command
+
+        def render(self, spec):
+            raise IOError('GeoServer is down')
+        ResourceBase._render_thumbnail = render
+
+        ThumbnailJob.objects.enqueue(self.rb, 'abc')
+        job = ThumbnailJob.objects.claim(10)[0]
+        self.assertFalse(job.run())
+        job = ThumbnailJob.objects.get(id=job.id)
+        self.assertEquals((job.status, job.attempts, job.error), (ThumbnailJob.PENDING, 1, 'GeoServer is down'))
+        self.assertEquals(ResourceBase.objects.get(id=self.rb.id).thumbnail, None)
+
+        # a new request starts over
+        ThumbnailJob.objects.enqueue(self.rb, 'def')
+        job = ThumbnailJob.objects.get(id=job.id)
+        self.assertEquals((job.status, job.attempts, job.error), (ThumbnailJob.PENDING, 0, None))
+
+        # the jobs of a worker that stopped are run again
+        ThumbnailJob.objects.claim(10)
+        now = datetime.datetime.now()
+        self.assertEquals(ThumbnailJob.objects.reset_stale(now - datetime.timedelta(minutes=1)), 0)
+        self.assertEquals(ThumbnailJob.objects.reset_stale(now + datetime.timedelta(minutes=1)), 1)
+        self.assertEquals(ThumbnailJob.objects.get(id=job.id).status, ThumbnailJob.PENDING)
+
+        # the command tries them until they fail for good
+        call_command('process_thumbnails', workers=1, verbosity=0)
+        job = ThumbnailJob.objects.get(id=job.id)
+        self.assertEquals((job.status, job.attempts), (ThumbnailJob.FAILED, ThumbnailJob.MAX_ATTEMPTS))
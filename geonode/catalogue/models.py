@@ -25,7 +25,8 @@ from django.db.models import signals
 from geonode.layers.models import Layer
 from geonode.documents.models import Document
 from geonode.catalogue import get_catalogue
-from geonode.base.models import Link
+from geonode.base.models import Link, ResourceBase
+from geonode.sync import deferred_handler
 
 
 LOGGER = logging.getLogger(__name__)
@@ -38,6 +39,7 @@ def catalogue_pre_delete(instance, sender, **kwargs):
     catalogue.remove_record(instance.uuid)
 
 
+@deferred_handler
 def catalogue_post_save(instance, sender, **kwargs):
     """Get information from catalogue
     """
@@ -74,8 +76,6 @@ def catalogue_post_save(instance, sender, **kwargs):
             )
 
     # generate and save CSW specific fields
-    signals.post_save.disconnect(catalogue_post_save, sender=Layer)
-    signals.post_save.disconnect(catalogue_post_save, sender=Document)
     # generate an XML document (GeoNode's default is ISO)
     md_doc = catalogue.catalogue.csw_gen_xml(instance,
              'catalogue/full_metadata.xml')
@@ -85,10 +85,11 @@ def catalogue_post_save(instance, sender, **kwargs):
 
     instance.csw_wkt_geometry = instance.geographic_bounding_box.split(';')[-1]
 
-    instance.save()
-
-    signals.post_save.connect(catalogue_post_save, sender=Layer)
-    signals.post_save.connect(catalogue_post_save, sender=Document)
+    # saving the instance again would run all the save handlers again
+    ResourceBase.objects.filter(id=instance.resourcebase_ptr_id).update(
+        metadata_xml=instance.metadata_xml,
+        csw_anytext=instance.csw_anytext,
+        csw_wkt_geometry=instance.csw_wkt_geometry)
 
 
 def catalogue_pre_save(instance, sender, **kwargs):
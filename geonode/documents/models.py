@@ -14,7 +14,7 @@ from django.utils.translation import ugettext_lazy as _
 
 from geonode.security.enumerations import AUTHENTICATED_USERS, ANONYMOUS_USERS
 from geonode.layers.models import Layer
-from geonode.base.models import ResourceBase, resourcebase_post_save
+from geonode.base.models import ResourceBase, ThumbnailJob, resourcebase_post_save
 from geonode.maps.signals import map_changed_signal
 from geonode.maps.models import Map
 
@@ -66,10 +66,11 @@ class Document(ResourceBase):
     LEVEL_ADMIN = 'document_admin'
     
     def update_thumbnail(self, save=True):
-        try:
-            self.save_thumbnail(None, save)
-        except RuntimeError, e:
-            logger.warn('Could not create thumbnail for %s' % self, e)
+        """Requests the thumbnail of the document, it is rendered by the
+           process_thumbnails command. The document file or url is the
+           spec, so it is only rendered again when it changes.
+        """
+        ThumbnailJob.objects.enqueue(self, self.doc_file.name if self.doc_file else self.doc_url)
 
     def _render_thumbnail(self, spec):
         from cStringIO import StringIO
@@ -156,8 +157,8 @@ def pre_save_document(instance, sender, **kwargs):
 
 
 def create_thumbnail(sender, instance, created, **kwargs):
-    if created:
-        instance.update_thumbnail(save=False)
+    # nothing is rendered again if the document file did not change
+    instance.update_thumbnail(save=False)
 
 
 def update_documents_extent(sender, **kwargs):
@@ -12,6 +12,7 @@ from django.core.exceptions import PermissionDenied
 from django_downloadview.response import DownloadResponse
 from django.views.generic.edit import UpdateView, CreateView
 from geonode.utils import resolve_object
+from geonode.sync import defer_sync
 from geonode.maps.views import _perms_info
 from geonode.security.enumerations import AUTHENTICATED_USERS, ANONYMOUS_USERS
 from geonode.people.forms import ProfileForm
@@ -122,6 +123,7 @@ class DocumentUpdateView(UpdateView):
         return HttpResponseRedirect(reverse('document_metadata', args=(self.object.id,)))
 
 @login_required
+@defer_sync()
 def document_metadata(request, docid, template='documents/document_metadata.html'):
     document = Document.objects.get(id=docid)
 
@@ -18,34 +18,49 @@
 #
 #########################################################################
 import sys, os
+import json
 import urllib
 import logging
 import re
 import errno
 import uuid
+import hashlib
+import time
 import datetime
+import itertools
+import threading
 import geoserver
 import httplib2
 
 from urlparse import urlparse
 from urlparse import urlsplit
 from threading import local
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from functools import wraps
+from multiprocessing.pool import ThreadPool
 
 from itertools import cycle, izip
+from traceback import format_exception, format_exception_only
 from lxml import etree
+from xml.etree.ElementTree import tostring as xml_tostring
 
 from owslib.wcs import WebCoverageService
+from owslib.wms import WebMapService
 from owslib.util import http_post
 
 from django.core.exceptions import PermissionDenied, ImproperlyConfigured
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db import close_connection
+from django.db import connections
 from django.db.models.signals import pre_delete
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.core.cache import cache
 
 from dialogos.models import Comment
 from agon_ratings.models import OverallRating
+from taggit.models import TaggedItem
 
 from gsimporter import Client
 
@@ -55,11 +70,17 @@ from geoserver.catalog import Catalog
 from geoserver.catalog import FailedRequestError, UploadError
 from geoserver.catalog import ConflictingDataError
 from geoserver.resource import FeatureType, Coverage
+from geoserver.style import Style as GsStyle
+from geoserver.support import url as rest_url
 
 from geonode import GeoNodeException
+from geonode.ogc_client import OGCClient, CircuitBreaker
 from geonode.layers.utils import layer_type, get_files
 from geonode.layers.models import Layer, Attribute, Style
 from geonode.layers.enumerations import LAYER_ATTRIBUTE_NUMERIC_DATA_TYPES
+from geonode.geoserver.statistics import postgis_attribute_statistics, dbf_attribute_statistics
+from geonode.geoserver.statistics import postgis_estimated_count, postgis_attribute_sketches
+from geonode.geoserver.statistics import read_dbf_count, dbf_attribute_sketches
 
 logger = logging.getLogger(__name__)
 
@@ -206,19 +227,22 @@ def fixup_style(cat, resource, style):
             cat.save(lyr)
             logger.info("Successfully updated %s", lyr)
 
-def cascading_delete(cat, layer_name):
-    resource = None
+def _get_gs_resource(cat, layer_name):
+    """Returns the GeoServer resource of a layer name, which may be
+       prefixed by its workspace, or None if it does not exist or
+       GeoServer is down.
+    """
     try:
         if layer_name.find(':') != -1:
             workspace, name = layer_name.split(':')
             ws = cat.get_workspace(workspace)
             if ws == None:
                 logger.debug('cascading delete was called on a layer where the workspace was not found')
-                return
-            resource = cat.get_resource(name, workspace = workspace)
+                return None
+            return cat.get_resource(name, workspace = workspace)
         else:
-            resource = cat.get_resource(layer_name)
-    except EnvironmentError, e: 
+            return cat.get_resource(layer_name)
+    except EnvironmentError, e:
       if e.errno == errno.ECONNREFUSED:
         msg = ('Could not connect to geoserver at "%s"'
                'to save information for layer "%s"' % (
@@ -229,74 +253,456 @@ def cascading_delete(cat, layer_name):
       else:
         raise e
 
-    if resource is None:
-        # If there is no associated resource,
-        # this method can not delete anything.
-        # Let's return and make a note in the log.
-        logger.debug('cascading_delete was called with a non existent resource')
-        return
-    resource_name = resource.name
-    lyr = cat.get_layer(resource_name)
-    if(lyr is not None): #Already deleted
-        store = resource.store
-        styles = lyr.styles + [lyr.default_style]
-        cat.delete(lyr)
-        for s in styles: 
-            if s is not None and s.name not in _default_style_names:
+
+def _delete_gs_layer(cat, resource):
+    """Deletes the GeoServer layer of a resource, its styles and the
+       resource. It returns whether the layer was deleted and whether the
+       catalog must be reloaded.
+    """
+    lyr = cat.get_layer(resource.name)
+    if lyr is None: #Already deleted
+        return False, False
+    styles = lyr.styles + [lyr.default_style]
+    cat.delete(lyr)
+    for s in styles:
+        if s is not None and s.name not in _default_style_names:
+            try:
+                cat.delete(s, purge=True)
+            except FailedRequestError as e:
+                # Trying to delete a shared style will fail
+                # We'll catch the exception and log it.
+                logger.debug(e)
+
+    #Due to a possible bug of geoserver, we need this trick for now
+    try:
+        cat.delete(resource) #This will fail
+    except:
+        # the reload preserves the integrity of geoserver
+        return True, True
+    return True, False
+
+
+def _is_postgis_store(store):
+    return store.resource_type == 'dataStore' and store.connection_parameters.get('dbtype') == 'postgis'
+
+
+def cascading_delete_layers(cat, layer_names):
+    """Removes several layers from GeoServer, with their styles and their
+       PostGIS table or their store.
+
+       The layers are grouped by store, each store is deleted once after
+       all its layers, the PostGIS tables are dropped through a single
+       connection and the catalog is reloaded at most once, at the end.
+       It returns a list of (layer_name, exc_info) tuples, exc_info is
+       None unless removing the layer failed.
+    """
+    results = OrderedDict((name, None) for name in layer_names)
+    stores = OrderedDict()
+    for name in layer_names:
+        try:
+            resource = _get_gs_resource(cat, name)
+        except Exception:
+            results[name] = sys.exc_info()
+            continue
+        if resource is None:
+            # If there is no associated resource,
+            # this method can not delete anything.
+            # Let's return and make a note in the log.
+            logger.debug('cascading_delete was called with a non existent resource')
+            continue
+        stores.setdefault(resource.store.href, (resource.store, []))[1].append((name, resource))
+
+    reload = False
+    connection = None
+    try:
+        for store, resources in stores.itervalues():
+            deleted = False
+            for name, resource in resources:
+                try:
+                    layer_deleted, needs_reload = _delete_gs_layer(cat, resource)
+                    reload = reload or needs_reload
+                    deleted = deleted or layer_deleted
+                    if layer_deleted and _is_postgis_store(store):
+                        if connection is None:
+                            connection = _postgis_connect()
+                        delete_from_postgis(resource.name, connection)
+                except Exception:
+                    results[name] = sys.exc_info()
+            if deleted and not _is_postgis_store(store):
                 try:
-                    cat.delete(s, purge=True)
+                    cat.delete(store, recurse=True)
+                    invalidate_stores()
                 except FailedRequestError as e:
-                    # Trying to delete a shared style will fail
+                    # Trying to delete a shared store will fail
                     # We'll catch the exception and log it.
                     logger.debug(e)
+    finally:
+        if connection is not None:
+            connection.close()
+        if reload:
+            cat.reload()
+    return results.items()
 
-        #Due to a possible bug of geoserver, we need this trick for now
-        try:
-            cat.delete(resource) #This will fail
-        except:
-            cat.reload() #this preservers the integrity of geoserver
-            
-        if store.resource_type == 'dataStore' and 'dbtype' in store.connection_parameters and store.connection_parameters['dbtype'] == 'postgis':
-            delete_from_postgis(resource_name)
-        else:
-            try:
-                cat.delete(store, recurse=True)
-            except FailedRequestError as e:
-                # Trying to delete a shared store will fail 
-                # We'll catch the exception and log it.
-                logger.debug(e) 
+
+def cascading_delete(cat, layer_name):
+    for name, exc_info in cascading_delete_layers(cat, [layer_name]):
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+
+def _postgis_connect():
+    import psycopg2
+    db = ogc_server_settings.datastore_db
+    return psycopg2.connect("dbname='" + db['NAME'] + "' user='" + db['USER'] + "'  password='" + db['PASSWORD'] + "' port=" + db['PORT'] + " host='" + db['HOST'] + "'")
 
 
-def delete_from_postgis(resource_name):
+def delete_from_postgis(resource_name, connection=None):
     """
     Delete a table from PostGIS (because Geoserver won't do it yet);
     to be used after deleting a layer from the system.
+
+    connection is an open psycopg2 connection to use, else one is
+    opened for this table only.
     """
-    import psycopg2
-    dsname = ogc_server_settings.DATASTORE
-    db = ogc_server_settings.datastore_db
-    conn=psycopg2.connect("dbname='" + db['NAME'] + "' user='" + db['USER'] + "'  password='" + db['PASSWORD'] + "' port=" + db['PORT'] + " host='" + db['HOST'] + "'")
+    conn = connection if connection is not None else _postgis_connect()
     try:
         cur = conn.cursor()
-        cur.execute("SELECT DropGeometryTable ('%s')" %  resource_name)
+        cur.execute("SELECT DropGeometryTable (%s)", [resource_name])
         conn.commit()
     except Exception, e:
+        conn.rollback()
         logger.error("Error deleting PostGIS table %s:%s", resource_name, str(e))
     finally:
-        conn.close()
+        if connection is None:
+            conn.close()
+
+def _get_layers_by_name(names, chunk_size=500):
+    """Returns a dict with the GeoNode layers matching the given names.
+
+       The names are queried in chunks to stay below the maximum number
+       of parameters supported by the database backend.
+    """
+    layers = {}
+    for i in range(0, len(names), chunk_size):
+        for layer in Layer.objects.filter(name__in=names[i:i + chunk_size]):
+            layers[layer.name] = layer
+    return layers
+
+
+def resource_fingerprint(resource):
+    """Returns a SHA-1 hash of the GeoServer configuration of a resource.
+
+       It covers the featureType/coverage REST payload, the title,
+       abstract, bounding box and attribute list, so it changes whenever
+       there is something in GeoServer that updatelayers would synchronize.
+    """
+    if resource.dom is None:
+        resource.fetch()
+    dimensions = [n.text for n in resource.dom.findall("dimensions/coverageDimension/name")]
+    attributes = getattr(resource, 'attributes', None) or dimensions
+    sha = hashlib.sha1()
+    sha.update(xml_tostring(resource.dom))
+    for value in [resource.title, resource.abstract, resource.latlon_bbox, attributes]:
+        sha.update(repr(value))
+    return sha.hexdigest()
+
+
+def _slurp_resource(resource, owner, layer=None, changed_only=False):
+    """Creates or updates the GeoNode layer for a single GeoServer resource.
+
+       It is safe to call from a worker thread: errors are not raised but
+       returned as a sys.exc_info() tuple, together with the status of
+       the layer ('created', 'updated' or 'skipped').
+
+       If changed_only is True, existing layers whose fingerprint matches
+       the one of the resource are skipped.
+    """
+    status = 'updated'
+    try:
+        if changed_only and layer is not None and layer.fingerprint == resource_fingerprint(resource):
+            return 'skipped', None
+        with transaction.commit_on_success():
+            if layer is None:
+                layer, created = Layer.objects.get_or_create(name=resource.name, defaults=_layer_defaults(resource, owner))
+                if created:
+                    status = 'created'
+            layer.save()
+            # recalculate the layer statistics
+            set_attributes(layer, overwrite=True)
+            if status == 'created':
+                layer.set_default_permissions()
+            # saving the layer pushes some of its metadata to GeoServer,
+            # so the fingerprint is taken from the updated resource,
+            # bypassing the short lived response cache of gsconfig.
+            resource.catalog._cache.pop(resource.href, None)
+            resource.fetch()
+            Layer.objects.filter(pk=layer.pk).update(fingerprint=resource_fingerprint(resource))
+    except Exception:
+        return status, sys.exc_info()
+    finally:
+        if threading.current_thread().name != 'MainThread':
+            # database connections are per thread, do not leak them
+            # from the worker threads of the pool.
+            close_connection()
+    return status, None
+
+
+def _layer_defaults(resource, owner):
+    store = resource.store
+    workspace = store.workspace
+    return {
+        "workspace": workspace.name,
+        "store": store.name,
+        "storeType": store.resource_type,
+        "typename": "%s:%s" % (workspace.name.encode('utf-8'), resource.name.encode('utf-8')),
+        "title": resource.title or 'No title provided',
+        "abstract": resource.abstract or 'No abstract provided',
+        "owner": owner,
+        "uuid": str(uuid.uuid4())
+    }
+
+
+LayerDiff = namedtuple('LayerDiff', ['missing', 'extra', 'moved'])
+
+
+def reconcile_layers(layers, resources):
+    """Compares the GeoNode layers with the GeoServer resources.
+
+       layers is an iterable of (id, workspace, store, name) tuples and
+       resources a list of gsconfig resources. Both sides are indexed by
+       (workspace, store, name), the result is a LayerDiff with:
+
+       - missing: the resources without a GeoNode layer
+       - extra: the ids of the layers without a GeoServer resource
+       - moved: (id, resource) pairs for the layers whose resource is now
+         in another store of the same workspace
+    """
+    gs_index = {}
+    gs_names = {}
+    for resource in resources:
+        workspace = resource.workspace.name
+        gs_index[(workspace, resource.store.name, resource.name)] = resource
+        gs_names[(workspace, resource.name)] = resource
+
+    gn_index = set()
+    extra = []
+    moved = []
+    for layer_id, workspace, store, name in layers:
+        key = (workspace, store, name)
+        gn_index.add(key)
+        if key in gs_index:
+            continue
+        resource = gs_names.get((workspace, name))
+        if resource is not None:
+            moved.append((layer_id, resource))
+            gn_index.add((workspace, resource.store.name, name))
+        else:
+            extra.append(layer_id)
+
+    missing = [resource for key, resource in gs_index.iteritems() if key not in gn_index]
+    return LayerDiff(missing, extra, moved)
+
+
+_cascading_delete = local()
+
+
+class cascading_delete_disabled(object):
+    """Context manager that keeps geoserver_pre_delete from removing the
+       layers deleted in the current thread from GeoServer, the other
+       threads are not affected.
+    """
+
+    def __enter__(self):
+        _cascading_delete.disabled = getattr(_cascading_delete, 'disabled', 0) + 1
+        return self
 
-def gs_slurp(ignore_errors=True, verbosity=1, console=None, owner=None, workspace=None, store=None, filter=None, skip_unadvertised=False, remove_deleted=False):
+    def __exit__(self, exc_type, exc_value, traceback):
+        _cascading_delete.disabled -= 1
+
+
+def cascading_delete_enabled():
+    return not getattr(_cascading_delete, 'disabled', 0)
+
+
+def delete_layers(layers, chunk_size=100):
+    """Deletes a list of GeoNode layers, without removing them from GeoServer.
+
+       The layers are deleted in chunks, together with their ratings,
+       comments and keywords. It returns a list of (layer, exc_info) tuples,
+       exc_info is None if the layer was deleted.
+    """
+    ct = ContentType.objects.get_for_model(Layer)
+
+    def delete(ids):
+        with transaction.commit_on_success():
+            OverallRating.objects.filter(content_type=ct, object_id__in=ids).delete()
+            Comment.objects.filter(content_type=ct, object_id__in=ids).delete()
+            TaggedItem.objects.filter(content_type=ct, object_id__in=ids).delete()
+            Layer.objects.filter(id__in=ids).delete()
+
+    results = []
+    with cascading_delete_disabled():
+        for i in range(0, len(layers), chunk_size):
+            chunk = layers[i:i + chunk_size]
+            try:
+                delete([layer.id for layer in chunk])
+                results.extend((layer, None) for layer in chunk)
+            except Exception:
+                # find out which layers of the chunk can not be deleted
+                for layer in chunk:
+                    try:
+                        delete([layer.id])
+                        results.append((layer, None))
+                    except Exception:
+                        results.append((layer, sys.exc_info()))
+    return results
+
+
+def bulk_delete_layers(layers):
+    """Deletes a list of GeoNode layers from GeoServer, in one batch (see
+       cascading_delete_layers), then from GeoNode (see delete_layers).
+
+       It returns a list of (layer, exc_info) tuples in the same order,
+       exc_info is None if the layer was deleted. The layers that could
+       not be removed from GeoServer are kept in GeoNode.
+    """
+    failed = {}
+    #cascading_delete should only be called if ogc_server_settings.BACKEND_WRITE_ENABLED == True
+    if getattr(ogc_server_settings, "BACKEND_WRITE_ENABLED", True):
+        for name, exc_info in cascading_delete_layers(gs_catalog, [layer.typename for layer in layers]):
+            if exc_info is not None:
+                failed[name] = exc_info
+    for layer in layers:
+        wms_capabilities.invalidate(layer.typename)
+        invalidate_coverage_description(layer.typename)
+
+    deleted = dict((layer.id, exc_info) for layer, exc_info in
+                   delete_layers([layer for layer in layers if layer.typename not in failed]))
+    return [(layer, failed.get(layer.typename, deleted.get(layer.id))) for layer in layers]
+
+
+def geoserver_health():
+    """Returns the state of the circuit breaker of GeoServer, see
+       CircuitBreaker.state, and the number of layers waiting for it to be
+       synchronized.
+    """
+    # Avoid circular imports
+    from geonode.geoserver.models import PendingSync
+
+    health = geoserver_breaker.state(urlparse(ogc_server_settings.LOCATION).netloc)
+    health['pending_syncs'] = PendingSync.objects.count()
+    return health
+
+
+def replay_pending_syncs(limit=None):
+    """Saves again the layers that could not be synchronized while GeoServer
+       was down, oldest first. It stops as soon as one of them is queued
+       again and returns the number of layers synchronized.
+    """
+    # Avoid circular imports
+    from geonode.geoserver.models import PendingSync
+
+    pending = PendingSync.objects.order_by('created').values_list('id', 'layer')
+    if limit is not None:
+        pending = pending[:limit]
+    synchronized = 0
+    for id, layer_id in list(pending):
+        PendingSync.objects.filter(id=id).delete()
+        try:
+            layer = Layer.objects.get(id=layer_id)
+        except Layer.DoesNotExist:
+            continue
+        layer.save()
+        if PendingSync.objects.filter(layer=layer_id).exists():
+            break
+        synchronized += 1
+    return synchronized
+
+
+def _slurp_stats():
+    return {
+        'failed':0,
+        'updated':0,
+        'created':0,
+        'deleted':0,
+        'skipped':0,
+        'moved':0,
+    }
+
+
+def gs_slurp(ignore_errors=True, verbosity=1, console=None, owner=None, workspace=None, store=None, filter=None, skip_unadvertised=False, remove_deleted=False, workers=1, changed_only=False, dry_run=False, progress=None, resume_after=None):
     """Configure the layers available in GeoServer in GeoNode.
 
        It returns a list of dictionaries with the name of the layer,
        the result of the operation and the errors and traceback if it failed.
+
+       If workers is greater than one, the resources are processed
+       concurrently by a pool of that many threads, most of the time
+       is spent waiting for GeoServer to answer. The output is the same,
+       in the same order, as in a sequential run.
+
+       If changed_only is True, the layers whose GeoServer resource did not
+       change since the last run (see resource_fingerprint) are skipped.
+
+       If remove_deleted is True, the GeoNode layers that are no longer in
+       GeoServer are deleted and the ones moved to another store are updated,
+       see reconcile_layers. With dry_run, which requires remove_deleted,
+       nothing is changed and the output only reports the layers that would
+       be created, moved or deleted.
+
+       If progress is a file, the layers are written to it as JSON lines
+       (see progress_line) as soon as they are processed, instead of being
+       kept in the output, which then only holds the stats. resume_after is
+       the name of the last processed resource of an interrupted run, as
+       returned by read_checkpoint, the resources up to it are not processed.
     """
+    output = {
+        'stats': _slurp_stats(),
+        'layers': [],
+        'deleted_layers': [],
+        'moved_layers': [],
+        'missing_layers': [],
+    }
+    start = datetime.datetime.now()
+
+    for kind, info in iter_slurp(output['stats'], ignore_errors=ignore_errors, verbosity=verbosity, console=console,
+                                 owner=owner, workspace=workspace, store=store, filter=filter,
+                                 skip_unadvertised=skip_unadvertised, remove_deleted=remove_deleted, workers=workers,
+                                 changed_only=changed_only, dry_run=dry_run, resume_after=resume_after):
+        if progress is None:
+            output[kind].append(info)
+        else:
+            progress.write(progress_line(kind, info))
+            progress.flush()
+
+    finish = datetime.datetime.now()
+    td = finish - start
+    output['stats']['duration_sec'] = td.microseconds / 1000000 + td.seconds + td.days * 24 * 3600
+    return output
+
+
+def iter_slurp(stats=None, ignore_errors=True, verbosity=1, console=None, owner=None, workspace=None, store=None, filter=None, skip_unadvertised=False, remove_deleted=False, workers=1, changed_only=False, dry_run=False, resume_after=None):
+    """Generator version of gs_slurp.
+
+       It yields a (kind, info) tuple as soon as each layer is processed,
+       kind is the key of the gs_slurp output the info belongs to
+       ('layers', 'deleted_layers', 'moved_layers' or 'missing_layers').
+       The counters are updated in the stats dictionary, if given.
+    """
+    if dry_run and not remove_deleted:
+        raise ValueError('dry_run only applies to remove_deleted')
+    if stats is None:
+        stats = {}
+    stats.update(_slurp_stats())
     if console is None:
         console = open(os.devnull, 'w')
-
     if verbosity > 1:
         print >> console, "Inspecting the available layers in GeoServer ..."
     cat = Catalog(ogc_server_settings.internal_rest, _user, _password)
+    # the resources are processed by several threads, which can
+    # only share the pooled client, and what they change must not
+    # be read from the cache of gs_catalog
+    cat.http = InvalidatingHttp(http_client, gs_catalog)
     if workspace is not None:
         workspace = cat.get_workspace(workspace)
 
@@ -333,69 +739,75 @@ def gs_slurp(ignore_errors=True, verbosity=1, console=None, owner=None, workspac
     # i.e. look for matching layers in GeoNode and also disable? 
     disabled_resources = [k for k in resources if k.enabled == "false"]
     
+    if dry_run:
+        # only compare the resources with the GeoNode layers below
+        resources = []
+
+    if resume_after is not None:
+        names = [resource.name for resource in resources]
+        if resume_after in names:
+            resources = resources[names.index(resume_after) + 1:]
+
     number = len(resources)
     if verbosity > 1:
         msg = "Found %d layers, starting processing" % number
         print >> console, msg
-    output = {
-        'stats': {
-            'failed':0,
-            'updated':0,
-            'created':0,
-            'deleted':0,
-        },
-        'layers': [],
-        'deleted_layers': []
-    }
-    start = datetime.datetime.now()
-    for i, resource in enumerate(resources):
-        name = resource.name
-        store = resource.store
-        workspace = store.workspace
-        try:
-            layer, created = Layer.objects.get_or_create(name=name, defaults = {
-                "workspace": workspace.name,
-                "store": store.name,
-                "storeType": store.resource_type,
-                "typename": "%s:%s" % (workspace.name.encode('utf-8'), resource.name.encode('utf-8')),
-                "title": resource.title or 'No title provided',
-                "abstract": resource.abstract or 'No abstract provided',
-                "owner": owner,
-                "uuid": str(uuid.uuid4())
-            })
-            layer.save()
-            # recalculate the layer statistics
-            set_attributes(layer, overwrite=True)
 
-        except Exception, e:
-            if ignore_errors:
-                status = 'failed'
-                exception_type, error, traceback = sys.exc_info()
-            else:
-                if verbosity > 0:
-                    msg = "Stopping process because --ignore-errors was not set and an error was found."
-                    print >> sys.stderr, msg
-                raise Exception('Failed to process %s' % resource.name.encode('utf-8'), e), None, sys.exc_info()[2]
+    # Look up the layers that already exist in GeoNode with a few queries
+    # instead of one get_or_create per resource.
+    existing_layers = _get_layers_by_name([resource.name for resource in resources])
+
+    # the styles are synchronized once, not for each layer that uses them
+    with style_sync_pass():
+        if resources and not dry_run:
+            try:
+                sync_styles(cat, workspace)
+            except (FailedRequestError, EnvironmentError):
+                logger.warn('Could not synchronize the styles of GeoServer', exc_info=True)
+
+        def process(resource):
+            return _slurp_resource(resource, owner, existing_layers.get(resource.name), changed_only)
+
+        if workers > 1:
+            pool = ThreadPool(workers)
+            results = pool.imap(process, resources)
         else:
-            if created:
-                layer.set_default_permissions()
-                status = 'created'
-                output['stats']['created']+=1
-            else:
-                status = 'updated'
-                output['stats']['updated']+=1
-
-        msg = "[%s] Layer %s (%d/%d)" % (status, name, i+1, number)
-        info = {'name': name, 'status': status}
-        if status == 'failed':
-            output['stats']['failed']+=1
-            info['traceback'] = traceback
-            info['exception_type'] = exception_type
-            info['error'] = error
-        output['layers'].append(info)
-        if verbosity > 0:
-            print >> console, msg
-    
+            pool = None
+            results = itertools.imap(process, resources)
+
+        try:
+            for i, (resource, result) in enumerate(izip(resources, results)):
+                name = resource.name
+                status, exc_info = result
+                if exc_info is None:
+                    stats[status]+=1
+                elif ignore_errors:
+                    status = 'failed'
+                    exception_type, error, traceback = exc_info
+                else:
+                    if verbosity > 0:
+                        msg = "Stopping process because --ignore-errors was not set and an error was found."
+                        print >> sys.stderr, msg
+                    raise Exception('Failed to process %s' % name.encode('utf-8'), exc_info[1]), None, exc_info[2]
+
+                msg = "[%s] Layer %s (%d/%d)" % (status, name, i+1, number)
+                info = {'name': name, 'status': status}
+                if status == 'failed':
+                    stats['failed']+=1
+                    info['traceback'] = traceback
+                    info['exception_type'] = exception_type
+                    info['error'] = error
+                yield 'layers', info
+                if verbosity > 0:
+                    print >> console, msg
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            # the invalidations made by the other threads do not
+            # reach the request cache of this one
+            gs_catalog.invalidate()
+
     if remove_deleted:
         q = Layer.objects.filter()
         if workspace_for_delete_compare is not None:
@@ -405,77 +817,155 @@ def gs_slurp(ignore_errors=True, verbosity=1, console=None, owner=None, workspac
             if isinstance(store, CoverageStore) or isinstance(store, DataStore): q = q.filter(store__exact=store.name)
             else: q = q.filter(store__exact=store)
         logger.debug("Executing 'remove_deleted' logic")
-        logger.debug("GeoNode Layers Found:")
-        
-        # compare the list of GeoNode layers obtained via query/filter with valid resources found in GeoServer 
+
+        # compare the GeoNode layers obtained via query/filter with the valid resources found in GeoServer
         # filtered per options passed to updatelayers: --workspace, --store, --skip-unadvertised
-        # add any layers not found in GeoServer to deleted_layers (must match workspace and store as well):
-        deleted_layers = []
-        for layer in q:
-            logger.debug("GeoNode Layer info: name: %s, workspace: %s, store: %s", layer.name, layer.workspace, layer.store)
-            layer_found_in_geoserver = False
-            for resource in resources_for_delete_compare:
-                #if layer.name matches a GeoServer resource, check also that workspace and store match, mark valid:
-                if layer.name == resource.name:
-                    if layer.workspace == resource.workspace.name and layer.store == resource.store.name:
-                        logger.debug("Matches GeoServer layer: name: %s, workspace: %s, store: %s", resource.name,resource.workspace.name, resource.store.name)
-                        layer_found_in_geoserver = True
-            if not layer_found_in_geoserver: 
-                logger.debug("----- Layer %s not matched, marked for deletion ---------------", layer.name)
-                deleted_layers.append(layer)
-        
+        diff = reconcile_layers(q.values_list('id', 'workspace', 'store', 'name'), resources_for_delete_compare)
+
+        if dry_run:
+            for resource in diff.missing:
+                if verbosity > 0:
+                    print >> console, "[create_planned] Layer %s" % resource.name
+                yield 'missing_layers', {'name': resource.name, 'status': 'create_planned'}
+
+        number_moved = len(diff.moved)
+        if verbosity > 1 and number_moved > 0:
+            print >> console, "\nFound %d layers moved to another store" % number_moved
+        for i, (layer_id, resource) in enumerate(diff.moved):
+            if dry_run:
+                status = "move_planned"
+            else:
+                Layer.objects.filter(id=layer_id).update(store=resource.store.name, storeType=resource.store.resource_type)
+                stats['moved']+=1
+                status = "moved"
+            msg = "[%s] Layer %s (%d/%d)" % (status, resource.name, i+1, number_moved)
+            yield 'moved_layers', {'name': resource.name, 'status': status, 'store': resource.store.name}
+            if verbosity > 0:
+                print >> console, msg
+
+        deleted_layers = list(Layer.objects.filter(id__in=diff.extra))
         number_deleted = len(deleted_layers)
         if verbosity > 1:
             msg = "\nFound %d layers to delete, starting processing" % number_deleted if number_deleted > 0 else "\nFound %d layers to delete" % number_deleted
             print >> console, msg
-        
-        for i, layer in enumerate(deleted_layers):
+
+        if dry_run:
+            results = [(layer, None) for layer in deleted_layers]
+        else:
+            results = delete_layers(deleted_layers)
+        for i, (layer, exc_info) in enumerate(results):
             logger.debug("GeoNode Layer to delete: name: %s, workspace: %s, store: %s", layer.name, layer.workspace, layer.store)
-            try:
-                # Avoid circular imports
-                from geonode.layers.signals import geoserver_pre_delete
-                #delete ratings, comments, and taggit tags:
-                ct = ContentType.objects.get_for_model(layer)
-                OverallRating.objects.filter(content_type = ct, object_id = layer.id).delete()
-                Comment.objects.filter(content_type = ct, object_id = layer.id).delete()
-                layer.keywords.clear()
-                
-                pre_delete.disconnect(geoserver_pre_delete, sender=Layer)
-                layer.delete()
-                output['stats']['deleted']+=1
+            info = {'name': layer.name}
+            if dry_run:
+                status = "delete_planned"
+            elif exc_info is None:
+                stats['deleted']+=1
                 status = "delete_succeeded"
-            except Exception, e:
+            else:
                 status = "delete_failed"
-            finally:
-                pre_delete.connect(geoserver_pre_delete, sender=Layer)
-            
+                info['exception_type'], info['error'], info['traceback'] = exc_info
+            info['status'] = status
             msg = "[%s] Layer %s (%d/%d)" % (status, layer.name, i+1, number_deleted)
-            info = {'name': layer.name, 'status': status}
-            if status == "delete_failed":
-                exception_type, error, traceback = sys.exc_info()
-                info['traceback'] = traceback
-                info['exception_type'] = exception_type
-                info['error'] = error
-            output['deleted_layers'].append(info)
+            yield 'deleted_layers', info
             if verbosity > 0:
                 print >> console, msg
 
-    finish = datetime.datetime.now()
-    td = finish - start
-    output['stats']['duration_sec'] = td.microseconds / 1000000 + td.seconds + td.days * 24 * 3600
-    return output
+
+def progress_line(kind, info):
+    """Serializes an entry of the gs_slurp output as a JSON line.
+
+       The traceback of the failed layers is formatted as a string, so
+       it does not keep the stack frames of the error alive.
+    """
+    record = dict(info, kind=kind)
+    if 'traceback' in record:
+        exception_type = record.pop('exception_type')
+        record['traceback'] = ''.join(format_exception(exception_type, record['error'], record['traceback']))
+        record['error'] = ''.join(format_exception_only(exception_type, record['error'])).strip()
+    return json.dumps(record) + '\n'
+
+
+def read_checkpoint(path):
+    """Returns the name of the last layer processed in a gs_slurp progress file.
+
+       A partially written last line, from an interrupted run, is ignored.
+    """
+    checkpoint = None
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('kind') == 'layers':
+                checkpoint = record['name']
+    return checkpoint
+
+
+def _stores_cache_key(workspace):
+    # the generation changes on every invalidation, see invalidate_stores
+    generation = cache.get('gs_stores_generation')
+    if generation is None:
+        generation = 0
+        cache.add('gs_stores_generation', generation)
+    return 'gs_stores:%s:%s' % (generation, hashlib.md5(workspace.encode('utf-8')).hexdigest())
+
+
+def invalidate_stores():
+    """Forgets the store listings of get_stores, after a store is created
+       or deleted.
+    """
+    try:
+        cache.incr('gs_stores_generation')
+    except ValueError:
+        cache.set('gs_stores_generation', 1)
+
+
+def _store_info(store):
+    store.fetch()
+    return {'name': store.name, 'type': store.dom.find('type').text.lower()}
+
+
+def workspace_stores(cat, workspace, workers=10):
+    """Returns the names and types of the stores of a workspace.
+
+       The type of each store is only in its own REST description, they are
+       fetched concurrently by a pool of workers threads. If the cache is
+       shared by the processes, see cache_is_shared, the listing is kept in
+       it for STORES_CACHE_TIMEOUT seconds, or until invalidate_stores is
+       called.
+    """
+    shared = cache_is_shared()
+    if shared:
+        key = _stores_cache_key(workspace.name)
+        stores = cache.get(key)
+        if stores is not None:
+            return stores
+    gs_stores = cat.get_stores(workspace)
+    if workers > 1 and len(gs_stores) > 1:
+        pool = ThreadPool(min(workers, len(gs_stores)))
+        try:
+            stores = pool.map(_store_info, gs_stores)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        stores = map(_store_info, gs_stores)
+    if shared:
+        cache.set(key, stores, ogc_server_settings.STORES_CACHE_TIMEOUT)
+    return stores
+
 
 def get_stores(store_type = None):
     cat = Catalog(ogc_server_settings.internal_rest, _user, _password)
-    stores = cat.get_stores()
+    # the stores are fetched by several threads, which can
+    # only share the pooled client
+    cat.http = http_client
     store_list = []
-    for store in stores:
-        store.fetch()
-        stype = store.dom.find('type').text.lower()
-        if store_type and store_type.lower() == stype:
-            store_list.append({'name':store.name, 'type': stype})
-        elif store_type is None:
-            store_list.append({'name':store.name, 'type': stype})
+    for workspace in cat.get_workspaces():
+        for store in workspace_stores(cat, workspace):
+            if store_type is None or store_type.lower() == store['type']:
+                store_list.append(store)
     return store_list
 
 
@@ -483,6 +973,8 @@ def set_attributes(layer, overwrite=False):
     """
     Retrieve layer attribute names & types from Geoserver,
     then store in GeoNode database using Attribute model
+
+    See sync_attributes, overwrite is kept for backwards compatibility.
     """
     attribute_map = []
     if layer.storeType == "dataStore":
@@ -506,79 +998,262 @@ def set_attributes(layer, overwrite=False):
             "identifiers": layer.typename.encode('utf-8')
         })
         try:
-            response, body = http.request(dc_url)
+            response, body = http_client.request(dc_url)
             doc = etree.fromstring(body)
             path = ".//{wcs}Axis/{wcs}AvailableKeys/{wcs}Key".format(wcs="{http://www.opengis.net/wcs/1.1.1}")
             attribute_map = [[n.text,"raster"] for n in doc.findall(path)]
         except Exception:
             attribute_map = []
 
-    attributes = layer.attribute_set.all()
+    sync_attributes(layer, attribute_map)
+
+
+def sync_attributes(layer, attribute_map):
+    """
+    Store a list of [name, type] attributes of a layer in the Attribute model
+
+    The attributes are compared with the stored ones by name, only the
+    rows of the attributes that were added, removed or changed type are
+    written, the others keep their label, display order and statistics.
+    """
+    stored = {}
+    obsolete = []
+    for la in layer.attribute_set.all():
+        if la.attribute in stored:
+            obsolete.append(la.pk)
+        else:
+            stored[la.attribute] = la
+    fields = set(field for field, ftype in attribute_map)
+    obsolete.extend(la.pk for field, la in stored.iteritems() if field not in fields)
+
     # Delete existing attributes if they no longer exist in an updated layer
-    for la in attributes:
-        lafound = False
-        for field, ftype in attribute_map:
-            if field == la.attribute:
-                lafound = True
-        if overwrite or not lafound:
-            logger.debug("Going to delete [%s] for [%s]", la.attribute, layer.name.encode('utf-8'))
-            la.delete()
-
-    # Add new layer attributes if they don't already exist
-    if attribute_map is not None:
-        iter = len(Attribute.objects.filter(layer=layer)) + 1
-        for field, ftype in attribute_map:
-            if field is not None:
-                la, created = Attribute.objects.get_or_create(layer=layer, attribute=field, attribute_type=ftype)
-                if created:
-                    if is_layer_attribute_aggregable(layer.storeType, field, ftype):
-                        logger.debug("Generating layer attribute statistics")
-                        result = get_attribute_statistics(layer.name, field)
-                        if result is not None:
-                            la.count = result['Count']
-                            la.min = result['Min']
-                            la.max = result['Max']
-                            la.average = result['Average']
-                            la.median = result['Median']
-                            la.stddev = result['StandardDeviation']
-                            la.sum = result['Sum']
-                            la.unique_values = result['unique_values']
-                            la.last_stats_updated = datetime.datetime.now()
-                    la.attribute_label = field.title()
-                    la.visible = ftype.find("gml:") != 0
-                    la.display_order = iter
-                    la.save()
-                    iter += 1
-                    logger.debug("Created [%s] attribute for [%s]", field, layer.name.encode('utf-8'))
-    else:
+    if obsolete:
+        logger.debug("Going to delete %d attributes for [%s]", len(obsolete), layer.name.encode('utf-8'))
+        Attribute.objects.filter(pk__in=obsolete).delete()
+
+    # Add new layer attributes and update the ones whose type changed
+    iter = max([la.display_order for field, la in stored.iteritems() if field in fields] or [0]) + 1
+    new_attributes = []
+    changed = []
+    for field, ftype in attribute_map:
+        if field is None:
+            continue
+        la = stored.get(field)
+        if la is None:
+            la = Attribute(layer=layer, attribute=field, attribute_type=ftype)
+            la.attribute_label = field.title()
+            la.display_order = iter
+            iter += 1
+            new_attributes.append(la)
+            logger.debug("Created [%s] attribute for [%s]", field, layer.name.encode('utf-8'))
+        elif la.attribute_type != ftype:
+            la.attribute_type = ftype
+            logger.debug("Updated [%s] attribute for [%s]", field, layer.name.encode('utf-8'))
+        else:
+            continue
+        la.visible = ftype.find("gml:") != 0
+        changed.append(la)
+
+    aggregable = [la.attribute for la in changed
+                  if is_layer_attribute_aggregable(layer.storeType, la.attribute, la.attribute_type)]
+    if aggregable:
+        logger.debug("Generating layer attribute statistics")
+        statistics = get_layer_attribute_statistics(layer, aggregable)
+        for la in changed:
+            set_attribute_statistics(la, statistics.get(la.attribute))
+    for la in changed:
+        if la.pk is not None:
+            la.save()
+    # write all the new rows at once
+    Attribute.objects.bulk_create(new_attributes)
+    if not attribute_map:
         logger.debug("No attributes found")
 
 
-def set_styles(layer, gs_catalog):
-    style_set = []
-    gs_layer = gs_catalog.get_layer(layer.name)
-    default_style = gs_layer.default_style
-    layer.default_style = save_style(default_style)
-    style_set.append(layer.default_style)
+def set_attribute_statistics(la, result):
+    """Copies the result of get_attribute_statistics to an Attribute.
+    """
+    if result is not None:
+        la.count = result['Count']
+        la.min = result['Min']
+        la.max = result['Max']
+        la.average = result['Average']
+        la.median = result['Median']
+        la.stddev = result['StandardDeviation']
+        la.sum = result['Sum']
+        la.unique_values = result['unique_values']
+        la.sketch = result.get('sketch')
+        la.last_stats_updated = datetime.datetime.now()
+
+
+SLD_NAMESPACES = {
+    'sld': 'http://www.opengis.net/sld',
+    'se': 'http://www.opengis.net/se',
+}
+
+SLDInfo = namedtuple('SLDInfo', ['name', 'title', 'version'])
+
+
+def parse_sld(body):
+    """Returns the SLDInfo, name, title and version, of the user style of
+       an SLD. They are kept in the cache by the hash of the SLD.
+    """
+    key = 'sld:%s' % hashlib.sha1(body).hexdigest()
+    info = cache.get(key)
+    if info is not None:
+        return info
+    dom = etree.fromstring(body)
+    user_style = dom.find('sld:NamedLayer/sld:UserStyle', namespaces=SLD_NAMESPACES)
+
+    def text(tag):
+        # SLD 1.0 uses its own elements, SLD 1.1 the ones of SE
+        if user_style is None:
+            return None
+        value = user_style.findtext('sld:' + tag, namespaces=SLD_NAMESPACES)
+        if value is None:
+            value = user_style.findtext('se:' + tag, namespaces=SLD_NAMESPACES)
+        return value
+
+    info = SLDInfo(text('Name'), text('Title'), dom.get('version'))
+    cache.set(key, info)
+    return info
+
+
+class style_sync_pass(object):
+    """Context manager during which each style is synchronized once, see
+       sync_style. Unlike catalog_request_cache it is shared by all the
+       threads, so the layers saved by the workers of gs_slurp use the
+       styles synchronized beforehand by sync_styles.
+    """
+    _lock = threading.Lock()
+    _depth = 0
+    styles = None
+
+    def __enter__(self):
+        with self._lock:
+            if style_sync_pass._depth == 0:
+                style_sync_pass.styles = {}
+            style_sync_pass._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self._lock:
+            style_sync_pass._depth -= 1
+            if style_sync_pass._depth == 0:
+                style_sync_pass.styles = None
+
+
+def _style_body_href(catalog, element):
+    """Returns the url of the SLD of a style element of the REST API, from
+       its atom link, without fetching the style.
+    """
+    links = [n for n in element.getchildren() if 'href' in n.attrib]
+    if links:
+        href = links[0].attrib['href']
+        if href.endswith('.xml'):
+            return href[:-len('.xml')] + '.sld'
+    name = element.findtext('name')
+    if name is None:
+        return None
+    return GsStyle(catalog, name).body_href()
 
-    alt_styles = gs_layer.styles
 
-    for alt_style in alt_styles:
-        style_set.append(save_style(alt_style))
+def _style_workspace(href):
+    parts = urlsplit(href).path.split('/')
+    if 'workspaces' in parts:
+        return parts[parts.index('workspaces') + 1]
+    return None
 
-    layer.styles = style_set
-    return layer
 
+def sync_style(catalog, href):
+    """Returns the Style of the SLD at href, updated if the SLD changed.
 
-def save_style(gs_style):
-    style, created = Style.objects.get_or_create(name = gs_style.sld_name)
-    style.sld_title = gs_style.sld_title
-    style.sld_body = gs_style.sld_body
-    style.sld_url = gs_style.body_href()
-    style.save()
+       The SLD is requested with the ETag or the Last-Modified date of the
+       previous response, if GeoServer sent them, and is only parsed and
+       saved if its hash differs from the one of the stored version.
+    """
+    styles = style_sync_pass.styles
+    if styles is not None and href in styles:
+        return styles[href]
+
+    existing = list(Style.objects.filter(sld_url=href)[:1])
+    style = existing[0] if existing else None
+    headers = {}
+    if style is not None and style.sld_body:
+        if style.sld_etag:
+            headers['If-None-Match'] = style.sld_etag
+        if style.sld_last_modified:
+            headers['If-Modified-Since'] = style.sld_last_modified
+    response, body = catalog.http.request(href, 'GET', headers=headers)
+    if response.status == 304:
+        pass
+    elif response.status != 200:
+        raise FailedRequestError('Tried to make a GET request to %s but got a %d status code: \n%s' % (
+            href, response.status, body))
+    else:
+        digest = hashlib.sha1(body).hexdigest()
+        changed = style is None or style.sld_hash != digest
+        if changed:
+            info = parse_sld(body)
+            if style is None:
+                name = info.name or os.path.basename(href)[:-len('.sld')]
+                style, created = Style.objects.get_or_create(name=name)
+            style.sld_title = info.title
+            style.sld_body = body
+            style.sld_version = info.version
+            style.sld_url = href
+            style.sld_hash = digest
+            style.workspace = _style_workspace(href)
+        validators = (response.get('etag'), response.get('last-modified'))
+        if changed or validators != (style.sld_etag, style.sld_last_modified):
+            style.sld_etag, style.sld_last_modified = validators
+            style.save()
+
+    if styles is not None:
+        styles[href] = style
     return style
 
 
+def sync_styles(catalog, workspace=None):
+    """Synchronizes all the styles of a workspace, or the global ones, in
+       one pass, see sync_style. It returns a dict of the Styles by the url
+       of their SLD.
+    """
+    if workspace is not None:
+        styles_url = rest_url(catalog.service_url, ['workspaces', getattr(workspace, 'name', workspace), 'styles.xml'])
+    else:
+        styles_url = rest_url(catalog.service_url, ['styles.xml'])
+    result = {}
+    for element in catalog.get_xml(styles_url).findall('style'):
+        href = _style_body_href(catalog, element)
+        if href is not None:
+            result[href] = sync_style(catalog, href)
+    return result
+
+
+def set_styles(layer, gs_catalog):
+    """Sets the default and the other styles of a layer to the ones of its
+       GeoServer layer, see sync_style.
+    """
+    gs_layer = gs_catalog.get_layer(layer.name)
+    if gs_layer.dom is None:
+        gs_layer.fetch()
+    elements = [gs_layer.dom.find('defaultStyle')] + gs_layer.dom.findall('styles/style')
+    style_set = []
+    for element in elements:
+        href = _style_body_href(gs_catalog, element) if element is not None else None
+        if href is not None:
+            style = sync_style(gs_catalog, href)
+            if style not in style_set:
+                style_set.append(style)
+
+    if style_set:
+        layer.default_style = style_set[0]
+    if layer.pk is not None and set(s.id for s in style_set) != set(layer.styles.values_list('id', flat=True)):
+        layer.styles = style_set
+    return layer
+
+
 def is_layer_attribute_aggregable(store_type, field_name, field_type):
     """
     Decipher whether layer attribute is suitable for statistical derivation
@@ -613,6 +1288,63 @@ def get_attribute_statistics(layer_name, field):
         logger.exception('Error generating layer aggregate statistics')
 
 
+def get_layer_attribute_statistics(layer, fields):
+    """
+    Generate statistics for several attributes of a layer at once
+
+    When GeoNode can read the layer data, that is the PostGIS table of
+    the datastore or the DBF file of a shapefile, the statistics are
+    computed locally, otherwise each field is sent to the GeoServer WPS.
+    For layers with more features than LAYER_ATTRIBUTE_SKETCH_THRESHOLD,
+    approximate sketches are built instead (see geonode.layers.sketches).
+    Returns a dict with the statistics of each field.
+    """
+    threshold = getattr(settings, 'LAYER_ATTRIBUTE_SKETCH_THRESHOLD', None)
+    try:
+        if ogc_server_settings.datastore_db and layer.store == ogc_server_settings.DATASTORE:
+            connection = connections[ogc_server_settings.DATASTORE]
+            try:
+                if threshold is not None and postgis_estimated_count(connection, layer.name) > threshold:
+                    return postgis_attribute_sketches(connection, layer.name, fields)
+                return postgis_attribute_statistics(connection, layer.name, fields)
+            except Exception:
+                # a failed statement aborts the transaction of the connection
+                connection.rollback_unless_managed()
+                raise
+        dbf = get_layer_dbf(layer)
+        if dbf is not None:
+            if threshold is not None and read_dbf_count(dbf) > threshold:
+                return dbf_attribute_sketches(dbf, fields)
+            return dbf_attribute_statistics(dbf, fields)
+    except Exception:
+        logger.exception('Error generating layer aggregate statistics locally')
+    return dict((field, get_attribute_statistics(layer.name, field)) for field in fields)
+
+
+def get_layer_dbf(layer):
+    """
+    Returns the path of the DBF file of a shapefile layer, or None if it
+    is not readable by GeoNode. Relative paths of the GeoServer store are
+    resolved with the DATA_DIR of the OGC server settings.
+    """
+    store = gs_catalog.get_store(layer.store, layer.workspace)
+    url = store.connection_parameters.get('url') or ''
+    if store.resource_type != 'dataStore' or not url.startswith('file:'):
+        return None
+    path = url[len('file:'):]
+    if not os.path.isabs(path):
+        if not ogc_server_settings.DATA_DIR:
+            return None
+        path = os.path.join(ogc_server_settings.DATA_DIR, path)
+    if os.path.isdir(path):
+        # directory of spatial files store
+        path = os.path.join(path, layer.name)
+    for dbf in [os.path.splitext(path)[0] + ext for ext in ('.dbf', '.DBF')]:
+        if os.path.exists(dbf):
+            return dbf
+    return None
+
+
 def get_wcs_record(instance, retry=True):
     wcs = WebCoverageService(ogc_server_settings.public_url + 'wcs', '1.0.0')
     key = instance.workspace + ':' + instance.name
@@ -631,15 +1363,76 @@ def get_wcs_record(instance, retry=True):
             raise GeoNodeException(msg)
 
 
-def get_coverage_grid_extent(instance):
+def _grid_extent(low, high):
+    return [(int(h) - int(l) + 1) for h, l in zip(high.split(), low.split())]
+
+
+WCS_NAMESPACES = {'wcs': 'http://www.opengis.net/wcs', 'gml': 'http://www.opengis.net/gml'}
+
+CoverageDescription = namedtuple('CoverageDescription', ['grid_extent', 'formats'])
+
+
+def _coverage_description_key(typename):
+    return 'wcs_describe_coverage:%s' % hashlib.md5(typename.encode('utf-8')).hexdigest()
+
+
+def describe_coverage(typename):
+    """Returns the CoverageDescription, grid extent in pixels and supported
+       formats, of a coverage from its WCS DescribeCoverage, which is kept in
+       the cache for CAPABILITIES_CACHE_TIMEOUT seconds.
+    """
+    key = _coverage_description_key(typename)
+    description = cache.get(key)
+    if description is not None:
+        return description
+
+    url = ogc_server_settings.LOCATION + 'wcs?' + urllib.urlencode({
+        'service': 'WCS',
+        'version': '1.0.0',
+        'request': 'DescribeCoverage',
+        'coverage': typename.encode('utf-8'),
+    })
+    response, body = http_client.request(url)
+    offering = None
+    if response.status == 200:
+        offering = etree.fromstring(body).find('wcs:CoverageOffering', namespaces=WCS_NAMESPACES)
+    if offering is None:
+        raise GeoNodeException("Layer '%s' was not found in WCS service at %s." % (typename, url))
+
+    envelope = offering.find('.//gml:GridEnvelope', namespaces=WCS_NAMESPACES)
+    grid_extent = None
+    if envelope is not None:
+        grid_extent = _grid_extent(envelope.findtext('gml:low', namespaces=WCS_NAMESPACES),
+                                   envelope.findtext('gml:high', namespaces=WCS_NAMESPACES))
+    formats = [f.text for f in offering.findall('wcs:supportedFormats/wcs:formats', namespaces=WCS_NAMESPACES)]
+    description = CoverageDescription(grid_extent, formats)
+    cache.set(key, description, ogc_server_settings.CAPABILITIES_CACHE_TIMEOUT)
+    return description
+
+
+def invalidate_coverage_description(typename):
+    cache.delete(_coverage_description_key(typename))
+
+
+def get_coverage_grid_extent(instance, resource=None):
     """
         Returns a list of integers with the size of the coverage
         extent in pixels
+
+        It is read from the GeoServer coverage resource, if given, which
+        describes the grid of the raster, else from the DescribeCoverage
+        of the layer.
     """
-    instance_wcs = get_wcs_record(instance)
-    grid = instance_wcs.grid
-    return [(int(h) - int(l) + 1) for
-        h, l in zip(grid.highlimits, grid.lowlimits)]
+    if resource is not None:
+        if resource.dom is None:
+            resource.fetch()
+        grid_range = resource.dom.find('grid/range')
+        if grid_range is not None:
+            return _grid_extent(grid_range.findtext('low'), grid_range.findtext('high'))
+    grid_extent = describe_coverage(instance.typename).grid_extent
+    if grid_extent is None:
+        raise GeoNodeException("Layer '%s' has no grid in its WCS description." % instance.typename)
+    return grid_extent
 
 
 GEOSERVER_LAYER_TYPES = {
@@ -719,12 +1512,14 @@ def cleanup(name, uuid):
 def _create_featurestore(name, data, overwrite=False, charset="UTF-8"):
     cat = gs_catalog
     cat.create_featurestore(name, data, overwrite=overwrite, charset=charset)
+    invalidate_stores()
     return cat.get_store(name), cat.get_resource(name)
 
 
 def _create_coveragestore(name, data, overwrite=False, charset="UTF-8"):
     cat = gs_catalog
     cat.create_coveragestore(name, data, overwrite=overwrite)
+    invalidate_stores()
     return cat.get_store(name), cat.get_resource(name)
 
 
@@ -753,6 +1548,7 @@ def _create_db_featurestore(name, data, overwrite=False, charset="UTF-8"):
             dbtype = db_engine
             )
         cat.save(ds)
+        invalidate_stores()
         ds = cat.get_store(dsname)
 
     try:
@@ -1086,6 +1882,12 @@ class OGC_Servers_Handler(object):
         for option in ['GEOGIT_ENABLED', 'WMST_ENABLED', 'WPS_ENABLED']:
             server.setdefault(option, False)
 
+        server.setdefault('CAPABILITIES_CACHE_TIMEOUT', 300)
+        server.setdefault('CIRCUIT_BREAKER_THRESHOLD', 5)
+        server.setdefault('CIRCUIT_BREAKER_COOLDOWN', 30)
+        server.setdefault('STORES_CACHE_TIMEOUT', 300)
+        server.setdefault('MAX_SLURP_WORKERS', 10)
+
     def __getitem__(self, alias):
         if hasattr(self._servers, alias):
             return getattr(self._servers, alias)
@@ -1108,25 +1910,26 @@ class OGC_Servers_Handler(object):
 
 def get_wms():
     wms_url = ogc_server_settings.internal_ows + "?service=WMS&request=GetCapabilities&version=1.1.0"
-    netloc = urlparse(wms_url).netloc
-    http = httplib2.Http()
-    http.add_credentials(_user, _password)
-    http.authorizations.append(
-        httplib2.BasicAuthentication(
-            (_user, _password),
-                netloc,
-                wms_url,
-                {},
-                None,
-                None,
-                http
-            )
-        )
-    body = http.request(wms_url)[1]
+    body = http_client.request(wms_url)[1]
     _wms = WebMapService(wms_url, xml=body)
     return _wms
 
 
+def render_thumbnail(url):
+    """Returns the PNG image GeoServer renders at a WMS reflector url,
+       or None if it could not render it.
+    """
+    # the client authenticates, so it must not be sent anywhere else
+    if not url or not url.startswith(ogc_server_settings.LOCATION):
+        logger.debug('Not rendering a thumbnail from %s' % url)
+        return None
+    resp, image = http_client.request(url)
+    if 'ServiceException' in image or resp.status < 200 or resp.status > 299:
+        logger.debug('Unable to obtain thumbnail: %s' % image)
+        return None
+    return image
+
+
 def wps_execute_layer_attribute_statistics(layer_name, field):
     """Derive aggregate statistics from WPS endpoint"""
 
@@ -1177,6 +1980,13 @@ def wps_execute_layer_attribute_statistics(layer_name, field):
 
         values = []
 
+        for value in exml.findall('{http://www.opengis.net/gml}featureMember/{http://www.geoserver.org/}UniqueValue/{http://www.geoserver.org/}value'):
+            if value is not None:
+                values.append(value.text)
+        result['unique_values'] = ','.join(values)
+
+    return result
+
 
 ogc_server_settings = OGC_Servers_Handler(settings.OGC_SERVER)['default']
 
@@ -1184,27 +1994,282 @@ _wms = None
 _csw = None
 _user, _password = ogc_server_settings.credentials
 
-http_client = httplib2.Http()
-http_client.add_credentials(_user, _password)
+# the requests to GeoServer fail right away while it is down
+geoserver_breaker = CircuitBreaker(threshold=ogc_server_settings.CIRCUIT_BREAKER_THRESHOLD,
+                                   cooldown=ogc_server_settings.CIRCUIT_BREAKER_COOLDOWN)
+http_client = OGCClient(timeout=ogc_server_settings.TIMEOUT, breaker=geoserver_breaker)
 http_client.add_credentials(_user, _password)
-_netloc = urlparse(ogc_server_settings.LOCATION).netloc
-http_client.authorizations.append(
-    httplib2.BasicAuthentication(
-        (_user, _password),
-        _netloc,
-        ogc_server_settings.LOCATION,
-        {},
-        None,
-        None,
-        http_client
-    )
-)
+http_client.add_basic_auth(_user, _password, ogc_server_settings.LOCATION)
+
+
+_catalog_cache = local()
+
+
+class catalog_request_cache(object):
+    """Context manager that memoizes the GeoServer REST responses of the
+       CachingCatalog in the current thread until it exits, it is used for
+       the duration of a request by CatalogCacheMiddleware and around the
+       layer signals, as a decorator. Nested uses share the same cache.
+    """
+
+    def __enter__(self):
+        if getattr(_catalog_cache, 'depth', 0) == 0:
+            _catalog_cache.responses = {}
+        _catalog_cache.depth = getattr(_catalog_cache, 'depth', 0) + 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _catalog_cache.depth -= 1
+        if _catalog_cache.depth == 0:
+            _catalog_cache.responses = None
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with catalog_request_cache():
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def cache_is_shared(backend=None):
+    """Whether the Django cache is shared by the processes serving GeoNode,
+       the local memory and dummy backends are private to each process.
+       Only a shared cache can be invalidated for all of them.
+    """
+    from django.core.cache.backends.locmem import LocMemCache
+    from django.core.cache.backends.dummy import DummyCache
+    return not isinstance(backend or cache, (LocMemCache, DummyCache))
+
+
+# the responses to GET requests with these headers depend on what the
+# client already has, they are neither taken from nor kept in the cache
+CONDITIONAL_HEADERS = ('if-match', 'if-none-match', 'if-modified-since', 'if-unmodified-since', 'if-range', 'range')
+
+
+def _request_key(uri, headers):
+    if not headers:
+        return uri
+    headers = sorted((name.lower(), value) for name, value in headers.items())
+    if any(name in CONDITIONAL_HEADERS for name, value in headers):
+        return None
+    return '\n'.join([uri] + ['%s: %s' % header for header in headers])
+
+
+class InvalidatingHttp(object):
+    """Wraps an httplib2 compatible client so that its requests other than
+       GET, which change GeoServer, invalidate the cache of a CachingCatalog.
+       It is used by the clients that write to GeoServer without going
+       through gs_catalog.
+    """
+
+    def __init__(self, http, catalog):
+        self.http = http
+        self.catalog = catalog
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        if method == "GET":
+            return self.http.request(uri, method, body, headers, *args, **kwargs)
+        try:
+            return self.http.request(uri, method, body, headers, *args, **kwargs)
+        finally:
+            self.catalog.invalidate()
+
+
+class CachingHttp(InvalidatingHttp):
+    """Wraps the httplib2 client of a CachingCatalog to cache the GET
+       requests, by URI and headers. Conditional requests are not cached.
+       Any other request changes the catalog and invalidates the cache.
+    """
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        if method != "GET":
+            return super(CachingHttp, self).request(uri, method, body, headers, *args, **kwargs)
+        key = _request_key(uri, headers)
+        if key is None:
+            return self.http.request(uri, method, body, headers, *args, **kwargs)
+        cached = self.catalog.get_cached(key)
+        if cached is not None:
+            return cached
+        response, content = self.http.request(uri, method, body, headers, *args, **kwargs)
+        if response.status == 200:
+            self.catalog.set_cached(key, response, content)
+        return response, content
+
+
+class CachingCatalog(Catalog):
+    """gsconfig Catalog that memoizes the responses of the REST API.
+
+       The resources, layers, styles and stores it fetches are kept for the
+       duration of a request or signal chain (see catalog_request_cache) and,
+       if timeout is set, in the Django cache for that many seconds. Saving
+       or deleting anything through the catalog invalidates both. The Django
+       cache is only invalidated for the other processes if it is shared by
+       them, see cache_is_shared.
+
+       http is the client to use instead of an httplib2.Http of its own.
+    """
+
+    def __init__(self, service_url, username="admin", password="geoserver", timeout=None, http=None, **kwargs):
+        super(CachingCatalog, self).__init__(service_url, username, password, **kwargs)
+        self.timeout = timeout
+        self.http = CachingHttp(http or self.http, self)
+
+    def _cache_key(self, key):
+        # the generation changes on every invalidation, so the entries
+        # of the previous ones are not found anymore and expire
+        generation = cache.get('gs_catalog_generation')
+        if generation is None:
+            generation = 0
+            cache.add('gs_catalog_generation', generation)
+        return 'gs_catalog:%s:%s' % (generation, hashlib.md5(key).hexdigest())
+
+    def get_cached(self, key):
+        responses = getattr(_catalog_cache, 'responses', None)
+        if responses is not None and key in responses:
+            return responses[key]
+        if self.timeout:
+            cached = cache.get(self._cache_key(key))
+            if cached is not None:
+                info, content = cached
+                cached = httplib2.Response(info), content
+                if responses is not None:
+                    responses[key] = cached
+                return cached
+        return None
+
+    def set_cached(self, key, response, content):
+        responses = getattr(_catalog_cache, 'responses', None)
+        if responses is not None:
+            responses[key] = (response, content)
+        if self.timeout:
+            cache.set(self._cache_key(key), (dict(response), content), self.timeout)
+
+    def invalidate(self):
+        self._cache.clear()
+        if getattr(_catalog_cache, 'responses', None) is not None:
+            _catalog_cache.responses = {}
+        if self.timeout:
+            try:
+                cache.incr('gs_catalog_generation')
+            except ValueError:
+                cache.set('gs_catalog_generation', 1)
+
+
+LayerCapabilities = namedtuple('LayerCapabilities', ['name', 'title', 'boundingBoxWGS84', 'boundingBox',
+                                                     'crsOptions', 'styles', 'timepositions'])
+
+
+def capabilities_index(wms):
+    """Returns the LayerCapabilities of each named layer of a parsed
+       WebMapService, by layer name.
+    """
+    index = {}
+    for name, content in wms.contents.iteritems():
+        if name is None:
+            continue
+        index[name] = LayerCapabilities(name, content.title, content.boundingBoxWGS84, content.boundingBox,
+                                        content.crsOptions, content.styles, content.timepositions)
+    return index
+
+
+class CapabilitiesCache(object):
+    """Name-keyed index of the layers of the WMS capabilities.
+
+       The whole GetCapabilities document is only downloaded and parsed
+       again after timeout seconds (never if None) or when refresh() is
+       called. A layer missing from it, usually because it was published
+       since, is looked up in the GeoServer virtual service of the layer,
+       whose capabilities only list that layer.
+    """
+
+    def __init__(self, timeout=None, http=None):
+        self.timeout = timeout
+        self.http = http or http_client
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._index = None
+        self._expires = None
+
+    def _fetch(self, url):
+        response, body = self.http.request(url)
+        if response.status != 200:
+            raise GeoNodeException('Could not get the WMS capabilities from %s: %s' % (url, response.status))
+        return capabilities_index(WebMapService(url, xml=body))
+
+    def _current(self):
+        with self._lock:
+            if self._index is not None and (self._expires is None or time.time() < self._expires):
+                return self._index
+            return None
+
+    def refresh(self):
+        """Downloads and indexes the capabilities document again.
+        """
+        index = self._fetch(ogc_server_settings.internal_ows + '?service=WMS&request=GetCapabilities&version=1.1.0')
+        with self._lock:
+            self._index = index
+            self._expires = time.time() + self.timeout if self.timeout is not None else None
+        return index
+
+    def index(self):
+        index = self._current()
+        if index is None:
+            # only one thread parses the document, the others wait for it
+            with self._refresh_lock:
+                index = self._current() or self.refresh()
+        return index
+
+    def invalidate(self, typename=None):
+        """Forgets the capabilities of a layer, which are then looked up
+           on their own the next time, or of all of them.
+        """
+        with self._lock:
+            if typename is None:
+                self._index = None
+            elif self._index is not None:
+                self._index.pop(typename, None)
+
+    def get(self, typename):
+        """Returns the LayerCapabilities of a layer, raises KeyError if
+           GeoServer does not publish it.
+        """
+        index = self.index()
+        if typename in index:
+            return index[typename]
+        workspace, _, name = typename.rpartition(':')
+        url = '%s%s/wms?service=WMS&request=GetCapabilities&version=1.1.0' % (
+            ogc_server_settings.LOCATION, '/'.join(filter(None, [workspace, name])))
+        try:
+            layers = self._fetch(url)
+        except GeoNodeException:
+            logger.debug('Could not get the WMS capabilities of %s', typename, exc_info=True)
+            layers = {}
+        # the virtual service may or may not prefix the name with the workspace
+        capabilities = layers.get(typename) or layers.get(name)
+        if capabilities is None:
+            raise KeyError(typename)
+        capabilities = capabilities._replace(name=typename)
+        with self._lock:
+            if self._index is index:
+                index[typename] = capabilities
+        return capabilities
+
 
+wms_capabilities = CapabilitiesCache(timeout=ogc_server_settings.CAPABILITIES_CACHE_TIMEOUT)
 
 
 url = ogc_server_settings.rest
-gs_catalog = Catalog(url, _user, _password)
+# the responses are only kept across requests if all the processes see
+# the invalidations, in a private cache they would serve stale ones
+gs_catalog = CachingCatalog(url, _user, _password,
+                            timeout=ogc_server_settings.CATALOG_CACHE_TIMEOUT if cache_is_shared() else None,
+                            http=http_client)
 gs_uploader = Client(url, _user, _password)
+# the imports create stores and resources behind the back of gs_catalog
+gs_uploader.client.http = InvalidatingHttp(gs_uploader.client.http, gs_catalog)
 
 _punc = re.compile(r"[\.:]") #regex for punctuation that confuses restconfig
 _foregrounds = ["#ffbbbb", "#bbffbb", "#bbbbff", "#ffffbb", "#bbffff", "#ffbbff"]
@@ -0,0 +1,80 @@
+#########################################################################
+#
+# Copyright (C) 2012 OpenPlans
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+from django.core.management.base import BaseCommand, CommandError
+from optparse import make_option
+from geonode.layers.models import Layer
+from geonode.geoserver.helpers import bulk_delete_layers
+import traceback
+
+
+class Command(BaseCommand):
+    help = 'Delete layers from GeoNode and GeoServer in one batch'
+    args = '[typename typename ...]'
+    option_list = BaseCommand.option_list + (
+        make_option('-s', '--store', dest="store", default=None,
+            help="Delete the layers of the given geoserver store name"),
+        make_option('-w', '--workspace', dest="workspace", default=None,
+            help="Delete the layers of the given workspace"),
+        make_option('--dry-run',
+            action='store_true',
+            dest='dry_run',
+            default=False,
+            help='Only report the layers that would be deleted.'),
+        )
+
+    def handle(self, *typenames, **options):
+        verbosity = int(options.get('verbosity'))
+        store = options.get('store')
+        workspace = options.get('workspace')
+        if not typenames and store is None and workspace is None:
+            raise CommandError("Give the typenames of the layers, a --store or a --workspace")
+
+        layers = Layer.objects.all()
+        if typenames:
+            layers = layers.filter(typename__in=typenames)
+        if store is not None:
+            layers = layers.filter(store=store)
+        if workspace is not None:
+            layers = layers.filter(workspace=workspace)
+        layers = list(layers.order_by('store', 'typename'))
+
+        if options.get('dry_run'):
+            results = [(layer, None) for layer in layers]
+        else:
+            results = bulk_delete_layers(layers)
+
+        failed = 0
+        for layer, exc_info in results:
+            if options.get('dry_run'):
+                status = 'delete_planned'
+            elif exc_info is None:
+                status = 'delete_succeeded'
+            else:
+                status = 'delete_failed'
+                failed += 1
+            if verbosity > 0:
+                print "[%s] Layer %s" % (status, layer.typename)
+            if exc_info is not None and verbosity > 1:
+                traceback.print_exception(*exc_info)
+        if verbosity > 0:
+            if options.get('dry_run'):
+                print "\n%d layers would be deleted" % len(results)
+            else:
+                print "\n%d layers deleted, %d failed" % (len(results) - failed, failed)
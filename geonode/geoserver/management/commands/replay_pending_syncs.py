@@ -0,0 +1,51 @@
+#########################################################################
+#
+# Copyright (C) 2012 OpenPlans
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from geonode.geoserver.helpers import replay_pending_syncs, geoserver_health
+
+
+class Command(BaseCommand):
+    help = 'Synchronize again the layers saved while GeoServer was down'
+    option_list = BaseCommand.option_list + (
+        make_option('--loop',
+            action='store_true',
+            dest='loop',
+            default=False,
+            help='Keep waiting for GeoServer to come back and for new layers to synchronize.'),
+        make_option('--interval', dest="interval", type="int", default=30,
+            help="With --loop, number of seconds to wait between the attempts"),
+        )
+
+    def handle(self, **options):
+        verbosity = int(options.get('verbosity'))
+        synchronized = 0
+        while True:
+            synchronized += replay_pending_syncs()
+            if not options.get('loop'):
+                break
+            time.sleep(options.get('interval'))
+        if verbosity > 0:
+            health = geoserver_health()
+            print "%d layers synchronized, %d pending, GeoServer circuit %s" % (
+                synchronized, health['pending_syncs'], health['state'])
@@ -17,10 +17,10 @@
 #
 #########################################################################
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from optparse import make_option
 from geonode.people.utils import get_valid_user
-from geonode.geoserver.helpers import gs_slurp
+from geonode.geoserver.helpers import gs_slurp, read_checkpoint
 import traceback
 import datetime
 import sys
@@ -44,6 +44,23 @@ class Command(BaseCommand):
             dest='remove_deleted',
             default=False,
             help='Remove GeoNode layers that have been deleted from GeoSever.'),
+        make_option('--dry-run',
+            action='store_true',
+            dest='dry_run',
+            default=False,
+            help='With --remove-deleted, only report the layers that would be created, moved or deleted.'),
+        make_option('--progress-file', dest="progress_file", default=None,
+            help="Write the result of each layer to this file as JSON lines instead of keeping them in memory"),
+        make_option('--resume',
+            action='store_true',
+            dest='resume',
+            default=False,
+            help='Resume an interrupted run after the last layer recorded in --progress-file.'),
+        make_option('--changed-only',
+            action='store_true',
+            dest='changed_only',
+            default=False,
+            help='Skip the layers that did not change in GeoServer since the last update.'),
         make_option('-u', '--user', dest="user", default=None,
             help="Name of the user account which should own the imported layers"),
         make_option('-f', '--filter', dest="filter", default=None,
@@ -51,27 +68,50 @@ class Command(BaseCommand):
         make_option('-s', '--store', dest="store", default=None,
             help="Only update data the layers for the given geoserver store name"),
         make_option('-w', '--workspace', dest="workspace", default=None,
-            help="Only update data on specified workspace")
+            help="Only update data on specified workspace"),
+        make_option('--workers', dest="workers", type="int", default=1,
+            help="Number of threads used to process the layers concurrently")
         )
 
     def handle(self, **options):
         ignore_errors = options.get('ignore_errors')
         skip_unadvertised = options.get('skip_unadvertised')
         remove_deleted = options.get('remove_deleted') 
+        changed_only = options.get('changed_only')
+        dry_run = options.get('dry_run')
+        progress_file = options.get('progress_file')
+        resume = options.get('resume')
         verbosity = int(options.get('verbosity'))
         user = options.get('user')
         owner = get_valid_user(user)
         workspace = options.get('workspace')
         filter = options.get('filter')
         store = options.get('store')
+        workers = options.get('workers')
+        if dry_run and not remove_deleted:
+            raise CommandError("--dry-run requires --remove-deleted")
 
         if verbosity > 0:
             console = sys.stdout
         else:
             console = None
 
-        output = gs_slurp(ignore_errors, verbosity=verbosity,
-                owner=owner, console=console, workspace=workspace, store=store, filter=filter, skip_unadvertised=skip_unadvertised, remove_deleted=remove_deleted)
+        resume_after = None
+        if resume:
+            if progress_file is None:
+                raise CommandError("--resume requires --progress-file")
+            resume_after = read_checkpoint(progress_file)
+            if verbosity > 0 and resume_after is not None:
+                print "Resuming after layer %s" % resume_after
+
+        progress = open(progress_file, 'a' if resume else 'w') if progress_file else None
+        try:
+            output = gs_slurp(ignore_errors, verbosity=verbosity,
+                    owner=owner, console=console, workspace=workspace, store=store, filter=filter, skip_unadvertised=skip_unadvertised, remove_deleted=remove_deleted,
+                    workers=workers, changed_only=changed_only, dry_run=dry_run, progress=progress, resume_after=resume_after)
+        finally:
+            if progress is not None:
+                progress.close()
 
         if verbosity > 1:
             print "\nDetailed report of failures:"
@@ -91,17 +131,21 @@ class Command(BaseCommand):
                                                   dict_['traceback'])
 
         if verbosity > 0:
+            processed = sum([output['stats'][k] for k in ('created', 'updated', 'failed', 'skipped')])
             print "\n\nFinished processing %d layers in %s seconds.\n" % (
-                                              len(output['layers']), round(output['stats']['duration_sec'],2))
+                                              processed, round(output['stats']['duration_sec'],2))
             print "%d Created layers" % output['stats']['created']
             print "%d Updated layers" % output['stats']['updated']
             print "%d Failed layers" % output['stats']['failed']
+            if changed_only: print "%d Skipped layers" % output['stats']['skipped']
             try:
-                duration_layer = round(output['stats']['duration_sec'] * 1.0 / len(output['layers']),2)
+                duration_layer = round(output['stats']['duration_sec'] * 1.0 / processed,2)
             except ZeroDivisionError:
                 duration_layer = 0
             if len(output) > 0:
                 print "%f seconds per layer" % duration_layer
-            if remove_deleted: print "\n%d Deleted layers" % output['stats']['deleted']
+            if remove_deleted:
+                print "\n%d Deleted layers" % output['stats']['deleted']
+                print "%d Moved layers" % output['stats']['moved']
             
 
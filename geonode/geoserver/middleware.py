@@ -2,7 +2,24 @@ from django.conf import settings
 from django.utils import simplejson as json
 
 from geonode.security.enumerations import AUTHENTICATED_USERS, ANONYMOUS_USERS
-from geonode.geoserver.helpers import ogc_server_settings
+from geonode.geoserver.helpers import ogc_server_settings, catalog_request_cache
+
+
+class CatalogCacheMiddleware(object):
+    """Memoizes the GeoServer REST responses of gs_catalog for the
+       duration of each request, see catalog_request_cache.
+    """
+
+    def process_request(self, request):
+        request._catalog_cache = catalog_request_cache()
+        request._catalog_cache.__enter__()
+
+    def process_response(self, request, response):
+        if hasattr(request, '_catalog_cache'):
+            request._catalog_cache.__exit__(None, None, None)
+            del request._catalog_cache
+        return response
+
 
 class PrintProxyMiddleware(object):
     def process_request(self, request):
@@ -1,3 +1,4 @@
+from django.db import models
 from django.db.models import signals
 from django.conf import settings
 
@@ -10,6 +11,26 @@ from geonode.geoserver.signals import geoserver_post_save
 from geonode.geoserver.signals import geoserver_post_save_map
 from geonode.geoserver.signals import geoserver_pre_save_maplayer
 
+
+class PendingSyncManager(models.Manager):
+
+    def enqueue(self, layer):
+        self.get_or_create(layer=layer)
+
+
+class PendingSync(models.Model):
+    """A layer that could not be synchronized with GeoServer because it
+       was down, it is saved again by replay_pending_syncs.
+    """
+    layer = models.OneToOneField(Layer, related_name='pending_sync')
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = PendingSyncManager()
+
+    def __unicode__(self):
+        return u'%s' % self.layer
+
+
 signals.pre_save.connect(geoserver_pre_save, sender=Layer)
 signals.pre_delete.connect(geoserver_pre_delete, sender=Layer)
 signals.post_save.connect(geoserver_post_save, sender=Layer)
@@ -23,62 +23,62 @@ from lxml import etree
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 from django.template.loader import render_to_string
-from owslib.wcs import WebCoverageService
-from owslib.coverage.wcsBase import ServiceException
 from owslib.util import http_post
 import urllib
 from geonode import GeoNodeException
-from geonode.geoserver.helpers import ogc_server_settings
-from re import sub
+from geonode.geoserver.helpers import ogc_server_settings, describe_coverage
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_EXCLUDE_FORMATS = ['PNG', 'JPEG', 'GIF', 'TIFF']
+
+
+def _wcs_link(wcs_url, identifier, mime, bbox, crs, height, width, version):
+    params = {
+        'service': 'WCS',
+        'version': version,
+        'request': 'GetCoverage',
+        'coverage': identifier,
+        'format': mime,
+    }
+    if bbox:
+        params['bbox'] = ','.join(str(x) for x in bbox)
+    if crs:
+        params['crs'] = crs
+    if height:
+        params['height'] = height
+    if width:
+        params['width'] = width
+    return wcs_url + urllib.urlencode(params)
+
+
 def wcs_links(wcs_url, identifier, bbox=None, crs=None, height=None, width=None,
              exclude_formats=True,
-             quiet=True, version='1.0.0'):
+             quiet=True, version='1.0.0', formats=None):
     #FIXME(Ariel): This would only work for layers marked for public view,
     # what about the ones with permissions enabled?
 
-    try:
-        wcs = WebCoverageService(wcs_url, version=version)
-    except ServiceException, err:
-        err_msg = 'WCS server returned exception: %s' % err
-        if not quiet:
-            logger.warn(err_msg)
-        raise GeoNodeException(err_msg)
-
-    msg = ('Could not create WCS links for layer "%s",'
-           ' it was not in the WCS catalog,'
-           ' the available layers were: "%s"' % (
-            identifier, wcs.contents.keys()))
+    # the links are only formatted, the supported formats are the ones of
+    # the GeoServer coverage if given, else of its DescribeCoverage
+    if formats is None:
+        try:
+            formats = describe_coverage(identifier).formats
+        except GeoNodeException, err:
+            msg = 'Could not create WCS links for layer "%s": %s' % (identifier, err)
+            if not quiet:
+                raise RuntimeError(msg)
+            logger.warn(msg)
+            formats = []
 
     output = []
-    formats = []
-
-    if identifier not in wcs.contents:
-        if not quiet:
-            raise RuntimeError(msg)
-        else:
-            logger.warn(msg)
-    else:
-        coverage = wcs.contents[identifier]
-        formats = coverage.supportedFormats
-        for f in formats:
-            if exclude_formats and f in DEFAULT_EXCLUDE_FORMATS:
-                continue
-            #roundabout, hacky way to accomplish getting a getCoverage url.
-            #nonetheless, it's better than having to load an entire large
-            #coverage just to generate a URL
-            fakeUrl = wcs.getCoverage(identifier=coverage.id, format=f,
-                                      bbox=bbox, crs=crs, height=20,
-                                      width=20).geturl()
-            url = sub(r'(height=)20(\&width=)20', r'\g<1>{0}\g<2>{1}',
-                         fakeUrl).format(height, width)
-            # The outputs are: (ext, name, mime, url)
-            # FIXME(Ariel): Find a way to get proper ext, name and mime
-            # using format as a default for all is not good enough
-            output.append((f, f, f, url))
+    for f in formats:
+        if exclude_formats and f in DEFAULT_EXCLUDE_FORMATS:
+            continue
+        url = _wcs_link(wcs_url, identifier, f, bbox, crs, height, width, version)
+        # The outputs are: (ext, name, mime, url)
+        # FIXME(Ariel): Find a way to get proper ext, name and mime
+        # using format as a default for all is not good enough
+        output.append((f, f, f, url))
     return output
 
 def _wfs_link(wfs_url, identifier, mime, extra_params):
@@ -7,41 +7,47 @@ from django.utils.translation import ugettext, ugettext_lazy as _
 from django.conf import settings
 
 from geonode.geoserver.ows import wcs_links, wfs_links, wms_links
-from geonode.geoserver.helpers import cascading_delete, set_attributes
+from geonode.geoserver.helpers import cascading_delete, cascading_delete_enabled, set_attributes
 from geonode.geoserver.helpers import _user, _password
 from geonode.geoserver.helpers import set_styles, gs_catalog, get_coverage_grid_extent
-from geonode.geoserver.helpers import ogc_server_settings
-from geonode.utils import http_client
+from geonode.geoserver.helpers import ogc_server_settings, catalog_request_cache
+from geonode.geoserver.helpers import wms_capabilities, invalidate_coverage_description
+from geonode.sync import deferred_handler
 from geonode.base.models import Link
-from geonode.base.models import Thumbnail
+from geonode.base.models import ThumbnailJob
 from geonode.people.models import Profile
-from geonode.security.enumerations import AUTHENTICATED_USERS, ANONYMOUS_USERS
 
 from geoserver.catalog import FailedRequestError
 from geoserver.layer import Layer as GsLayer
 
 logger = logging.getLogger("geonode.geoserver.signals")
 
+# the types of the links generated for the layers by geoserver_post_save
+LAYER_LINK_TYPES = ['data', 'image', 'html', 'OGC:WMS', 'OGC:WFS', 'OGC:WCS']
+
 
 def geoserver_pre_delete(instance, sender, **kwargs):
-    """Removes the layer from GeoServer
+    """Removes the layer from GeoServer, unless that is disabled in the
+       current thread, see delete_layers
     """
     #cascading_delete should only be called if ogc_server_settings.BACKEND_WRITE_ENABLED == True
-    if getattr(ogc_server_settings,"BACKEND_WRITE_ENABLED", True):
+    if getattr(ogc_server_settings,"BACKEND_WRITE_ENABLED", True) and cascading_delete_enabled():
         cascading_delete(gs_catalog, instance.typename)
+    wms_capabilities.invalidate(instance.typename)
+    invalidate_coverage_description(instance.typename)
 
 
+@catalog_request_cache()
 def geoserver_pre_save(instance, sender, **kwargs):
-    """Send information to geoserver.
+    """Get information from geoserver.
 
-       The attributes sent include:
+       The attributes retrieved include:
 
-        * Title
-        * Abstract
-        * Name
-        * Keywords
-        * Metadata Links,
-        * Point of Contact name and url
+       * Bounding Box
+       * SRID
+
+       The information of the layer is sent to geoserver after it is
+       saved, see geoserver_post_save.
     """
     url = ogc_server_settings.internal_rest
     try:
@@ -65,41 +71,6 @@ def geoserver_pre_save(instance, sender, **kwargs):
         logger.warn('Could not get geoserver resource for %s' % instance)
         return
 
-    gs_resource.title = instance.title
-    gs_resource.abstract = instance.abstract
-    gs_resource.name= instance.name
-
-    # Get metadata links
-    metadata_links = []
-    for link in instance.link_set.metadata():
-        metadata_links.append((link.name, link.mime, link.url))
-
-    gs_resource.metadata_links = metadata_links
-    #gs_resource should only be called if ogc_server_settings.BACKEND_WRITE_ENABLED == True
-    if getattr(ogc_server_settings,"BACKEND_WRITE_ENABLED", True):
-        gs_catalog.save(gs_resource)
-
-    gs_layer = gs_catalog.get_layer(instance.name)
-
-    if instance.poc and instance.poc.user:
-        gs_layer.attribution = str(instance.poc.user)
-        profile = Profile.objects.get(user=instance.poc.user)
-        gs_layer.attribution_link = settings.SITEURL[:-1] + profile.get_absolute_url()
-        #gs_layer should only be called if ogc_server_settings.BACKEND_WRITE_ENABLED == True
-        if getattr(ogc_server_settings,"BACKEND_WRITE_ENABLED", True):
-            gs_catalog.save(gs_layer)
-
-    """Get information from geoserver.
-
-       The attributes retrieved include:
-
-       * Bounding Box
-       * SRID
-       * Download links (WMS, WCS or WFS and KML)
-       * Styles (SLD)
-    """
-    gs_resource= gs_catalog.get_resource(instance.name)
-
     bbox = gs_resource.latlon_bbox
 
     #FIXME(Ariel): Correct srid setting below
@@ -113,26 +84,53 @@ def geoserver_pre_save(instance, sender, **kwargs):
     instance.bbox_y0 = bbox[2]
     instance.bbox_y1 = bbox[3]
 
-    instance.thumbnail, created = Thumbnail.objects.get_or_create(resourcebase__id=instance.id)
-
 
+@deferred_handler
+@catalog_request_cache()
 def geoserver_post_save(instance, sender, **kwargs):
-    """Save keywords to GeoServer
+    """Synchronizes a saved layer with GeoServer, see sync_layer. If
+       GeoServer is down the layer is queued, to be synchronized once it
+       is back by replay_pending_syncs.
+    """
+    try:
+        sync_layer(instance)
+    except EnvironmentError, e:
+        # Avoid circular imports
+        from geonode.geoserver.models import PendingSync
+
+        msg = ('Could not connect to geoserver at "%s"'
+               'to save information for layer "%s"' % (
+                ogc_server_settings.LOCATION, instance.name.encode('utf-8'))
+              )
+        logger.warn(msg, e)
+        PendingSync.objects.enqueue(instance)
+
+
+def sync_layer(instance):
+    """Send information to geoserver.
+
+       The attributes sent include:
+
+        * Title
+        * Abstract
+        * Name
+        * Keywords
+        * Metadata Links,
+        * Point of Contact name and url
 
        The way keywords are implemented requires the layer
        to be saved to the database before accessing them.
     """
+    # the bounding box, styles or time dimension may have changed
+    wms_capabilities.invalidate(instance.typename)
+    invalidate_coverage_description(instance.typename)
     url = ogc_server_settings.internal_rest
 
     try:
         gs_resource= gs_catalog.get_resource(instance.name)
-    except (FailedRequestError, EnvironmentError) as e:
-        msg = ('Could not connect to geoserver at "%s"'
-               'to save information for layer "%s"' % (
-                ogc_server_settings.LOCATION, instance.name.encode('utf-8'))
-              )
+    except FailedRequestError as e:
+        msg = ('Could not get the geoserver resource of layer "%s"' % instance.name.encode('utf-8'))
         logger.warn(msg, e)
-        # If geoserver is not online, there is no need to continue
         return
 
     # If there is no resource returned it could mean one of two things:
@@ -144,11 +142,31 @@ def geoserver_post_save(instance, sender, **kwargs):
         logger.warn('Could not get geoserver resource for %s' % instance)
         return
 
+    gs_resource.title = instance.title
+    gs_resource.abstract = instance.abstract
+    gs_resource.name= instance.name
     gs_resource.keywords = instance.keyword_list()
+
+    # Get metadata links
+    metadata_links = []
+    for link in instance.link_set.metadata():
+        metadata_links.append((link.name, link.mime, link.url))
+
+    gs_resource.metadata_links = metadata_links
     #gs_resource should only be called if ogc_server_settings.BACKEND_WRITE_ENABLED == True
     if getattr(ogc_server_settings,"BACKEND_WRITE_ENABLED", True):
         gs_catalog.save(gs_resource)
 
+    gs_layer = gs_catalog.get_layer(instance.name)
+
+    if instance.poc and instance.poc.user:
+        gs_layer.attribution = str(instance.poc.user)
+        profile = Profile.objects.get(user=instance.poc.user)
+        gs_layer.attribution_link = settings.SITEURL[:-1] + profile.get_absolute_url()
+        #gs_layer should only be called if ogc_server_settings.BACKEND_WRITE_ENABLED == True
+        if getattr(ogc_server_settings,"BACKEND_WRITE_ENABLED", True):
+            gs_catalog.save(gs_layer)
+
     bbox = gs_resource.latlon_bbox
     dx = float(bbox[1]) - float(bbox[0])
     dy = float(bbox[3]) - float(bbox[2])
@@ -160,139 +178,60 @@ def geoserver_post_save(instance, sender, **kwargs):
 
     # Set download links for WMS, WCS or WFS and KML
 
-    links = wms_links(ogc_server_settings.public_url + 'wms?',
+    links = []
+
+    def add_link(extension, name, mime, url, link_type):
+        links.append(dict(extension=extension, name=name, mime=mime, url=url, link_type=link_type))
+
+    for ext, name, mime, wms_url in wms_links(ogc_server_settings.public_url + 'wms?',
                     instance.typename.encode('utf-8'), instance.bbox_string,
-                    instance.srid, height, width)
-
-    for ext, name, mime, wms_url in links:
-        Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        name=ugettext(name),
-                        defaults=dict(
-                            extension=ext,
-                            url=wms_url,
-                            mime=mime,
-                            link_type='image',
-                           )
-                        )
+                    instance.srid, height, width):
+        add_link(ext, ugettext(name), mime, wms_url, 'image')
 
     if instance.storeType == "dataStore":
-        links = wfs_links(ogc_server_settings.public_url + 'wfs?', instance.typename.encode('utf-8'))
-        for ext, name, mime, wfs_url in links:
+        for ext, name, mime, wfs_url in wfs_links(ogc_server_settings.public_url + 'wfs?',
+                                                 instance.typename.encode('utf-8')):
             if mime=='SHAPE-ZIP':
                 name = 'Zipped Shapefile'
-            Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                            url=wfs_url,
-                            defaults=dict(
-                                extension=ext,
-                                name=name,
-                                mime=mime,
-                                url=wfs_url,
-                                link_type='data',
-                            )
-                        )
+            add_link(ext, name, mime, wfs_url, 'data')
 
     elif instance.storeType == 'coverageStore':
-        #FIXME(Ariel): This works for public layers, does it work for restricted too?
-        # would those end up with no geotiff links, like, forever?
-        permissions = {}
-        permissions['anonymous'] = instance.get_gen_level(ANONYMOUS_USERS)
-        permissions['authenticated'] = instance.get_gen_level(AUTHENTICATED_USERS)
-        instance.set_gen_level(ANONYMOUS_USERS,'layer_readonly')
-
         #Potentially 3 dimensions can be returned by the grid if there is a z
         #axis.  Since we only want width/height, slice to the second dimension
-        covWidth, covHeight = get_coverage_grid_extent(instance)[:2]
-        links = wcs_links(ogc_server_settings.public_url + 'wcs?', instance.typename.encode('utf-8'),
+        covWidth, covHeight = get_coverage_grid_extent(instance, gs_resource)[:2]
+        for ext, name, mime, wcs_url in wcs_links(ogc_server_settings.public_url + 'wcs?',
+                          instance.typename.encode('utf-8'),
                           bbox=gs_resource.native_bbox[:-1],
                           crs=gs_resource.native_bbox[-1],
-                          height=str(covHeight), width=str(covWidth))
-        for ext, name, mime, wcs_url in links:
-            Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                                url=wcs_url,
-                                defaults=dict(
-                                    extension=ext,
-                                    name=name,
-                                    mime=mime,
-                                    link_type='data',
-                                )
-                            )
-                    
-        instance.set_gen_level(ANONYMOUS_USERS,permissions['anonymous'])
-        instance.set_gen_level(AUTHENTICATED_USERS,permissions['authenticated'])
+                          height=str(covHeight), width=str(covWidth),
+                          formats=gs_resource.supported_formats):
+            add_link(ext, name, mime, wcs_url, 'data')
 
     kml_reflector_link_download = ogc_server_settings.public_url + "wms/kml?" + urllib.urlencode({
         'layers': instance.typename.encode('utf-8'),
         'mode': "download"
     })
-
-    Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=kml_reflector_link_download,
-                        defaults=dict(
-                            extension='kml',
-                            name=_("KML"),
-                            mime='text/xml',
-                            link_type='data',
-                        )
-                    )
+    add_link('kml', _("KML"), 'text/xml', kml_reflector_link_download, 'data')
 
     kml_reflector_link_view = ogc_server_settings.public_url + "wms/kml?" + urllib.urlencode({
         'layers': instance.typename.encode('utf-8'),
         'mode': "refresh"
     })
-
-    Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=kml_reflector_link_view,
-                        defaults=dict(
-                            extension='kml',
-                            name="View in Google Earth",
-                            mime='text/xml',
-                            link_type='data',
-                        )
-                    )
+    add_link('kml', "View in Google Earth", 'text/xml', kml_reflector_link_view, 'data')
 
     tile_url = ('%sgwc/service/gmaps?' % ogc_server_settings.public_url +
                 'layers=%s' % instance.typename.encode('utf-8') +
                 '&zoom={z}&x={x}&y={y}' +
                 '&format=image/png8'
                 )
-
-    Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=tile_url,
-                        defaults=dict(
-                            extension='tiles',
-                            name=_("Tiles"),
-                            mime='image/png',
-                            link_type='image',
-                            )
-                        )
-
+    add_link('tiles', _("Tiles"), 'image/png', tile_url, 'image')
 
     wms_path = '%s/%s/wms' % (instance.workspace, instance.name)
     ows_url = urljoin(ogc_server_settings.public_url, wms_path)
-
-    Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=ows_url,
-                        defaults=dict(
-                            extension='html',
-                            name=_("OWS"),
-                            url=ows_url,
-                            mime='text/html',
-                            link_type='OGC:WMS',
-                            )
-                        )
-
+    add_link('html', _("OWS"), 'text/html', ows_url, 'OGC:WMS')
 
     html_link_url = '%s%s' % (settings.SITEURL[:-1], instance.get_absolute_url())
-
-    Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=html_link_url,
-                        defaults=dict(
-                            extension='html',
-                            name=instance.typename,
-                            mime='text/html',
-                            link_type='html',
-                            )
-                        )
+    add_link('html', instance.typename, 'text/html', html_link_url, 'html')
 
     params = {
         'layers': instance.typename.encode('utf-8'),
@@ -307,87 +246,30 @@ def geoserver_post_save(instance, sender, **kwargs):
     p = "&".join("%s=%s"%item for item in params.items())
 
     thumbnail_url = ogc_server_settings.LOCATION + "wms/reflect?" + p
+    add_link('png', _("Remote Thumbnail"), 'image/png', thumbnail_url, 'image')
+
+    # The thumbnail is rendered by the process_thumbnails command
+    ThumbnailJob.objects.enqueue(instance, thumbnail_url)
 
-    Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=thumbnail_url,
-                        defaults=dict(
-                            extension='png',
-                            name=_("Remote Thumbnail"),
-                            mime='image/png',
-                            link_type='image',
-                            )
-                        )
-
-    # Download thumbnail and save it locally.
-    resp, image = http_client.request(thumbnail_url)
-
-    if 'ServiceException' in image or resp.status < 200 or resp.status > 299:
-        msg = 'Unable to obtain thumbnail: %s' % image
-        logger.debug(msg)
-        # Replace error message with None.
-        image = None
-
-    if image is not None:
-        #Clean any orphan Thumbnail before
-        Thumbnail.objects.filter(resourcebase__id=None).delete()
-        thumbnail, created = Thumbnail.objects.get_or_create(resourcebase__id=instance.id)
-        thumbnail.thumb_spec = thumbnail_url
-        thumbnail.save_thumb(image, instance._thumbnail_path())
-
-        Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=settings.SITEURL + instance._thumbnail_path(),
-                        defaults=dict(
-                            extension='png',
-                            name=_("Thumbnail"),
-                            mime='image/png',
-                            link_type='image',
-                            )
-                        )
+    if instance.thumbnail is not None and instance.thumbnail.thumb_file:
+        add_link('png', _("Thumbnail"), 'image/png', urljoin(settings.SITEURL, instance.get_thumbnail_url()), 'image')
 
     ogc_wms_url = ogc_server_settings.public_url + 'wms?'
-    Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=ogc_wms_url,
-                        defaults=dict(
-                            extension='html',
-                            name=instance.name,
-                            url=ogc_wms_url,
-                            mime='text/html',
-                            link_type='OGC:WMS',
-                        )
-                    )
-                        
+    add_link('html', instance.name, 'text/html', ogc_wms_url, 'OGC:WMS')
+
     if instance.storeType == "dataStore":
         ogc_wfs_url = ogc_server_settings.public_url + 'wfs?'
-        Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                            url=ogc_wfs_url,
-                            defaults=dict(
-                                extension='html',
-                                name=instance.name,
-                                url=ogc_wfs_url,
-                                mime='text/html',
-                                link_type='OGC:WFS',
-                            )
-                        )
+        add_link('html', instance.name, 'text/html', ogc_wfs_url, 'OGC:WFS')
 
     if instance.storeType == "coverageStore":
         ogc_wcs_url = ogc_server_settings.public_url + 'wcs?'
-        Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                            url=ogc_wcs_url,
-                            defaults=dict(
-                                extension='html',
-                                name=instance.name,
-                                url=ogc_wcs_url,
-                                mime='text/html',
-                                link_type='OGC:WCS',
-                            )
-                        )
-
-    #remove links that belong to and old address
-
-    for link in instance.link_set.all():
-        if not urlparse(settings.SITEURL).hostname == urlparse(link.url).hostname and not \
-                    urlparse(ogc_server_settings.public_url).hostname == urlparse(link.url).hostname:
-            link.delete()
+        add_link('html', instance.name, 'text/html', ogc_wcs_url, 'OGC:WCS')
+
+    # replace the links generated before and remove the links that belong
+    # to an old address
+    Link.objects.sync(instance.resourcebase_ptr, links, LAYER_LINK_TYPES,
+                      hosts=[urlparse(settings.SITEURL).hostname,
+                             urlparse(ogc_server_settings.public_url).hostname])
 
     #Save layer attributes
     set_attributes(instance)
@@ -433,38 +315,14 @@ def geoserver_post_save_map(instance, sender, **kwargs):
 
     thumbnail_url = ogc_server_settings.LOCATION + "wms/reflect?" + p
 
-    Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=thumbnail_url,
-                        defaults=dict(
-                            extension='png',
-                            name=_("Remote Thumbnail"),
-                            mime='image/png',
-                            link_type='image',
-                            )
-                        )
-
-    # Download thumbnail and save it locally.
-    resp, image = http_client.request(thumbnail_url)
-
-    if 'ServiceException' in image or resp.status < 200 or resp.status > 299:
-        msg = 'Unable to obtain thumbnail: %s' % image
-        logger.debug(msg)
-        # Replace error message with None.
-        image = None
-
-    if image is not None:
-        #Clean any orphan Thumbnail before
-        Thumbnail.objects.filter(resourcebase__id=None).delete()
-        thumbnail, created = Thumbnail.objects.get_or_create(resourcebase__id=instance.id)
-        thumbnail.thumb_spec = thumbnail_url
-        thumbnail.save_thumb(image, instance._thumbnail_path())
-
-        Link.objects.get_or_create(resource= instance.resourcebase_ptr,
-                        url=settings.SITEURL + instance._thumbnail_path(),
-                        defaults=dict(
-                            extension='png',
-                            name=_("Thumbnail"),
-                            mime='image/png',
-                            link_type='image',
-                            )
-                        )
+    links = [dict(extension='png', name=_("Remote Thumbnail"), mime='image/png', url=thumbnail_url,
+                  link_type='image')]
+
+    # The thumbnail is rendered by the process_thumbnails command
+    ThumbnailJob.objects.enqueue(instance, thumbnail_url)
+
+    # the url of the thumbnail changes with its content
+    if instance.thumbnail is not None and instance.thumbnail.thumb_file:
+        links.append(dict(extension='png', name=_("Thumbnail"), mime='image/png',
+                          url=urljoin(settings.SITEURL, instance.get_thumbnail_url()), link_type='image'))
+    Link.objects.sync(instance.resourcebase_ptr, links, ['image'])
@@ -0,0 +1,289 @@
+#########################################################################
+#
+# Copyright (C) 2012 OpenPlans
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""Attribute statistics computed from the layer data itself.
+
+The results have the same keys as the ones of the GeoServer WPS
+gs:Aggregate and gs:Unique processes (see get_attribute_statistics),
+so they can be stored in the Attribute model in the same way.
+"""
+
+import struct
+import logging
+
+from geonode.layers.sketches import AttributeSketch
+
+logger = logging.getLogger(__name__)
+
+# unique values are only kept for fields with at most this many of them
+UNIQUE_VALUES_LIMIT = 10000
+
+
+def _format(value):
+    if value is None:
+        return 'NA'
+    return str(value)
+
+
+def postgis_attribute_statistics(connection, table, fields, unique_limit=UNIQUE_VALUES_LIMIT):
+    """Computes the statistics of the numeric fields of a PostGIS table.
+
+       connection is a Django database connection, all the fields are
+       aggregated by a single statement. It returns a dict with the
+       statistics of each field.
+    """
+    if not fields:
+        return {}
+    qn = connection.ops.quote_name
+    columns = []
+    params = []
+    for field in fields:
+        column = qn(field)
+        columns.extend([
+            'count(%s)' % column,
+            'min(%s)' % column,
+            'max(%s)' % column,
+            'avg(%s)' % column,
+            # the median of the sorted values, percentile_cont needs PostgreSQL 9.4
+            '((array_agg(%s ORDER BY %s))[(count(%s)::int + 1) / 2]'
+            ' + (array_agg(%s ORDER BY %s))[(count(%s)::int + 2) / 2])::float8 / 2' % ((column,) * 6),
+            'stddev_pop(%s)' % column,
+            'sum(%s)' % column,
+            'CASE WHEN count(DISTINCT %s) <= %%s THEN array_to_string(array_agg(DISTINCT %s ORDER BY %s), \',\') END' % (
+                column, column, column),
+        ])
+        params.append(unique_limit)
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT %s FROM %s' % (', '.join(columns), qn(table)), params)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    result = {}
+    for i, field in enumerate(fields):
+        count, min_, max_, average, median, stddev, sum_, unique = row[i * 8:(i + 1) * 8]
+        result[field] = {
+            'Count': count,
+            'Min': _format(min_),
+            'Max': _format(max_),
+            'Average': _format(average),
+            'Median': _format(median),
+            'StandardDeviation': _format(stddev),
+            'Sum': _format(sum_),
+            'unique_values': unique if unique is not None else 'NA',
+        }
+    return result
+
+
+def postgis_estimated_count(connection, table):
+    """Returns the number of rows of a table according to the planner
+       statistics, without scanning it.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [table])
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return int(row[0]) if row is not None else 0
+
+
+def postgis_attribute_sketches(connection, table, fields, chunk_size=10000):
+    """Builds an AttributeSketch of each numeric field of a PostGIS table
+       in a single pass, reading the rows in chunks.
+
+       The rows are fetched by a named, server side, cursor of psycopg2,
+       so only chunk_size of them are in memory at once. It returns a dict
+       with the statistics of each field, see sketch_statistics.
+    """
+    if not fields:
+        return {}
+    qn = connection.ops.quote_name
+    sketches = [AttributeSketch() for field in fields]
+    # makes sure the connection is open
+    connection.cursor().close()
+    cursor = connection.connection.cursor(name='geonode_attribute_sketches')
+    cursor.itersize = chunk_size
+    try:
+        cursor.execute('SELECT %s FROM %s' % (', '.join(qn(field) for field in fields), qn(table)))
+        for row in cursor:
+            for sketch, value in zip(sketches, row):
+                if value is not None:
+                    sketch.add(float(value))
+    finally:
+        cursor.close()
+    return dict((field, sketch_statistics(sketch)) for field, sketch in zip(fields, sketches))
+
+
+def sketch_statistics(sketch):
+    """Returns the statistics of an AttributeSketch, together with the
+       sketch itself as JSON under the 'sketch' key.
+    """
+    result = sketch.statistics()
+    result['sketch'] = sketch.to_json()
+    return result
+
+
+def read_dbf_count(path):
+    """Returns the number of records of a DBF file, from its header.
+    """
+    with open(path, 'rb') as f:
+        return struct.unpack('<4xL', f.read(8))[0]
+
+
+def _read_dbf_header(f):
+    numrecords, headerlen, recordlen = struct.unpack('<4xLHH20x', f.read(32))
+    descriptors = []
+    for i in range((headerlen - 33) // 32):
+        name, ftype, size, decimals = struct.unpack('<11sc4xBB14x', f.read(32))
+        descriptors.append((name.split('\0')[0], ftype, size))
+    f.seek(headerlen)
+    return numrecords, recordlen, descriptors
+
+
+def _dbf_value(value):
+    value = value.strip()
+    # blank or overflowed (*) values are null
+    if not value or '*' in value:
+        return None
+    return float(value)
+
+
+def read_dbf_records(path, fields, chunk_size=10000):
+    """Reads some numeric columns of a DBF file record by record.
+
+       It returns the given fields that are numeric (N or F) columns of the
+       file, and an iterator over the records that are not deleted, tuples
+       with the float value of each of these columns, None if it is null.
+       The file is read chunk_size records at a time.
+    """
+    with open(path, 'rb') as f:
+        numrecords, recordlen, descriptors = _read_dbf_header(f)
+    columns = []
+    slices = []
+    offset = 1
+    for name, ftype, size in descriptors:
+        if name in fields and ftype in 'NF':
+            columns.append(name)
+            slices.append((offset, offset + size))
+        offset += size
+    if offset != recordlen:
+        raise ValueError('Unexpected record length in %s' % path)
+
+    def records():
+        with open(path, 'rb') as f:
+            _read_dbf_header(f)
+            remaining = numrecords
+            while remaining > 0:
+                data = f.read(min(remaining, chunk_size) * recordlen)
+                count = len(data) // recordlen
+                if count == 0:
+                    break
+                remaining -= count
+                for start in xrange(0, count * recordlen, recordlen):
+                    if data[start] == '*':
+                        continue
+                    yield tuple(_dbf_value(data[start + begin:start + end]) for begin, end in slices)
+    return columns, records()
+
+
+def read_dbf_columns(path, fields):
+    """Reads some numeric columns of a DBF file as NumPy arrays.
+
+       It returns a dict with a float array for each of the given fields
+       that is a numeric (N or F) column of the file, the null values and
+       the deleted records are left out.
+    """
+    import numpy
+
+    with open(path, 'rb') as f:
+        numrecords, recordlen, descriptors = _read_dbf_header(f)
+        data = f.read(numrecords * recordlen)
+
+    dtype = numpy.dtype({
+        'names': ['_deleted'] + ['_%d' % i for i in range(len(descriptors))],
+        'formats': ['S1'] + ['S%d' % size for name, ftype, size in descriptors],
+    })
+    if dtype.itemsize != recordlen:
+        raise ValueError('Unexpected record length in %s' % path)
+    records = numpy.frombuffer(data, dtype=dtype, count=len(data) // recordlen)
+    records = records[records['_deleted'] != '*']
+
+    columns = {}
+    for i, (name, ftype, size) in enumerate(descriptors):
+        if name not in fields or ftype not in 'NF':
+            continue
+        values = numpy.char.strip(records['_%d' % i])
+        # blank or overflowed (*) values are null
+        values = values[(values != '') & (numpy.char.find(values, '*') == -1)]
+        columns[name] = values.astype(numpy.float64)
+    return columns
+
+
+def dbf_attribute_statistics(path, fields, unique_limit=UNIQUE_VALUES_LIMIT):
+    """Computes the statistics of the numeric fields of a DBF file.
+
+       It returns a dict with the statistics of each field, see
+       postgis_attribute_statistics.
+    """
+    import numpy
+
+    result = {}
+    for field, values in read_dbf_columns(path, fields).iteritems():
+        stats = {
+            'Count': len(values),
+            'Min': 'NA',
+            'Max': 'NA',
+            'Average': 'NA',
+            'Median': 'NA',
+            'StandardDeviation': 'NA',
+            'Sum': 'NA',
+            'unique_values': 'NA',
+        }
+        if len(values) > 0:
+            stats.update({
+                'Min': _format(values.min()),
+                'Max': _format(values.max()),
+                'Average': _format(values.mean()),
+                'Median': _format(numpy.median(values)),
+                'StandardDeviation': _format(values.std()),
+                'Sum': _format(values.sum()),
+            })
+            unique = numpy.unique(values)
+            if len(unique) <= unique_limit:
+                stats['unique_values'] = ','.join(_format(value) for value in unique)
+        result[field] = stats
+    return result
+
+
+def dbf_attribute_sketches(path, fields):
+    """Builds an AttributeSketch of each numeric field of a DBF file in a
+       single pass, without loading the whole file.
+
+       It returns a dict with the statistics of each field, see
+       sketch_statistics.
+    """
+    columns, records = read_dbf_records(path, fields)
+    sketches = [AttributeSketch() for column in columns]
+    for record in records:
+        for sketch, value in zip(sketches, record):
+            if value is not None:
+                sketch.add(value)
+    return dict((column, sketch_statistics(sketch)) for column, sketch in zip(columns, sketches))
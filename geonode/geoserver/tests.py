@@ -1,4 +1,9 @@
+import os
+import sys
 import json
+import struct
+import tempfile
+from xml.etree.ElementTree import fromstring
 
 from django.core.exceptions import ImproperlyConfigured
 from django.conf import settings
@@ -8,9 +13,53 @@ from django.test.client import Client
 from django.test.utils import override_settings
 from geonode.base.models import ResourceBase
 from geonode.geoserver.helpers import OGC_Servers_Handler
+from geonode.geoserver.helpers import _get_layers_by_name, _slurp_resource, resource_fingerprint
+from geonode.geoserver.helpers import reconcile_layers, delete_layers, cascading_delete_layers, cascading_delete_disabled
+from geonode.geoserver.helpers import progress_line, read_checkpoint
+from geonode.geoserver.helpers import sync_attributes
+from geonode.geoserver.helpers import CachingCatalog, CachingHttp, InvalidatingHttp, catalog_request_cache
+from geonode.geoserver.helpers import CapabilitiesCache, get_coverage_grid_extent
+from geonode.geoserver.helpers import sync_style, sync_styles, style_sync_pass
+from geonode.geoserver.helpers import replay_pending_syncs
+from geonode.geoserver.helpers import workspace_stores, invalidate_stores
+from geonode.geoserver.ows import wcs_links
+from geonode.geoserver.statistics import dbf_attribute_statistics, dbf_attribute_sketches, read_dbf_records
 from geonode.search.populate_search_test_data import create_models
 from geonode.layers.populate_layers_data import create_layer_data
 from geonode.layers.models import Layer
+from geonode.tests.utils import FakeHttp, FakeWorkspace, FakeStore, FakeResource, FakeCatalog
+
+def capabilities(*layers):
+    """A WMS 1.1.0 capabilities document listing layers"""
+    return """<WMT_MS_Capabilities version="1.1.0" xmlns:xlink="http://www.w3.org/1999/xlink">
+        <Service><Name>OGC:WMS</Name><Title>WMS</Title><OnlineResource xlink:href="http://localhost"/></Service>
+        <Capability><Request/><Layer><Title>GeoServer</Title>%s</Layer></Capability>
+        </WMT_MS_Capabilities>""" % ''.join(
+        """<Layer><Name>%s</Name><Title>%s</Title><SRS>EPSG:4326</SRS>
+           <LatLonBoundingBox minx="-10" miny="-5" maxx="10" maxy="5"/>
+           <Extent name="time">2001-01-01T00:00:00Z,2002-01-01T00:00:00Z/2003-01-01T00:00:00Z/P1Y</Extent>
+           <Style><Name>point</Name><Title>Point</Title></Style></Layer>""" % (name, name) for name in layers)
+
+
+def write_dbf():
+    """Writes a DBF file with a text and two numeric fields, and returns its path"""
+    fields = [('NAME', 'C', 10, 0), ('POP', 'N', 8, 0), ('AREA', 'F', 10, 2)]
+    records = [(' ', 'first', '10', '1.5'), (' ', 'second', '30', '2.5'),
+               (' ', 'third', '', '4.0'), ('*', 'deleted', '100', '100')]
+    recordlen = 1 + sum(size for name, ftype, size, decimals in fields)
+    dbf = tempfile.NamedTemporaryFile(suffix='.dbf', delete=False)
+    dbf.write(struct.pack('<4sLHH20x', '\x03\x72\x01\x01', len(records),
+                          32 * len(fields) + 33, recordlen))
+    for name, ftype, size, decimals in fields:
+        dbf.write(struct.pack('<11sc4xBB14x', name, ftype, size, decimals))
+    dbf.write('\r')
+    for record in records:
+        dbf.write(record[0])
+        for value, (name, ftype, size, decimals) in zip(record[1:], fields):
+            dbf.write(value.ljust(size) if ftype == 'C' else value.rjust(size))
+    dbf.close()
+    return dbf.name
+
 
 class LayerTests(TestCase):
 
@@ -70,6 +119,592 @@ class LayerTests(TestCase):
             response_json = json.loads(response.content)
             self.assertEquals(response_json['authorized'], True)
 
+    def test_get_layers_by_name(self):
+        """Verify that gs_slurp looks up the existing layers in chunks
+        """
+        names = [layer.name for layer in Layer.objects.all()]
+        layers = _get_layers_by_name(names + ['n0ch@nc3'], chunk_size=2)
+        self.assertEquals(sorted(layers.keys()), sorted(set(names)))
+
+    def test_slurp_resource_failure(self):
+        """Verify that errors processing a resource are returned, not raised
+        """
+        class BrokenResource(object):
+            name = 'n0ch@nc3'
+
+            @property
+            def store(self):
+                raise ValueError('There is no store')
+
+        status, exc_info = _slurp_resource(BrokenResource(), None)
+        self.assertNotEquals(status, 'created')
+        self.assertEquals(exc_info[0], ValueError)
+        self.assertEquals(Layer.objects.filter(name='n0ch@nc3').count(), 0)
+
+    def test_resource_fingerprint(self):
+        """Verify that the resource fingerprint follows its configuration
+        """
+        resource = FakeResource('fake', title='Title', abstract='Abstract',
+                                latlon_bbox=('-180', '180', '-90', '90', 'EPSG:4326'),
+                                attributes=['the_geom', 'name'],
+                                dom=fromstring('<featureType><name>fake</name></featureType>'))
+        fingerprint = resource_fingerprint(resource)
+        self.assertEquals(len(fingerprint), 40)
+        self.assertEquals(fingerprint, resource_fingerprint(resource))
+        resource.title = 'Another title'
+        self.assertNotEquals(fingerprint, resource_fingerprint(resource))
+        resource.title = 'Title'
+        resource.attributes = ['the_geom']
+        self.assertNotEquals(fingerprint, resource_fingerprint(resource))
+
+    def test_reconcile_layers(self):
+        """Verify the diff between the GeoNode layers and the GeoServer resources
+        """
+        def resource(workspace, store, name):
+            return FakeResource(name, FakeStore(store), FakeWorkspace(workspace))
+
+        kept = resource('geonode', 'shapes', 'kept')
+        moved = resource('geonode', 'postgis', 'moved')
+        created = resource('geonode', 'shapes', 'created')
+        layers = [(1, 'geonode', 'shapes', 'kept'),
+                  (2, 'geonode', 'shapes', 'moved'),
+                  (3, 'geonode', 'shapes', 'deleted'),
+                  (4, 'other', 'shapes', 'created')]
+        diff = reconcile_layers(layers, [kept, moved, created])
+        self.assertEquals(diff.missing, [created])
+        self.assertEquals(diff.extra, [3, 4])
+        self.assertEquals(diff.moved, [(2, moved)])
+
+        # the same name in another workspace is another layer
+        other = resource('other', 'shapes', 'kept')
+        diff = reconcile_layers([(1, 'geonode', 'shapes', 'kept')], [kept, other])
+        self.assertEquals(diff, ([other], [], []))
+        self.assertEquals(reconcile_layers([], []), ([], [], []))
+
+    def test_progress_checkpoint(self):
+        """Verify that the progress lines can be used to resume a run
+        """
+        try:
+            raise ValueError('There is no store')
+        except ValueError:
+            exception_type, error, tb = sys.exc_info()
+        failed = {'name': 'failed', 'status': 'failed', 'exception_type': exception_type,
+                  'error': error, 'traceback': tb}
+        record = json.loads(progress_line('layers', failed))
+        self.assertEquals(record['kind'], 'layers')
+        self.assertEquals(record['error'], 'ValueError: There is no store')
+        self.assertTrue(record['traceback'].startswith('Traceback'))
+
+        progress = tempfile.NamedTemporaryFile(delete=False)
+        try:
+            progress.write(progress_line('layers', {'name': 'first', 'status': 'created'}))
+            progress.write(progress_line('layers', failed))
+            progress.write(progress_line('deleted_layers', {'name': 'deleted', 'status': 'delete_succeeded'}))
+            progress.write('{"kind": "layers", "name": "trunc')
+            progress.close()
+            self.assertEquals(read_checkpoint(progress.name), 'failed')
+        finally:
+            os.unlink(progress.name)
+
+    def test_sync_attributes(self):
+        """Verify that only the changed attributes are written
+        """
+        layer = Layer.objects.all()[0]
+        layer.attribute_set.all().delete()
+        sync_attributes(layer, [['the_geom', 'gml:PointPropertyType'], ['name', 'xsd:string'],
+                                ['code', 'xsd:string']])
+        name = layer.attribute_set.get(attribute='name')
+        name.attribute_label = 'Place name'
+        name.save()
+
+        sync_attributes(layer, [['the_geom', 'gml:PointPropertyType'], ['name', 'xsd:string'],
+                                ['code', 'xsd:long'], ['kind', 'xsd:string']])
+        attributes = dict((la.attribute, la) for la in layer.attribute_set.all())
+        self.assertEquals(sorted(attributes.keys()), ['code', 'kind', 'name', 'the_geom'])
+        self.assertEquals(attributes['name'].pk, name.pk)
+        self.assertEquals(attributes['name'].attribute_label, 'Place name')
+        self.assertEquals(attributes['code'].attribute_type, 'xsd:long')
+        self.assertEquals(attributes['kind'].display_order, 4)
+        self.assertFalse(attributes['the_geom'].visible)
+
+        sync_attributes(layer, [['name', 'xsd:string']])
+        self.assertEquals([la.pk for la in layer.attribute_set.all()], [name.pk])
+
+    def test_dbf_attribute_statistics(self):
+        """Verify the statistics computed from a DBF file
+        """
+        dbf = write_dbf()
+        try:
+            statistics = dbf_attribute_statistics(dbf, ['POP', 'AREA', 'NAME'])
+        finally:
+            os.unlink(dbf)
+
+        self.assertEquals(sorted(statistics.keys()), ['AREA', 'POP'])
+        self.assertEquals(statistics['POP']['Count'], 2)
+        self.assertEquals(statistics['POP']['Sum'], '40.0')
+        self.assertEquals(statistics['POP']['Median'], '20.0')
+        self.assertEquals(statistics['AREA']['Count'], 3)
+        self.assertEquals(statistics['AREA']['Min'], '1.5')
+        self.assertEquals(statistics['AREA']['Max'], '4.0')
+        self.assertEquals(statistics['AREA']['unique_values'], '1.5,2.5,4.0')
+
+    def test_layer_attribute_statistics_rollback(self):
+        """Verify that the datastore connection is rolled back before falling back to the WPS
+        """
+        from geonode.geoserver import helpers
+
+        class FakeConnection(object):
+            rollbacks = 0
+
+            def cursor(self):
+                raise Exception('current transaction is aborted')
+
+            def rollback_unless_managed(self):
+                self.rollbacks += 1
+
+        connection = FakeConnection()
+        layer = Layer.objects.all()[0]
+        connections, get_attribute_statistics = helpers.connections, helpers.get_attribute_statistics
+        helpers.connections = {'datastore': connection}
+        helpers.get_attribute_statistics = lambda name, field: {'Count': 1}
+        helpers.ogc_server_settings.server['DATASTORE'] = 'datastore'
+        layer.store = 'datastore'
+        try:
+            with self.settings(DATABASES=dict(settings.DATABASES, datastore={'NAME': 'datastore'})):
+                statistics = helpers.get_layer_attribute_statistics(layer, ['POP'])
+        finally:
+            helpers.connections, helpers.get_attribute_statistics = connections, get_attribute_statistics
+            helpers.ogc_server_settings.server['DATASTORE'] = settings.OGC_SERVER['default']['DATASTORE']
+        self.assertEquals(statistics, {'POP': {'Count': 1}})
+        self.assertEquals(connection.rollbacks, 1)
+
+    def test_dbf_attribute_sketches(self):
+        """Verify the sketches built from a DBF file, read a few records at a time
+        """
+        dbf = write_dbf()
+        try:
+            columns, records = read_dbf_records(dbf, ['POP', 'AREA', 'NAME'], chunk_size=2)
+            self.assertEquals(columns, ['POP', 'AREA'])
+            self.assertEquals(list(records), [(10.0, 1.5), (30.0, 2.5), (None, 4.0)])
+            statistics = dbf_attribute_sketches(dbf, ['POP', 'AREA', 'NAME'])
+        finally:
+            os.unlink(dbf)
+
+        self.assertEquals(sorted(statistics.keys()), ['AREA', 'POP'])
+        self.assertEquals(statistics['POP']['Count'], 2)
+        self.assertEquals(statistics['POP']['Sum'], '40.0')
+        self.assertEquals(statistics['AREA']['Min'], '1.5')
+        self.assertEquals(statistics['AREA']['Max'], '4.0')
+        self.assertEquals(statistics['AREA']['unique_values'], '1.5,2.5,4.0')
+        self.assertTrue('sketch' in statistics['AREA'])
+
+    def test_caching_catalog(self):
+        """Verify that the catalog memoizes GET requests until something is saved
+        """
+        def get(catalog):
+            return catalog.http.request('http://localhost:8080/geoserver/rest/workspaces.xml')
+
+        http = FakeHttp(lambda uri, method, body, headers: (200, '<workspaces/>'))
+        catalog = CachingCatalog('http://localhost:8080/geoserver/rest')
+        catalog.http = CachingHttp(http, catalog)
+        with catalog_request_cache():
+            get(catalog)
+            response, content = get(catalog)
+        self.assertEquals(response.status, 200)
+        self.assertEquals(content, '<workspaces/>')
+        self.assertEquals(len(http.requests), 1)
+        get(catalog)
+        self.assertEquals(len(http.requests), 2)
+
+        catalog.timeout = 30
+        get(catalog)
+        get(catalog)
+        self.assertEquals(len(http.requests), 3)
+        with catalog_request_cache():
+            catalog.http.request('http://localhost:8080/geoserver/rest/styles/point.sld', 'PUT', '<sld/>')
+            get(catalog)
+        self.assertEquals(http.requests[-1][:2], ('GET', 'http://localhost:8080/geoserver/rest/workspaces.xml'))
+        self.assertEquals(len(http.requests), 5)
+
+        # the writes of the other clients invalidate the cache as well
+        other = InvalidatingHttp(FakeHttp(), catalog)
+        get(catalog)
+        other.request('http://localhost:8080/geoserver/rest/imports', 'POST', '{}')
+        with catalog_request_cache():
+            get(catalog)
+            other.request('http://localhost:8080/geoserver/rest/imports/1', 'DELETE')
+            get(catalog)
+        self.assertEquals(len(http.requests), 7)
+
+        # the headers are part of the key, the conditional requests are not cached
+        xml = {'Accept': 'application/xml'}
+        catalog.http.request('http://localhost:8080/geoserver/rest/workspaces.xml', headers=xml)
+        catalog.http.request('http://localhost:8080/geoserver/rest/workspaces.xml', headers={'accept': 'application/xml'})
+        self.assertEquals(len(http.requests), 8)
+        etag = {'If-None-Match': '"1"'}
+        with catalog_request_cache():
+            catalog.http.request('http://localhost:8080/geoserver/rest/styles/point.sld', headers=etag)
+            catalog.http.request('http://localhost:8080/geoserver/rest/styles/point.sld', headers=etag)
+            get(catalog)
+        self.assertEquals(len(http.requests), 10)
+        self.assertEquals(http.requests[-1][3], etag)
+        # the responses are shared with gs_catalog through the cache
+        catalog.invalidate()
+
+    def test_cache_is_shared(self):
+        """Verify that the responses are only cached across requests in a shared cache
+        """
+        from django.core.cache.backends.locmem import LocMemCache
+        from django.core.cache.backends.dummy import DummyCache
+        from django.core.cache.backends.filebased import FileBasedCache
+        from geonode.geoserver.helpers import cache_is_shared, gs_catalog
+
+        self.assertFalse(cache_is_shared(LocMemCache('geonode', {})))
+        self.assertFalse(cache_is_shared(DummyCache('geonode', {})))
+        self.assertTrue(cache_is_shared(FileBasedCache(tempfile.gettempdir(), {})))
+        # the tests use the local memory cache
+        self.assertEquals(gs_catalog.timeout, None)
+
+    def test_sync_styles(self):
+        """Verify that the SLDs are only fetched and parsed again when they change
+        """
+        from geoserver.catalog import Catalog
+        from geonode.layers.models import Style
+
+        sld = """<StyledLayerDescriptor version="%s" xmlns="http://www.opengis.net/sld">
+            <NamedLayer><Name>points</Name><UserStyle><Name>points</Name><Title>%s</Title></UserStyle></NamedLayer>
+            </StyledLayerDescriptor>"""
+        rest = 'http://localhost:8080/geoserver/rest'
+
+        def respond(uri, method, body, headers):
+            if uri.endswith('styles.xml'):
+                return 200, """<styles><style><name>points</name>
+                    <atom:link xmlns:atom="http://www.w3.org/2005/Atom" href="%s/styles/points.xml"/>
+                    </style></styles>""" % rest
+            etag = '"%d"' % hash(http.body)
+            if headers and headers.get('If-None-Match') == etag:
+                return 304, ''
+            return 200, http.body, {'etag': etag}
+
+        http = FakeHttp(respond)
+        http.body = sld % ('1.0.0', 'Points')
+        catalog = Catalog(rest)
+        catalog.http = http
+        styles = sync_styles(catalog)
+        href = rest + '/styles/points.sld'
+        self.assertEquals(styles.keys(), [href])
+        style = Style.objects.get(sld_url=href)
+        self.assertEquals(style.name, 'points')
+        self.assertEquals((style.sld_title, style.sld_version), ('Points', '1.0.0'))
+        self.assertEquals(style.sld_etag, '"%d"' % hash(http.body))
+
+        self.assertEquals(sync_style(catalog, href).sld_body, http.body)
+        self.assertEquals(http.requests[-1][3], {'If-None-Match': style.sld_etag})
+
+        http.body = sld % ('1.1.0', 'Points of interest')
+        with style_sync_pass():
+            sync_style(catalog, href)
+            sync_style(catalog, href)
+        self.assertEquals(len(http.requests), 4)
+        style = Style.objects.get(sld_url=href)
+        self.assertEquals((style.sld_title, style.sld_version), ('Points of interest', '1.1.0'))
+        self.assertEquals(Style.objects.filter(name='points').count(), 1)
+
+    def test_workspace_stores(self):
+        """Verify that the stores are fetched concurrently once until they are invalidated
+        """
+        from django.core.cache.backends.filebased import FileBasedCache
+        from django.core.cache.backends.locmem import LocMemCache
+        from geonode.geoserver import helpers
+
+        gs_stores = [FakeStore('store%d' % i, 'PostGIS' if i % 2 else 'Shapefile') for i in range(5)]
+        cat = FakeCatalog(stores=gs_stores)
+        workspace = FakeWorkspace('geonode')
+        cache = helpers.cache
+        # the caches of two processes sharing a directory
+        cache_dir = tempfile.mkdtemp()
+        first, second = FileBasedCache(cache_dir, {}), FileBasedCache(cache_dir, {})
+        try:
+            helpers.cache = first
+            stores = workspace_stores(cat, workspace, workers=3)
+            self.assertEquals([s['name'] for s in stores], ['store%d' % i for i in range(5)])
+            self.assertEquals(stores[1], {'name': 'store1', 'type': 'postgis'})
+            self.assertEquals([s.fetches for s in gs_stores], [1] * 5)
+
+            helpers.cache = second
+            self.assertEquals(workspace_stores(cat, workspace), stores)
+            self.assertEquals(sum(s.fetches for s in gs_stores), 5)
+            invalidate_stores()
+            helpers.cache = first
+            workspace_stores(cat, workspace, workers=1)
+            self.assertEquals(sum(s.fetches for s in gs_stores), 10)
+
+            # the private caches of two processes are not used
+            helpers.cache = LocMemCache('first', {})
+            workspace_stores(cat, workspace)
+            helpers.cache = LocMemCache('second', {})
+            invalidate_stores()
+            helpers.cache = LocMemCache('first', {})
+            workspace_stores(cat, workspace)
+            self.assertEquals(sum(s.fetches for s in gs_stores), 20)
+        finally:
+            helpers.cache = cache
+            first.clear()
+
+    def test_workspace_stores_errors(self):
+        """Verify that the stores are not cached when one of them could not be fetched
+        """
+        from django.core.cache.backends.filebased import FileBasedCache
+        from geoserver.catalog import FailedRequestError
+        from geonode.geoserver import helpers
+
+        gs_stores = [FakeStore('store%d' % i) for i in range(3)]
+        gs_stores[1].error = FailedRequestError('store1')
+        cat = FakeCatalog(stores=gs_stores)
+        workspace = FakeWorkspace('geonode')
+        cache = helpers.cache
+        helpers.cache = FileBasedCache(tempfile.mkdtemp(), {})
+        try:
+            for workers in (3, 1):
+                with self.assertRaises(FailedRequestError):
+                    workspace_stores(cat, workspace, workers=workers)
+            gs_stores[1].error = None
+            self.assertEquals([s['name'] for s in workspace_stores(cat, workspace)], ['store0', 'store1', 'store2'])
+            self.assertEquals(gs_stores[1].fetches, 3)
+            # an empty workspace is listed as well
+            invalidate_stores()
+            self.assertEquals(workspace_stores(FakeCatalog(), workspace), [])
+        finally:
+            helpers.cache.clear()
+            helpers.cache = cache
+
+    def test_capabilities_cache(self):
+        """Verify that the WMS capabilities are indexed once and missing layers looked up on their own
+        """
+        def respond(uri, method, body, headers):
+            if '/geonode/new_layer/wms' in uri:
+                return 200, capabilities('new_layer')
+            if '/geonode/' in uri:
+                return 404, ''
+            return 200, capabilities('geonode:layer1', 'geonode:layer2')
+
+        http = FakeHttp(respond)
+        cache = CapabilitiesCache(timeout=None, http=http)
+        layer1 = cache.get('geonode:layer1')
+        self.assertEquals(layer1.boundingBoxWGS84, (-10.0, -5.0, 10.0, 5.0))
+        self.assertEquals(layer1.styles.keys(), ['point'])
+        self.assertTrue('EPSG:4326' in layer1.crsOptions)
+        self.assertEquals(cache.get('geonode:layer2').name, 'geonode:layer2')
+        self.assertEquals(len(http.requests), 1)
+
+        self.assertEquals(cache.get('geonode:new_layer').name, 'geonode:new_layer')
+        cache.get('geonode:new_layer')
+        self.assertEquals(len(http.requests), 2)
+        with self.assertRaises(KeyError):
+            cache.get('geonode:missing')
+        self.assertEquals(len(http.requests), 3)
+
+        cache.invalidate()
+        cache.get('geonode:layer1')
+        self.assertEquals(len(http.requests), 4)
+
+        layer = Layer(typename='geonode:layer1')
+        from geonode.geoserver import helpers
+        original, helpers.wms_capabilities = helpers.wms_capabilities, cache
+        try:
+            self.assertEquals(layer.metadata(), layer1)
+            self.assertEquals(layer.get_time_extent(), ('2001-01-01T00:00:00Z', '2003-01-01T00:00:00Z'))
+        finally:
+            helpers.wms_capabilities = original
+
+    def test_capabilities_errors(self):
+        """Verify that the failed capabilities requests are not cached and the index expires
+        """
+        from geonode import GeoNodeException
+
+        def respond(uri, method, body, headers):
+            if status[0] != 200:
+                return status[0], ''
+            if '/geonode/' in uri:
+                return 200, capabilities('new_layer')
+            return 200, capabilities('geonode:layer1')
+
+        status = [500]
+        http = FakeHttp(respond)
+        cache = CapabilitiesCache(timeout=None, http=http)
+        with self.assertRaises(GeoNodeException):
+            cache.get('geonode:layer1')
+        status[0] = 200
+        self.assertEquals(cache.get('geonode:layer1').name, 'geonode:layer1')
+        self.assertEquals(len(http.requests), 2)
+
+        # a layer is looked up again after its virtual service failed
+        status[0] = 503
+        with self.assertRaises(KeyError):
+            cache.get('geonode:new_layer')
+        status[0] = 200
+        self.assertEquals(cache.get('geonode:new_layer').name, 'geonode:new_layer')
+        self.assertEquals(len(http.requests), 4)
+
+        # the index is downloaded again once it expired
+        cache = CapabilitiesCache(timeout=0, http=http)
+        cache.get('geonode:layer1')
+        cache.get('geonode:layer1')
+        self.assertEquals(len(http.requests), 6)
+
+    def test_coverage_links(self):
+        """Verify that the WCS grid extent and links are built from the coverage resource
+        """
+        coverage = FakeResource('dem', dom=fromstring("""<coverage><name>dem</name><grid dimension="2">
+            <range><low>0 0</low><high>799 599</high></range></grid></coverage>"""))
+
+        layer = Layer(typename='geonode:dem')
+        self.assertEquals(get_coverage_grid_extent(layer, coverage), [800, 600])
+
+        links = wcs_links('http://localhost:8080/geoserver/wcs?', 'geonode:dem', bbox=('0', '10', '0', '5'),
+                          crs='EPSG:4326', height='600', width='800', formats=['GeoTIFF', 'PNG', 'ArcGrid'])
+        self.assertEquals([ext for ext, name, mime, url in links], ['GeoTIFF', 'ArcGrid'])
+        url = links[0][3]
+        self.assertTrue(url.startswith('http://localhost:8080/geoserver/wcs?'))
+        for param in ['request=GetCoverage', 'coverage=geonode%3Adem', 'format=GeoTIFF', 'bbox=0%2C10%2C0%2C5',
+                      'crs=EPSG%3A4326', 'height=600', 'width=800']:
+            self.assertTrue(param in url, param)
+
+    def test_cascading_delete_layers(self):
+        """Verify that the layers are deleted from GeoServer by store, with one catalog reload
+        """
+        store = FakeStore('rasters', resource_type='coverageStore')
+        cat = FakeCatalog([FakeResource(name, store) for name in ['dem', 'slope', 'broken']],
+                          errors=['error'], failures=['broken'])
+        results = cascading_delete_layers(cat, ['dem', 'missing', 'error', 'slope', 'broken'])
+        self.assertEquals([name for name, exc_info in results], ['dem', 'missing', 'error', 'slope', 'broken'])
+        self.assertEquals([name for name, exc_info in results if exc_info is not None], ['error'])
+        self.assertEquals(cat.deleted.count('rasters'), 1)
+        self.assertEquals(cat.deleted[-1], 'rasters')
+        self.assertEquals(cat.reloads, 1)
+
+    def test_delete_layers(self):
+        """Verify that delete_layers removes the layers from GeoNode only
+        """
+        import threading
+        from geonode.geoserver import signals
+
+        deleted = []
+        cascading_delete = signals.cascading_delete
+        signals.cascading_delete = lambda cat, typename: deleted.append(typename)
+        try:
+            layers = list(Layer.objects.all()[:4])
+            results = delete_layers(layers[:3], chunk_size=2)
+            self.assertEquals([layer for layer, exc_info in results], layers[:3])
+            self.assertTrue(all(exc_info is None for layer, exc_info in results))
+            self.assertEquals(Layer.objects.filter(id__in=[layer.id for layer in layers[:3]]).count(), 0)
+            self.assertEquals(deleted, [])
+
+            # the layers deleted by the other threads meanwhile are removed from GeoServer
+            with cascading_delete_disabled():
+                thread = threading.Thread(target=signals.geoserver_pre_delete, args=(layers[3], Layer))
+                thread.start()
+                thread.join()
+            self.assertEquals(deleted, [layers[3].typename])
+        finally:
+            signals.cascading_delete = cascading_delete
+
+    def test_pending_syncs(self):
+        """Verify that the layers saved while GeoServer is down are queued for replay
+        """
+        from geonode.geoserver.models import PendingSync
+
+        layer = Layer.objects.all()[0]
+        PendingSync.objects.all().delete()
+        # there is no GeoServer running during the tests
+        layer.save()
+        layer.save()
+        self.assertEquals(list(PendingSync.objects.values_list('layer', flat=True)), [layer.id])
+        self.assertEquals(replay_pending_syncs(), 0)
+        self.assertEquals(PendingSync.objects.count(), 1)
+
+        health = json.loads(self.client.get(reverse('geoserver_health')).content)
+        self.assertEquals(health['pending_syncs'], 1)
+        self.assertTrue(health['state'] in ('closed', 'open', 'half-open'))
+
+    def test_deletelayers_view(self):
+        """Verify that the bulk delete view reports the status of each layer
+        """
+        layers = list(Layer.objects.all()[:2])
+        url = reverse('deletelayers')
+        c = Client()
+        self.assertEquals(c.post(url, '{}', content_type='application/json').status_code, 302)
+        c.login(username='bobby', password='bob')
+        response = c.post(url, json.dumps({'layers': [layers[0].id, layers[1].typename, 'geonode:missing']}),
+                          content_type='application/json')
+        statuses = dict((l['name'], l['status']) for l in json.loads(response.content)['layers'])
+        self.assertEquals(statuses['geonode:missing'], 'missing')
+        self.assertEquals(statuses[layers[0].typename], 'delete_denied')
+
+        c.login(username=self.user, password=self.passwd)
+        for body in ('[]', '{"layers": "geonode:layer"}', '{"layers": [{"a": 1}]}', '{"layers": [true]}'):
+            self.assertEquals(c.post(url, body, content_type='application/json').status_code, 400)
+        response = c.post(url, json.dumps({'layers': [layers[0].id, layers[1].typename]}),
+                          content_type='application/json')
+        statuses = [l['status'] for l in json.loads(response.content)['layers']]
+        self.assertEquals(statuses, ['delete_succeeded', 'delete_succeeded'])
+        self.assertEquals(Layer.objects.filter(id__in=[layer.id for layer in layers]).count(), 0)
+
+    def test_slurp_dry_run(self):
+        """Verify that a dry run is refused unless it only plans the removal of the deleted layers
+        """
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from geonode.geoserver.helpers import gs_slurp
+
+        count = Layer.objects.count()
+        with self.assertRaises(ValueError):
+            gs_slurp(dry_run=True)
+        with self.assertRaises(CommandError):
+            call_command('updatelayers', dry_run=True, verbosity=0)
+        self.assertEquals(Layer.objects.count(), count)
+
+        # it reports the layers it would create, move and delete
+        from geonode.geoserver import helpers
+        kept, moved = Layer.objects.all()[:2]
+        Layer.objects.filter(id__in=[kept.id, moved.id]).update(workspace='geonode', store='shapes')
+        resources = [FakeResource(name, FakeStore(store), FakeWorkspace('geonode'), enabled='true')
+                     for name, store in [(kept.name, 'shapes'), (moved.name, 'postgis'), ('created', 'shapes')]]
+        original, helpers.Catalog = helpers.Catalog, lambda *args: FakeCatalog(resources)
+        try:
+            output = gs_slurp(remove_deleted=True, dry_run=True, verbosity=0)
+        finally:
+            helpers.Catalog = original
+        self.assertEquals(output['layers'], [])
+        self.assertEquals(output['missing_layers'], [{'name': 'created', 'status': 'create_planned'}])
+        self.assertEquals(output['moved_layers'], [{'name': moved.name, 'status': 'move_planned', 'store': 'postgis'}])
+        self.assertEquals(sorted(info['name'] for info in output['deleted_layers']),
+                          sorted(Layer.objects.exclude(id__in=[kept.id, moved.id]).values_list('name', flat=True)))
+        self.assertEquals(set(info['status'] for info in output['deleted_layers']), set(['delete_planned']))
+        self.assertEquals(Layer.objects.count(), count)
+        self.assertEquals(Layer.objects.get(id=moved.id).store, 'shapes')
+
+    def test_updatelayers_workers(self):
+        """Verify that the number of workers of the updatelayers view is validated and bounded
+        """
+        from geonode.geoserver import views
+
+        def gs_slurp(**kwargs):
+            calls.append(kwargs)
+            return {}
+
+        calls = []
+        url = reverse('updatelayers')
+        c = Client()
+        c.login(username=self.user, password=self.passwd)
+        self.assertEquals(c.get(url, {'workers': 'many'}).status_code, 400)
+        self.assertEquals(c.get(url, {'workers': '0'}).status_code, 400)
+        original, views.gs_slurp = views.gs_slurp, gs_slurp
+        try:
+            self.assertEquals(c.get(url, {'workers': '1000'}).status_code, 200)
+        finally:
+            views.gs_slurp = original
+        self.assertEquals(calls[0]['workers'], settings.OGC_SERVER['default']['MAX_SLURP_WORKERS'])
 
 
 class UtilsTests(TestCase):
@@ -90,6 +725,11 @@ class UtilsTests(TestCase):
                     'WPS_ENABLED': False,
                     'DATASTORE': str(),
                     'GEOGIT_DATASTORE_DIR': str(),
+                    'CAPABILITIES_CACHE_TIMEOUT': 300,
+                    'CIRCUIT_BREAKER_THRESHOLD': 5,
+                    'CIRCUIT_BREAKER_COOLDOWN': 30,
+                    'STORES_CACHE_TIMEOUT': 300,
+                    'MAX_SLURP_WORKERS': 10,
             }
         }
 
@@ -25,6 +25,8 @@ urlpatterns = patterns('geonode.geoserver.views',
             (r'^/rest/layers', 'geoserver_rest_proxy', dict(
             proxy_path='/gs/rest/layers', downstream_path='rest/layers')),
     url(r'^updatelayers/$', 'updatelayers', name="updatelayers"),
+    url(r'^deletelayers/$', 'deletelayers', name="deletelayers"),
+    url(r'^health/$', 'health', name="geoserver_health"),
     url(r'^(?P<layername>[^/]*)/style$', 'layer_style', name="layer_style"),
     url(r'^(?P<layername>[^/]*)/style/upload$','layer_style_upload',name='layer_style_upload'),
     url(r'^(?P<layername>[^/]*)/style/manage$','layer_style_manage',name='layer_style_manage'),
@@ -1,9 +1,10 @@
 import json
 
 from django.utils import simplejson
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.shortcuts import get_object_or_404
+from django.db.models import Q
 from django.conf import settings
 
 from django.contrib.auth.decorators import user_passes_test
@@ -14,8 +15,11 @@ from geonode.layers.models import Layer
 from geonode.geoserver.signals import gs_catalog
 
 from .helpers import get_stores
-from .helpers import gs_slurp
+from .helpers import gs_slurp, iter_slurp, progress_line
+from .helpers import bulk_delete_layers
+from .helpers import geoserver_health
 from .helpers import ogc_server_settings
+from .helpers import http_client
 
 def stores(request, store_type=None):
     stores = get_stores(store_type)
@@ -31,11 +35,80 @@ def updatelayers(request):
     workspace = params.get('workspace', None)
     store = params.get('store',None)
     filter = params.get('filter',None)
-
-    output = gs_slurp(ignore_errors=False, owner=owner, workspace=workspace, store=store, filter=filter)
+    try:
+        workers = int(params.get('workers', 1))
+    except ValueError:
+        return HttpResponse('workers must be a number', status=400)
+    if workers < 1:
+        return HttpResponse('workers must be at least 1', status=400)
+    workers = min(workers, ogc_server_settings.MAX_SLURP_WORKERS)
+    changed_only = params.get('changed_only', 'false').lower() == 'true'
+
+    if params.get('stream', 'false').lower() == 'true':
+        # one JSON line per layer as soon as it is processed, then the stats
+        def stream():
+            stats = {}
+            for kind, info in iter_slurp(stats, ignore_errors=True, owner=owner, workspace=workspace, store=store,
+                                         filter=filter, workers=workers, changed_only=changed_only):
+                yield progress_line(kind, info)
+            yield progress_line('stats', stats)
+        return StreamingHttpResponse(stream(), content_type='application/json')
+
+    output = gs_slurp(ignore_errors=False, owner=owner, workspace=workspace, store=store, filter=filter, workers=workers,
+                      changed_only=changed_only)
     return HttpResponse(simplejson.dumps(output))
 
 
+def health(request):
+    """Reports whether GeoServer is considered up, for monitoring, see
+       geoserver_health.
+    """
+    return HttpResponse(json.dumps(geoserver_health()), mimetype='application/json')
+
+
+@login_required
+@require_POST
+def deletelayers(request):
+    """Deletes several layers at once, see bulk_delete_layers.
+
+       The body is a JSON object with the ids or the typenames of the layers
+       in 'layers'. The response has the status of each of them, the layers
+       the user is not allowed to delete are left alone.
+    """
+    try:
+        requested = json.loads(request.body)['layers']
+    except (ValueError, KeyError, TypeError):
+        requested = None
+    # the keys are looked up in a dict below, they must be ids or typenames
+    if not isinstance(requested, list) or not all(
+            isinstance(l, (int, long, basestring)) and not isinstance(l, bool) for l in requested):
+        return HttpResponse('Expected a JSON object with a list of layer ids or typenames', status=400)
+    ids = [l for l in requested if isinstance(l, (int, long))]
+    typenames = [l for l in requested if isinstance(l, basestring)]
+
+    found = {}
+    for layer in Layer.objects.filter(Q(id__in=ids) | Q(typename__in=typenames)):
+        found[layer.id] = found[layer.typename] = layer
+
+    output = []
+    layers = []
+    for key in requested:
+        layer = found.get(key)
+        if layer is None:
+            output.append({'name': key, 'status': 'missing'})
+        elif not request.user.has_perm('layers.delete_layer', obj=layer):
+            output.append({'name': layer.typename, 'status': 'delete_denied'})
+        elif layer not in layers:
+            layers.append(layer)
+
+    for layer, exc_info in bulk_delete_layers(layers):
+        info = {'name': layer.typename, 'status': 'delete_succeeded' if exc_info is None else 'delete_failed'}
+        if exc_info is not None:
+            info['error'] = str(exc_info[1])
+        output.append(info)
+    return HttpResponse(json.dumps({'layers': output}), mimetype='application/json')
+
+
 @login_required
 @require_POST
 def layer_style(request, layername):
@@ -214,14 +287,12 @@ def geoserver_rest_proxy(request, proxy_path, downstream_path):
     path = strip_prefix(request.get_full_path(), proxy_path)
     url = "".join([ogc_server_settings.LOCATION, downstream_path, path])
 
-    http = httplib2.Http()
-    http.add_credentials(*(ogc_server_settings.credentials))
     headers = dict()
 
     if request.method in ("POST", "PUT") and "CONTENT_TYPE" in request.META:
         headers["Content-Type"] = request.META["CONTENT_TYPE"]
 
-    response, content = http.request(
+    response, content = http_client.request(
         url, request.method,
         body=request.raw_post_data or None,
         headers=headers)
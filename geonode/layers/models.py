@@ -27,6 +27,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.utils.translation import ugettext_lazy as _
 from django.core.urlresolvers import reverse
 
+from geonode.layers.sketches import AttributeSketch
 from geonode.base.models import ResourceBase, ResourceBaseManager, \
     resourcebase_post_save, resourcebase_post_delete
 from agon_ratings.models import OverallRating
@@ -43,6 +44,11 @@ class Style(models.Model):
     sld_version = models.CharField(_('sld version'), max_length=12, null=True, blank=True)
     sld_url = models.CharField(_('sld url'), null = True, max_length=1000)
     workspace = models.CharField(max_length=255, null=True, blank=True)
+    # sha1 of sld_body and validators of the response it was read from,
+    # the SLD is only fetched and parsed again when they change
+    sld_hash = models.CharField(max_length=40, null=True, blank=True)
+    sld_etag = models.CharField(max_length=255, null=True, blank=True)
+    sld_last_modified = models.CharField(max_length=64, null=True, blank=True)
 
     def __str__(self):
         return "%s" % self.name.encode('utf-8')
@@ -85,6 +91,10 @@ class Layer(ResourceBase):
     default_style = models.ForeignKey(Style, related_name='layer_default_style', null=True, blank=True)
     styles = models.ManyToManyField(Style, related_name='layer_styles')
 
+    # hash of the OGC server configuration of the layer when it was last
+    # synchronized, used to skip unchanged layers when updating them.
+    fingerprint = models.CharField(max_length=40, null=True, blank=True)
+
     def is_vector(self):
         return self.storeType == 'dataStore'
 
@@ -140,11 +150,28 @@ class Layer(ResourceBase):
             ows_url = self.link_set.get(name='OWS').url
         return ows_url
 
-    def get_thumbnail_url(self):
-        try:
-            return self.thumbnail.thumb_file.url
-        except:
-            return None
+    def _render_thumbnail(self, spec):
+        from geonode.geoserver.helpers import render_thumbnail
+        return render_thumbnail(spec)
+
+    def metadata(self):
+        """Returns the WMS capabilities of the layer: bounding boxes,
+           SRS, styles and time positions.
+        """
+        from geonode.geoserver.helpers import wms_capabilities
+        return wms_capabilities.get(self.typename)
+
+    def get_time_extent(self):
+        """Returns the first and last time positions of the layer, or
+           (None, None) if it has no time dimension.
+        """
+        positions = self.metadata().timepositions
+        if not positions:
+            return None, None
+        # the positions are either instants or start/end/period intervals
+        start = positions[0].strip().split('/')
+        end = positions[-1].strip().split('/')
+        return start[0], end[1] if len(end) > 1 else end[0]
 
     def maps(self):
         from geonode.maps.models import MapLayer
@@ -192,6 +219,7 @@ class Attribute(models.Model):
     sum = models.CharField(_('sum'), help_text=_('sum value for this field'), max_length=255, blank=False, null=True, unique=False, default='NA')
     unique_values = models.TextField(_('unique values for this field'), null=True, blank=True, default='NA')
     last_stats_updated = models.DateTimeField(_('last modified'), default=datetime.now, help_text=_('date when attribute statistics were last updated')) # passing the method itself, not
+    sketch = models.TextField(_('sketch'), help_text=_('approximate statistics of the values of large layers'), null=True, blank=True)
 
     objects = AttributeManager()
 
@@ -201,6 +229,29 @@ class Attribute(models.Model):
     def unique_values_as_list(self):
         return self.unique_values.split(',')
 
+    def get_sketch(self):
+        """Returns the AttributeSketch of the attribute, if there is one.
+        """
+        if self.sketch:
+            return AttributeSketch.from_json(self.sketch)
+
+    def top_values_as_list(self, n=None):
+        """Most frequent values, the equivalent of unique_values_as_list
+           for the attributes with a sketch.
+        """
+        sketch = self.get_sketch()
+        if sketch is None:
+            return self.unique_values_as_list()
+        return [str(value) for value, count in sketch.topk.top(n)]
+
+    def percentile(self, q):
+        """Estimated value below which there are q percent of the values,
+           None if the attribute has no sketch.
+        """
+        sketch = self.get_sketch()
+        if sketch is not None:
+            return sketch.digest.quantile(q / 100.0)
+
 
 def pre_save_layer(instance, sender, **kwargs):
     if kwargs.get('raw', False):
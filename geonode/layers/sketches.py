@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+#########################################################################
+#
+# Copyright (C) 2012 OpenPlans
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""Approximate statistics of the values of a layer attribute.
+
+The sketches are built in a single pass over the values, take a bounded
+amount of memory whatever the number of features and can be merged, so
+the data can be read in chunks or in parallel. AttributeSketch groups
+them and is stored as JSON in the Attribute model.
+"""
+
+import math
+import json
+import zlib
+import base64
+import struct
+import hashlib
+from bisect import bisect_left
+
+
+class HyperLogLog(object):
+    """Estimates the number of distinct values, with a standard error
+       of about 1.04 / sqrt(2 ** p).
+    """
+
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value):
+        x = struct.unpack('<Q', hashlib.md5(repr(value)).digest()[:8])[0]
+        j = x & (self.m - 1)
+        w = x >> self.p
+        rank = 64 - self.p - w.bit_length() + 1
+        if rank > self.registers[j]:
+            self.registers[j] = rank
+
+    def merge(self, other):
+        for j, rank in enumerate(other.registers):
+            if rank > self.registers[j]:
+                self.registers[j] = rank
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count('\0')
+        if estimate <= 2.5 * self.m and zeros:
+            # small range correction
+            estimate = self.m * math.log(float(self.m) / zeros)
+        return int(round(estimate))
+
+    def to_dict(self):
+        return {'p': self.p, 'registers': base64.b64encode(zlib.compress(str(self.registers)))}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['p'], zlib.decompress(base64.b64decode(data['registers'])))
+
+
+class TDigest(object):
+    """Estimates the quantiles of the values with a merging t-digest.
+
+       The values are kept as a sorted list of (mean, weight) centroids,
+       small at the tails and bigger in the middle of the distribution,
+       there are about compression of them.
+    """
+
+    def __init__(self, compression=100, centroids=None, min=None, max=None):
+        self.compression = compression
+        self.centroids = [tuple(c) for c in centroids or []]
+        self.min = min
+        self.max = max
+        self._buffer = []
+
+    def add(self, value, weight=1):
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self._buffer.append((value, weight))
+        if len(self._buffer) >= 10 * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        other._compress()
+        for bound in (other.min, other.max):
+            if bound is not None:
+                self.min = bound if self.min is None else min(self.min, bound)
+                self.max = bound if self.max is None else max(self.max, bound)
+        self._buffer.extend(other.centroids)
+        self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        total = float(sum(weight for mean, weight in points))
+        centroids = []
+        cumulative = 0
+        mean, weight = points[0]
+        for m, w in points[1:]:
+            q = (cumulative + weight + w / 2.0) / total
+            if weight + w <= max(1, 4 * total * q * (1 - q) / self.compression):
+                mean = (mean * weight + m * w) / float(weight + w)
+                weight += w
+            else:
+                centroids.append((mean, weight))
+                cumulative += weight
+                mean, weight = m, w
+        centroids.append((mean, weight))
+        self.centroids = centroids
+
+    @property
+    def count(self):
+        self._compress()
+        return sum(weight for mean, weight in self.centroids)
+
+    def _positions(self):
+        # the values of each centroid are assumed to be spread around its
+        # mean, so the distribution is interpolated between the centroid
+        # means, and between the extreme values at the tails.
+        positions = [(0, self.min)]
+        cumulative = 0
+        for mean, weight in self.centroids:
+            positions.append((cumulative + weight / 2.0, mean))
+            cumulative += weight
+        positions.append((cumulative, self.max))
+        return positions
+
+    def quantile(self, q):
+        """Returns the estimated value below which there is a fraction q of the values.
+        """
+        self._compress()
+        if not self.centroids:
+            return None
+        positions = self._positions()
+        target = q * positions[-1][0]
+        i = bisect_left([position for position, value in positions], target)
+        if i == 0:
+            return self.min
+        if i >= len(positions):
+            return self.max
+        (p0, v0), (p1, v1) = positions[i - 1], positions[i]
+        if p1 == p0:
+            return v1
+        return v0 + (v1 - v0) * (target - p0) / (p1 - p0)
+
+    def cdf(self, x):
+        """Returns the estimated fraction of the values lower than or equal to x.
+        """
+        self._compress()
+        if not self.centroids or x < self.min:
+            return 0.0
+        if x >= self.max:
+            return 1.0
+        positions = self._positions()
+        i = bisect_left([value for position, value in positions], x)
+        (p0, v0), (p1, v1) = positions[i - 1], positions[i]
+        if v1 == v0:
+            return p1 / float(positions[-1][0])
+        return (p0 + (p1 - p0) * (x - v0) / float(v1 - v0)) / positions[-1][0]
+
+    def histogram(self, bins=10):
+        """Returns the estimated number of values in bins of equal width
+           between the minimum and the maximum.
+        """
+        if not self.count:
+            return []
+        width = (self.max - self.min) / float(bins)
+        total = self.count
+        edges = [self.cdf(self.min + i * width) for i in range(1, bins)]
+        edges = [0.0] + edges + [1.0]
+        return [int(round((edges[i + 1] - edges[i]) * total)) for i in range(bins)]
+
+    def to_dict(self):
+        self._compress()
+        return {'compression': self.compression, 'centroids': self.centroids,
+                'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['compression'], data['centroids'], data['min'], data['max'])
+
+
+class TopK(object):
+    """Finds the most frequent values with the Misra-Gries algorithm.
+
+       The counters underestimate the frequencies by at most the number
+       of values divided by size. As long as there were no more than size
+       distinct values, the counters are exact.
+    """
+
+    def __init__(self, size=50, counters=None, exact=True):
+        self.size = size
+        self.counters = dict(counters or {})
+        self.exact = exact
+
+    def add(self, value, count=1):
+        if value in self.counters or len(self.counters) < self.size:
+            self.counters[value] = self.counters.get(value, 0) + count
+        else:
+            self._decrement(count)
+
+    def _decrement(self, count):
+        self.exact = False
+        for value in self.counters.keys():
+            self.counters[value] -= count
+            if self.counters[value] <= 0:
+                del self.counters[value]
+
+    def merge(self, other):
+        self.exact = self.exact and other.exact
+        for value, count in other.counters.iteritems():
+            self.counters[value] = self.counters.get(value, 0) + count
+        if len(self.counters) > self.size:
+            self.exact = False
+            counts = sorted(self.counters.values(), reverse=True)
+            self._decrement(counts[self.size])
+
+    def top(self, n=None):
+        """Returns the (value, count) pairs of the most frequent values.
+        """
+        items = sorted(self.counters.iteritems(), key=lambda item: (-item[1], item[0]))
+        return items[:n] if n is not None else items
+
+    def to_dict(self):
+        return {'size': self.size, 'counters': self.top(), 'exact': self.exact}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['size'], data['counters'], data['exact'])
+
+
+class AttributeSketch(object):
+    """All the sketches of the values of an attribute, together with
+       the exact count, sum and standard deviation.
+    """
+
+    def __init__(self, hll=None, digest=None, topk=None, count=0, sum=0.0, mean=0.0, m2=0.0):
+        self.hll = hll or HyperLogLog()
+        self.digest = digest or TDigest()
+        self.topk = topk or TopK()
+        self.count = count
+        self.sum = sum
+        # running mean and sum of squared differences (Welford)
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        if value is None:
+            return
+        self.hll.add(value)
+        self.digest.add(value)
+        self.topk.add(value)
+        self.count += 1
+        self.sum += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        self.hll.merge(other.hll)
+        self.digest.merge(other.digest)
+        self.topk.merge(other.topk)
+        count = self.count + other.count
+        if count:
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.count * other.count / count
+            self.mean += delta * other.count / count
+        self.count = count
+        self.sum += other.sum
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.m2 / self.count) if self.count else None
+
+    def distinct(self):
+        if self.topk.exact:
+            return len(self.topk.counters)
+        return self.hll.count()
+
+    def statistics(self):
+        """Returns the statistics in the format of get_attribute_statistics.
+        """
+        def format(value):
+            return 'NA' if value is None else str(value)
+        return {
+            'Count': self.count,
+            'Min': format(self.digest.min),
+            'Max': format(self.digest.max),
+            'Average': format(self.mean if self.count else None),
+            'Median': format(self.digest.quantile(0.5)),
+            'StandardDeviation': format(self.stddev),
+            'Sum': format(self.sum if self.count else None),
+            # only known when every value fits in the top-k counters
+            'unique_values': ','.join(format(value) for value in sorted(self.topk.counters))
+            if self.topk.exact and self.count else 'NA',
+        }
+
+    def to_json(self):
+        return json.dumps({
+            'hll': self.hll.to_dict(),
+            'digest': self.digest.to_dict(),
+            'topk': self.topk.to_dict(),
+            'histogram': self.digest.histogram(),
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.mean,
+            'm2': self.m2,
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        return cls(HyperLogLog.from_dict(data['hll']), TDigest.from_dict(data['digest']),
+                   TopK.from_dict(data['topk']), data['count'], data['sum'], data['mean'], data['m2'])
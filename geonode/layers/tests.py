@@ -42,6 +42,7 @@ import geonode.layers.models
 from geonode import GeoNodeException
 
 from geonode.layers.models import Layer, Style
+from geonode.layers.sketches import AttributeSketch
 from geonode.layers.forms import JSONField, LayerUploadForm
 from geonode.layers.utils import layer_type, get_files, get_valid_name, \
                                 get_valid_layer_name
@@ -229,6 +230,7 @@ class LayersTest(TestCase):
         c = Client()
         response = c.get(reverse('layer_acls'), **valid_auth_headers)
         response_json = json.loads(response.content)
+        response_json.pop('version')
         self.assertEquals(expected_result, response_json)
 
         # Test that requesting when supplying invalid credentials returns the appropriate error code
@@ -247,6 +249,69 @@ class LayersTest(TestCase):
 
         # TODO Lots more to do here once jj0hns0n understands the ACL system better
 
+    def test_layer_acls_versions(self):
+        """ Verify that layer_acls honours the ETags and lists the changes since a version
+        """
+        auth_headers = {
+            'HTTP_AUTHORIZATION': 'basic ' + base64.b64encode('bobby:bob'),
+        }
+        c = Client()
+        response = c.get(reverse('layer_acls'), **auth_headers)
+        version = json.loads(response.content)['version']
+        etag = response['ETag']
+
+        response = c.get(reverse('layer_acls'), HTTP_IF_NONE_MATCH=etag, **auth_headers)
+        self.assertEquals(response.status_code, 304)
+
+        # nothing changed since the current version
+        response = c.get(reverse('layer_acls'), {'since': version}, **auth_headers)
+        response_json = json.loads(response.content)
+        self.assertEquals(response_json['since'], version)
+        self.assertEquals([], response_json['ro'] + response_json['rw'] + response_json['none'])
+
+        layer = Layer.objects.get(typename='geonode:layer2')
+        layer.set_permissions({'anonymous': '_none', 'authenticated': '_none', 'users': []})
+
+        response = c.get(reverse('layer_acls'), HTTP_IF_NONE_MATCH=etag, **auth_headers)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotIn('geonode:layer2', json.loads(response.content)['ro'])
+
+        response = c.get(reverse('layer_acls'), {'since': version}, **auth_headers)
+        response_json = json.loads(response.content)
+        self.assertTrue(response_json['version'] > version)
+        self.assertEquals(['geonode:layer2'], response_json['none'])
+        self.assertEquals([], response_json['ro'] + response_json['rw'])
+
+        # a change of the groups may change the permissions on any layer
+        from geonode.security.models import invalidate_all_permissions
+        invalidate_all_permissions()
+        response = c.get(reverse('layer_acls'), {'since': version}, **auth_headers)
+        self.assertNotIn('since', json.loads(response.content))
+
+    def test_layer_acls_groups(self):
+        """ Verify that layer_acls reads the groups of the user along with the permissions
+        """
+        from geonode.contrib.groups.models import Group, GroupMember
+        from geonode.security.models import AccessControlChange
+
+        auth_headers = {
+            'HTTP_AUTHORIZATION': 'basic ' + base64.b64encode('bobby:bob'),
+        }
+        layer = Layer.objects.get(typename='geonode:layer2')
+        layer.set_permissions({'anonymous': '_none', 'authenticated': '_none', 'users': []})
+        group = Group.objects.create(title='Private', slug='private', access='private')
+        layer.set_group_level(group, layer.LEVEL_READ)
+        c = Client()
+        response = c.get(reverse('layer_acls'), **auth_headers)
+        self.assertNotIn('geonode:layer2', json.loads(response.content)['ro'])
+
+        # as written by another process, which only records the change
+        bobby = User.objects.get(username='bobby')
+        GroupMember.objects.bulk_create([GroupMember(group=group, user=bobby, role='member')])
+        AccessControlChange.objects.record()
+        response = c.get(reverse('layer_acls'), **auth_headers)
+        self.assertIn('geonode:layer2', json.loads(response.content)['ro'])
+
     def test_resolve_user(self):
         """Verify that the resolve_user view is behaving as expected
         """
@@ -874,3 +939,33 @@ class LayersTest(TestCase):
         response = c.get(reverse('layer_detail', args=(layer.typename,)))
         self.assertEquals(response.status_code, 200)
 
+
+    def test_attribute_sketch(self):
+        """Verify the approximate statistics stored in an attribute sketch
+        """
+        first, second = AttributeSketch(), AttributeSketch()
+        for value in range(1, 5001):
+            first.add(value)
+        for value in range(5001, 10001):
+            second.add(value)
+        first.merge(second)
+
+        self.assertEquals(first.count, 10000)
+        self.assertAlmostEquals(first.digest.quantile(0.5), 5000.5, delta=50)
+        self.assertAlmostEquals(first.digest.quantile(0.9), 9000.5, delta=50)
+        self.assertAlmostEquals(first.hll.count(), 10000, delta=500)
+        self.assertEquals(first.statistics()['unique_values'], 'NA')
+        self.assertEquals(sum(first.digest.histogram(bins=4)), 10000)
+
+        layer = Layer.objects.all()[0]
+        attribute = layer.attribute_set.all()[0]
+        self.assertIsNone(attribute.percentile(50))
+        sketch = AttributeSketch()
+        for value in [1, 2, 2, 3, 3, 3]:
+            sketch.add(value)
+        attribute.sketch = sketch.to_json()
+        attribute.save()
+        attribute = layer.attribute_set.get(pk=attribute.pk)
+        self.assertEquals(attribute.top_values_as_list(2), ['3', '2'])
+        self.assertEquals(attribute.percentile(50), 2.5)
+        self.assertEquals(sketch.statistics()['unique_values'], '1,2,3')
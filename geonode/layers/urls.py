@@ -40,5 +40,4 @@ urlpatterns = patterns(
         name="layer_replace"),
     #url(r'^api/batch_permissions/?$', 'batch_permissions',
     #    name='batch_permssions'),
-    #url(r'^api/batch_delete/?$', 'batch_delete', name='batch_delete'),
 )
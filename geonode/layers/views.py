@@ -19,6 +19,7 @@
 #########################################################################
 
 import os
+import hashlib
 import logging
 import shutil
 
@@ -26,7 +27,7 @@ from django.contrib.auth import authenticate, get_backends as get_auth_backends
 from django.contrib.auth.decorators import login_required
 from django.core.urlresolvers import reverse
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, HttpResponseNotModified
 from django.shortcuts import render_to_response
 from django.conf import settings
 from django.template import RequestContext
@@ -35,9 +36,13 @@ from django.utils import simplejson as json
 from django.utils.html import escape
 from django.template.defaultfilters import slugify
 from django.shortcuts import get_object_or_404
+from django.core.cache import cache
+from django.contrib.contenttypes.models import ContentType
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.forms.models import inlineformset_factory
 
 from geonode.utils import _get_basic_auth_info
+from geonode.sync import defer_sync
 from geonode.layers.forms import LayerForm, LayerUploadForm, NewLayerUploadForm, LayerAttributeForm
 from geonode.layers.models import Layer, Attribute
 
@@ -48,6 +53,7 @@ from geonode.layers.utils import save
 from geonode.utils import resolve_object
 from geonode.people.forms import ProfileForm, PocForm
 from geonode.security.views import _perms_info_json
+from geonode.security.models import AccessControlChange
 from geonode.documents.models import get_related_documents
 
 
@@ -204,6 +210,7 @@ def layer_detail(request, layername, template='layers/layer_detail.html'):
 
 
 @login_required
+@defer_sync()
 def layer_metadata(request, layername, template='layers/layer_metadata.html'):
     layer = _resolve_layer(request, layername, 'layers.change_layer', _PERMISSION_MSG_METADATA)
     layer_attribute_set = inlineformset_factory(Layer, Attribute, extra=0, form=LayerAttributeForm, )
@@ -281,6 +288,7 @@ def layer_metadata(request, layername, template='layers/layer_metadata.html'):
 
 
 @login_required
+@defer_sync()
 def layer_change_poc(request, ids, template = 'layers/layer_change_poc.html'):
     layers = Layer.objects.filter(id__in=ids.split('_'))
     if request.method == 'POST':
@@ -448,7 +456,11 @@ def layer_acls(request):
     """
     returns json-encoded lists of layer identifiers that
     represent the sets of read-write and read-only layers
-    for the currently authenticated user.
+    for the currently authenticated user, with the version
+    of the permissions they come from. Given a version in
+    the since parameter, only the layers whose permissions
+    changed afterwards are listed, the ones no longer
+    readable under 'none', unless they all may have changed.
     """
 
     # the layer_acls view supports basic auth, and a special
@@ -480,6 +492,58 @@ def layer_acls(request):
             return HttpResponse(_("Bad HTTP Authorization Credentials."),
                                 status=401,
                                 mimetype="text/plain")
+    result = {
+        'name': acl_user.username,
+        'is_superuser':  acl_user.is_superuser,
+        'is_anonymous': acl_user.is_anonymous(),
+    }
+    if acl_user.is_authenticated():
+        result['fullname'] = acl_user.profile.name
+        result['email'] = acl_user.profile.email
+
+    # the lists only change with the version of the access control entries,
+    # clients that know one may ask for the changes since then
+    change = AccessControlChange.objects.current()
+    version = change.id if change is not None else 0
+    # the ids may be reused after a rollback, not with the same time
+    stamp = '%s:%s' % (version, change.created.isoformat() if change is not None else '')
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        since = 0
+    etag = '"%s"' % hashlib.md5(json.dumps([stamp, since, result], sort_keys=True)).hexdigest()
+    if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        layer_ids = None
+        if since:
+            layer_ids = AccessControlChange.objects.changed_since(since, ContentType.objects.get_for_model(Layer))
+        if layer_ids is None:
+            principal = acl_user.id if acl_user.is_authenticated() else 'anonymous'
+            key = 'layer_acls:%s:%s' % (principal, stamp)
+            acls = cache.get(key)
+            if acls is None:
+                acls = _layer_acls(acl_user)
+                cache.set(key, acls, getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 600))
+        else:
+            acls = _layer_acls(acl_user, layer_ids)
+            result['since'] = since
+        result.update(acls)
+        result['version'] = version
+        response = HttpResponse(json.dumps(result), mimetype="application/json")
+
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, must_revalidate=True)
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+    return response
+
+
+def _layer_acls(acl_user, layer_ids=None):
+    """
+    returns the typenames of the layers the user can read and write, and
+    read only. If layer_ids is given, only those layers are considered,
+    and the ones the user cannot read are returned as well.
+    """
     all_readable = set()
     all_writable = set()
     for bck in get_auth_backends():
@@ -490,22 +554,22 @@ def layer_acls(request):
             all_writable.update(bck.objects_with_perm(acl_user,
                                                       'layers.change_layer',
                                                       Layer))
-    read_only = [x for x in all_readable if x not in all_writable]
-    read_write = [x for x in all_writable if x in all_readable]
-
-    read_only = [x[0] for x in Layer.objects.filter(id__in=read_only).values_list('typename').all()]
-    read_write = [x[0] for x in Layer.objects.filter(id__in=read_write).values_list('typename').all()]
-
-    result = {
-        'rw': read_write,
-        'ro': read_only,
-        'name': acl_user.username,
-        'is_superuser':  acl_user.is_superuser,
-        'is_anonymous': acl_user.is_anonymous(),
-    }
-    if acl_user.is_authenticated():
-        result['fullname'] = acl_user.profile.name
-        result['email'] = acl_user.profile.email
-
-    return HttpResponse(json.dumps(result), mimetype="application/json")
+    if layer_ids is not None:
+        all_readable &= layer_ids
+        all_writable &= layer_ids
+    read_only = all_readable - all_writable
+    read_write = all_writable & all_readable
+
+    acls = {'rw': [], 'ro': []}
+    if layer_ids is not None:
+        acls['none'] = []
+    layers = Layer.objects.filter(id__in=layer_ids if layer_ids is not None else all_readable)
+    for layer_id, typename in layers.values_list('id', 'typename'):
+        if layer_id in read_write:
+            acls['rw'].append(typename)
+        elif layer_id in read_only:
+            acls['ro'].append(typename)
+        else:
+            acls['none'].append(typename)
+    return acls
 
@@ -200,11 +200,9 @@ class Map(ResourceBase, GXPMapBase):
         return reverse('geonode.maps.views.map_detail', None, [str(self.id)])
 
 
-    def get_thumbnail_url(self):
-        try:
-            return self.thumbnail.thumb_file.url
-        except:
-            return None
+    def _render_thumbnail(self, spec):
+        from geonode.geoserver.helpers import render_thumbnail
+        return render_thumbnail(spec)
 
     class Meta:
         # custom permissions,
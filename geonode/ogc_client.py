@@ -0,0 +1,263 @@
+#########################################################################
+#
+# Copyright (C) 2012 OpenPlans
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""HTTP client for the requests to the OGC servers.
+
+httplib2.Http instances are not thread-safe, so OGCClient keeps a pool of
+them and lends one to each request. It has the same request() interface,
+so it can be used wherever an httplib2.Http is expected, including as the
+http attribute of a gsconfig Catalog.
+
+A CircuitBreaker makes the requests to a server that keeps failing fail
+right away, instead of each of them waiting for the timeout. Its state is
+kept in the Django cache: it is shared by the processes only when CACHES
+uses a shared backend, each process has its own with the local memory one.
+"""
+
+import time
+import errno
+import socket
+import httplib
+import logging
+import threading
+
+from urlparse import urlparse
+
+import httplib2
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def _default_timeout():
+    return getattr(settings, 'OGC_SERVER', {}).get('default', {}).get('TIMEOUT')
+
+
+class CircuitOpenError(socket.error):
+    """Raised instead of sending a request to a server whose circuit is
+       open. Like a refused connection, it means that the server is down.
+    """
+
+    def __init__(self, host):
+        super(CircuitOpenError, self).__init__(errno.ECONNREFUSED, 'The circuit of %s is open' % host)
+        self.host = host
+
+
+class CircuitBreaker(object):
+    """Health of the OGC servers, kept in the Django cache.
+
+       After threshold failures of the requests to a host within window
+       seconds, its circuit opens: the requests fail right away with a
+       CircuitOpenError for cooldown seconds. Then a single request is let
+       through to probe the host, and the circuit closes again if it
+       succeeds. The processes only share the circuits, and the probe,
+       when the cache backend is shared, e.g. memcached; with the local
+       memory cache each process trips and probes on its own.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=5, cooldown=30, window=60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.window = window
+
+    def _key(self, name, host):
+        return 'ogc_circuit:%s:%s' % (name, host)
+
+    def allow(self, host):
+        opened = cache.get(self._key('opened', host))
+        if opened is None:
+            return True
+        if time.time() - opened < self.cooldown:
+            return False
+        return cache.add(self._key('probe', host), True, self.cooldown)
+
+    def success(self, host):
+        # a single round trip on the common path, a closed circuit
+        state = cache.get_many([self._key('failures', host), self._key('opened', host)])
+        if state.get(self._key('failures', host)) or state.get(self._key('opened', host)) is not None:
+            cache.delete_many([self._key(name, host) for name in ('failures', 'opened', 'probe')])
+            logger.info('The circuit of %s is closed', host)
+
+    def failure(self, host):
+        key = self._key('failures', host)
+        cache.add(key, 0, self.window)
+        try:
+            failures = cache.incr(key)
+        except ValueError:
+            # expired in the meantime
+            cache.add(key, 1, self.window)
+            failures = 1
+        opened = cache.get(self._key('opened', host))
+        # a failed probe opens it again for another cooldown
+        if failures >= self.threshold or opened is not None:
+            if opened is None:
+                logger.warn('The circuit of %s is open after %d failures', host, failures)
+            cache.set(self._key('opened', host), time.time(), self.cooldown * 10)
+            cache.delete(self._key('probe', host))
+
+    def state(self, host):
+        """Returns a dict with the state, the number of recent failures and
+           the time the circuit of a host opened, if it is not closed.
+        """
+        opened = cache.get(self._key('opened', host))
+        if opened is None:
+            state = self.CLOSED
+        elif time.time() - opened < self.cooldown:
+            state = self.OPEN
+        else:
+            state = self.HALF_OPEN
+        return {
+            'state': state,
+            'failures': cache.get(self._key('failures', host)) or 0,
+            'opened': opened,
+        }
+
+
+class OGCClient(object):
+    """Thread-safe, httplib2 compatible HTTP client.
+
+       Each pooled httplib2.Http keeps its connections alive between the
+       requests. At most max_per_host requests to the same host run at the
+       same time. Idempotent requests are retried up to retries times, with
+       an exponential backoff, when the connection is lost, times out or
+       the server is temporarily unavailable. timeout, in seconds, applies
+       to connecting and to each read and defaults to
+       OGC_SERVER['default']['TIMEOUT']. The outcome of the requests is
+       recorded by breaker, a CircuitBreaker, if given.
+    """
+
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+    RETRY_STATUSES = (502, 503, 504)
+    RETRY_ERRORS = (socket.error, httplib.HTTPException)
+
+    def __init__(self, timeout=None, max_per_host=10, retries=3, backoff=0.5, follow_redirects=True,
+                 disable_ssl_certificate_validation=False, breaker=None):
+        self.timeout = timeout if timeout is not None else _default_timeout()
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.follow_redirects = follow_redirects
+        self.disable_ssl_certificate_validation = disable_ssl_certificate_validation
+        self.breaker = breaker
+        self._credentials = []
+        self._basic_auth = []
+        self._lock = threading.Lock()
+        self._idle = []
+        self._hosts = {}
+        # incremented when the configuration changes, the pooled
+        # instances created before are then discarded
+        self._generation = 0
+
+    def add_credentials(self, name, password, domain=""):
+        with self._lock:
+            self._credentials.append((name, password, domain))
+            self._reset()
+
+    def add_basic_auth(self, name, password, uri):
+        """Sends the credentials with every request under uri, without
+           waiting for the server to ask for them.
+        """
+        with self._lock:
+            self._basic_auth.append((name, password, uri))
+            self._reset()
+
+    def _reset(self):
+        self._idle = []
+        self._generation += 1
+
+    def _create(self):
+        http = httplib2.Http(
+            timeout=self.timeout,
+            disable_ssl_certificate_validation=self.disable_ssl_certificate_validation)
+        http.follow_redirects = self.follow_redirects
+        for name, password, domain in self._credentials:
+            http.add_credentials(name, password, domain)
+        for name, password, uri in self._basic_auth:
+            http.authorizations.append(
+                httplib2.BasicAuthentication((name, password), urlparse(uri).netloc, uri, {}, None, None, http))
+        return http
+
+    def _checkout(self):
+        with self._lock:
+            generation = self._generation
+            if self._idle:
+                return generation, self._idle.pop()
+            return generation, self._create()
+
+    def _checkin(self, generation, http):
+        with self._lock:
+            if generation == self._generation:
+                self._idle.append(http)
+
+    def _host_semaphore(self, uri):
+        netloc = urlparse(uri).netloc
+        with self._lock:
+            if netloc not in self._hosts:
+                self._hosts[netloc] = threading.BoundedSemaphore(self.max_per_host)
+            return self._hosts[netloc]
+
+    def _retryable(self, error):
+        # a refused connection means that the server is down,
+        # retrying would only delay the failure
+        return getattr(error, 'errno', None) != errno.ECONNREFUSED
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        if self.breaker is None:
+            return self._request(uri, method, body, headers, *args, **kwargs)
+        host = urlparse(uri).netloc
+        if not self.breaker.allow(host):
+            raise CircuitOpenError(host)
+        try:
+            response, content = self._request(uri, method, body, headers, *args, **kwargs)
+        except self.RETRY_ERRORS:
+            self.breaker.failure(host)
+            raise
+        if response.status in self.RETRY_STATUSES:
+            self.breaker.failure(host)
+        else:
+            self.breaker.success(host)
+        return response, content
+
+    def _request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        semaphore = self._host_semaphore(uri)
+        attempts = self.retries + 1 if method in self.IDEMPOTENT_METHODS else 1
+        for attempt in range(attempts):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            with semaphore:
+                generation, http = self._checkout()
+                try:
+                    response, content = http.request(uri, method, body, headers, *args, **kwargs)
+                except self.RETRY_ERRORS, e:
+                    # the connections of this instance may be broken,
+                    # so it does not go back to the pool
+                    if attempt == attempts - 1 or not self._retryable(e):
+                        raise
+                    logger.warn('Retrying %s %s after a connection error', method, uri, exc_info=True)
+                    continue
+                self._checkin(generation, http)
+            if response.status not in self.RETRY_STATUSES or attempt == attempts - 1:
+                return response, content
+            logger.warn('Retrying %s %s after a %d response', method, uri, response.status)
@@ -57,3 +57,10 @@ class ProxyTest(TestCase):
         c = Client()
         response = c.get('/proxy?url=%s' % self.url, follow=True)
         self.assertEqual(response.status_code, 200)
+
+    def test_proxy_client(self):
+        """The proxied requests are sent once, whatever their method, and are not tracked by a circuit breaker."""
+        from geonode.proxy.views import proxy_client
+        self.assertEqual(proxy_client.retries, 0)
+        self.assertIsNone(proxy_client.breaker)
+        self.assertFalse(proxy_client.follow_redirects)
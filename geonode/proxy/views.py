@@ -19,12 +19,15 @@
 #########################################################################
 
 from django.http import HttpResponse
-from httplib import HTTPConnection,HTTPSConnection
 from urlparse import urlsplit
-import httplib2
 from django.conf import settings
 from django.utils.http import is_safe_url
 from django.http.request import validate_host
+from geonode.ogc_client import OGCClient
+
+# redirects are reported to the client instead of being followed, and the
+# requests to arbitrary hosts are sent once, as they were before the pool
+proxy_client = OGCClient(follow_redirects=False, retries=0)
 
 def proxy(request):
     PROXY_ALLOWED_HOSTS = getattr(settings, 'PROXY_ALLOWED_HOSTS', ())
@@ -46,11 +49,6 @@ def proxy(request):
 
     raw_url = request.GET['url']
     url = urlsplit(raw_url)
-    locator = url.path
-    if url.query != "":
-        locator += '?' + url.query
-    if url.fragment != "":
-        locator += '#' + url.fragment
 
     if not settings.DEBUG:
         if not validate_host(url.hostname, PROXY_ALLOWED_HOSTS):
@@ -68,29 +66,23 @@ def proxy(request):
     if request.method in ("POST", "PUT") and "CONTENT_TYPE" in request.META:
         headers["Content-Type"] = request.META["CONTENT_TYPE"]
 
-    if url.scheme =='https':
-        conn = HTTPSConnection(url.hostname, url.port)
-    else:
-        conn = HTTPConnection(url.hostname, url.port)
-    conn.request(request.method, locator, request.raw_post_data, headers)
-
-    result = conn.getresponse()
+    result, content = proxy_client.request(raw_url, request.method, request.raw_post_data or None, headers)
 
     # If we get a redirect, let's add a useful message.
     if result.status in (301, 302, 303, 307):
          response = HttpResponse(
             ('This proxy does not support redirects. The server in "%s" '
-            'asked for a redirect to "%s"' % (url, result.getheader('Location'))),
+            'asked for a redirect to "%s"' % (url, result.get('location'))),
             status=result.status,
-            content_type=result.getheader("Content-Type", "text/plain")
+            content_type=result.get("content-type", "text/plain")
             )
 
-         response['Location']=result.getheader('Location')
+         response['Location']=result.get('location')
     else:
         response = HttpResponse(
-            result.read(),
+            content,
             status=result.status,
-            content_type=result.getheader("Content-Type", "text/plain")
+            content_type=result.get("content-type", "text/plain")
             )
 
     return response
@@ -18,24 +18,17 @@
 #########################################################################
 
 from django.conf import settings
-from django.contrib.auth.models import Permission
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.db import backend
 from django.db.models import Q
 
-from geonode.security.models import UserObjectRoleMapping, \
-    GenericObjectRoleMapping
-if "geonode.contrib.groups" in settings.INSTALLED_APPS:
-    from geonode.security.models import GroupObjectRoleMapping
-from geonode.security.enumerations import ANONYMOUS_USERS, AUTHENTICATED_USERS
+from geonode.security.models import AccessControlEntry
 from geonode.maps.models import Map
 from geonode.documents.models import Document
 from geonode.layers.models import Layer
 from geonode.people.models import Profile
 from geonode.base.models import TopicCategory, ResourceBase
-if "geonode.contrib.groups" in settings.INSTALLED_APPS:
-    from geonode.contrib.groups.models import Group
 
 from geonode.search import extension
 from geonode.search.models import filter_by_period
@@ -56,37 +49,25 @@ def _filter_results(l):
     return not any(p.search(l['name']) for p in extension.exclude_regex)
 
 
+def _security_filter(user, model, permission):
+    '''returns the Q object selecting the model objects viewable by the given
+    user. It is built for each search without any query, the entries and the
+    groups of the user are looked up by subqueries of the search itself'''
+    ct = ContentType.objects.get_for_model(model)
+    security = Q(id__in=AccessControlEntry.objects.object_ids(user, permission, ct))
+    # if the user is the owner, make sure these are included
+    if user is not None and not user.is_anonymous():
+        security = security | Q(owner=user.id)
+    return security
+
+
 def _filter_security(q, user, model, permission):
     '''apply filters to the query that remove those model objects that are
     not viewable by the given user based on row-level permissions'''
     # superusers see everything
     if user and user.is_superuser: return q
 
-    # resolve the model permission
-    ct = ContentType.objects.get_for_model(model)
-    p = Permission.objects.get(content_type=ct, codename=permission)
-
-    # apply generic role filters
-    generic_roles = [ANONYMOUS_USERS]
-    if user and not user.is_anonymous():
-        generic_roles.append(AUTHENTICATED_USERS)
-    grm = GenericObjectRoleMapping.objects.filter(object_ct=ct, role__permissions__in=[p], subject__in=generic_roles).values('object_id')
-    security = Q(id__in=grm)
-
-    # apply specific user filters
-    if user and not user.is_anonymous():
-        urm = UserObjectRoleMapping.objects.filter(object_ct=ct, role__permissions__in=[p], user=user).values('object_id')
-        security = security | Q(id__in=urm)
-        # if the user is the owner, make sure these are included
-        security = security | Q(owner=user)
-
-        if "geonode.contrib.groups" in settings.INSTALLED_APPS:
-            # apply group security
-            for group in Group.groups_for_user(user): 
-                grm = GroupObjectRoleMapping.objects.filter(object_ct=ct, role__permissions__in=[p], group=group).values('object_id')
-                security = security | Q(id__in=grm)
-
-    return q.filter(security)
+    return q.filter(_security_filter(user, model, permission))
 
 def _filter_category(q, categories):
     _categories = []
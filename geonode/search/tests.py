@@ -349,3 +349,22 @@ class searchTest(TestCase):
             [('name', 10, 1), ('title', 10, 5), ('abstract', 5, 2)])])
         assert_rules([(User, [('username', 10, 5)]),
                       (Profile, [('organization', 5, 2)])])
+
+    def test_security_filter(self):
+        from django.contrib.contenttypes.models import ContentType
+        from geonode.security.models import AccessControlEntry
+        bobby = User.objects.get(username='bobby')
+        layer_ct = ContentType.objects.get_for_model(Layer)
+        # built without any query, the entries are read by the search itself
+        with self.assertNumQueries(0):
+            security = search._security_filter(bobby, Layer, 'view_layer')
+        self.assertEquals(Layer.objects.count(), Layer.objects.filter(security).count())
+
+        # so the changes are seen right away, whichever process made them
+        layer = Layer.objects.exclude(owner=bobby)[0]
+        try:
+            AccessControlEntry.objects.filter(object_ct=layer_ct, object_id=layer.id).delete()
+            self.assertEquals(Layer.objects.count() - 1,
+                              search._filter_security(Layer.objects.all(), bobby, Layer, 'view_layer').count())
+        finally:
+            all_public()
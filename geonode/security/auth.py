@@ -22,13 +22,11 @@ from django.contrib.auth.backends import ModelBackend
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType 
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
-from geonode.security.models import GenericObjectRoleMapping, Permission, \
-    UserObjectRoleMapping
+from geonode.security.models import AccessControlEntry, Permission
 if "geonode.contrib.groups" in settings.INSTALLED_APPS:
-    from geonode.security.models import GroupObjectRoleMapping
     from geonode.contrib.groups.models import Group
-from geonode.security.enumerations import ANONYMOUS_USERS, AUTHENTICATED_USERS
 
 class GranularBackend(ModelBackend):
     """
@@ -94,38 +92,13 @@ class GranularBackend(ModelBackend):
         return key
     
         
-    def _get_generic_obj_perms(self, generic_roles, obj):
-        perms = set()
-        ct = ContentType.objects.get_for_model(obj)
-        for rm in GenericObjectRoleMapping.objects.select_related('role', 'role__permissions', 'role__permissions__content_type').filter(object_id=obj.id, object_ct=ct, subject__in=generic_roles).all():
-            for perm in rm.role.permissions.all():
-                perms.add((perm.content_type.app_label, perm.codename))
-        return perms
-
-
     def _get_all_obj_perms(self, user_obj, obj):
         """
         get all permissions for user in the context of ob (not cached)
         """
-        obj_perms = set()
-        generic_roles = [ANONYMOUS_USERS]
-        if not user_obj.is_anonymous():
-            generic_roles.append(AUTHENTICATED_USERS)        
-        obj_perms.update(self._get_generic_obj_perms(generic_roles, obj))
-        
         ct = ContentType.objects.get_for_model(obj)
-        if not user_obj.is_anonymous():
-            for rm in UserObjectRoleMapping.objects.select_related('role', 'role__permissions', 'role__permissions__content_type').filter(object_id=obj.id, object_ct=ct, user=user_obj).all():
-                for perm in rm.role.permissions.all():
-                    obj_perms.add((perm.content_type.app_label, perm.codename))
-            if "geonode.contrib.groups" in settings.INSTALLED_APPS:
-                groups = Group.groups_for_user(user_obj)
-                for group in groups:
-                    for rm in GroupObjectRoleMapping.objects.select_related('role', 'role__permissions', 'role__permissions__content_type').filter(object_id=obj.id, object_ct=ct, group=group).all():
-                        for perm in rm.role.permissions.all():
-                            obj_perms.add((perm.content_type.app_label, perm.codename))
-
-        return obj_perms
+        return set((ct.app_label, codename)
+                   for codename in AccessControlEntry.objects.codenames(user_obj, ct, obj.id))
 
     def objects_with_perm(self, acl_obj, perm, ModelType):
         """
@@ -133,37 +106,29 @@ class GranularBackend(ModelBackend):
         user or group specified has the permission 'perm' for.
         """
 
-        if not isinstance(perm, Permission):
-            perm = self._permission_for_name(perm)
+        codename = perm.codename if isinstance(perm, Permission) else perm.split('.', 1)[1]
         ct = ContentType.objects.get_for_model(ModelType)
-        
-        obj_ids = set()
-        generic_roles = [ANONYMOUS_USERS]
+
         if isinstance(acl_obj, User):
-            if not acl_obj.is_anonymous():
-                generic_roles.append(AUTHENTICATED_USERS)
-                obj_ids.update([x[0] for x in UserObjectRoleMapping.objects.filter(user=acl_obj,
-                                                                                   role__permissions=perm,
-                                                                                   object_ct=ct).values_list('object_id')])
+            principals = AccessControlEntry.objects.principals_q(acl_obj)
+        else:
+            principals = AccessControlEntry.objects.principals_q(None)
+            if "geonode.contrib.groups" in settings.INSTALLED_APPS and isinstance(acl_obj, Group):
+                principals |= Q(principal_type=AccessControlEntry.GROUP, principal_id=acl_obj.id)
+        return set(AccessControlEntry.objects.filter(principals, object_ct=ct, codename=codename)
+                   .values_list('object_id', flat=True))
 
-                if "geonode.contrib.groups" in settings.INSTALLED_APPS:
-                    # If the user is a member of any groups, see if the groups have permission to the object.
-                    for group in Group.groups_for_user(acl_obj):
-                        obj_ids.update([x[0] for x in GroupObjectRoleMapping.objects.filter(group=group,
-                                                                                            role__permissions=perm,
-                                                                                            object_ct=ct).values_list('object_id')])
+    def objects_with_perm_q(self, user_obj, perm, ModelType):
+        """
+        Q object selecting the objects of the type specified that the
+        user has the permission 'perm' for through its roles. The access
+        control entries are looked up by a subquery, so the whole selection
+        is made by the database in a single statement.
+        """
 
-        if "geonode.contrib.groups" in settings.INSTALLED_APPS:
-            if isinstance(acl_obj, Group):
-                obj_ids.update([x[0] for x in GroupObjectRoleMapping.objects.filter(group=acl_obj,
-                                                                                    role__permissions=perm,
-                                                                                    object_ct=ct).values_list('object_id')])
-           
-        obj_ids.update([x[0] for x in GenericObjectRoleMapping.objects.filter(subject__in=generic_roles, 
-                                                                              role__permissions=perm,
-                                                                              object_ct=ct).values_list('object_id')])
-    
-        return obj_ids
+        codename = perm.codename if isinstance(perm, Permission) else perm.split('.', 1)[1]
+        ct = ContentType.objects.get_for_model(ModelType)
+        return Q(id__in=AccessControlEntry.objects.object_ids(user_obj, codename, ct))
 
     def _permission_for_name(self, perm):
         ps = perm.index('.')
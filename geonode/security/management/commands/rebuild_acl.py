@@ -0,0 +1,51 @@
+#########################################################################
+#
+# Copyright (C) 2012 OpenPlans
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+from optparse import make_option
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from geonode.security.models import AccessControlEntry, invalidate_all_permissions
+
+
+class Command(BaseCommand):
+    help = 'Recreate the access control entries from the role mappings'
+    args = '[app_label.model]'
+    option_list = BaseCommand.option_list + (
+        make_option('--chunk-size', dest="chunk_size", type="int", default=1000,
+            help="Number of entries inserted at a time"),
+        )
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get('verbosity'))
+        object_ct = None
+        if args:
+            try:
+                app_label, model = args[0].split('.')
+                object_ct = ContentType.objects.get_by_natural_key(app_label, model)
+            except (ValueError, ContentType.DoesNotExist):
+                raise CommandError("Unknown content type %s" % args[0])
+        with transaction.commit_on_success():
+            count = AccessControlEntry.objects.rebuild(object_ct=object_ct, chunk_size=options.get('chunk_size'))
+        invalidate_all_permissions()
+        if verbosity > 0:
+            print "Created %d access control entries" % count
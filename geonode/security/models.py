@@ -23,11 +23,14 @@ from django.contrib.auth.models import User, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.generic import GenericForeignKey
 from django.db import models
+from django.db.models import Q
+from django.db.models import signals
+from django.core.cache import cache
 from django.utils.translation import ugettext_lazy as _
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth import login
 if "geonode.contrib.groups" in settings.INSTALLED_APPS:
-    from geonode.contrib.groups.models import Group
+    from geonode.contrib.groups.models import Group, GroupMember
 from geonode.security.enumerations import GENERIC_GROUP_NAMES
 from geonode.security.enumerations import AUTHENTICATED_USERS, ANONYMOUS_USERS
  
@@ -138,6 +141,213 @@ class GroupObjectRoleMapping(models.Model):
         pass
 
 
+def _principal_mappings(principal_type, principal_id):
+    if principal_type == AccessControlEntry.USER:
+        return UserObjectRoleMapping.objects.filter(user=principal_id)
+    if principal_type == AccessControlEntry.GROUP:
+        return GroupObjectRoleMapping.objects.filter(group=principal_id)
+    return GenericObjectRoleMapping.objects.filter(subject=principal_type)
+
+
+def _mapping_principal(mapping):
+    if isinstance(mapping, UserObjectRoleMapping):
+        return AccessControlEntry.USER, mapping.user_id
+    if isinstance(mapping, GenericObjectRoleMapping):
+        return mapping.subject, 0
+    return AccessControlEntry.GROUP, mapping.group_id
+
+
+class AccessControlEntryManager(models.Manager):
+
+    def _from_mappings(self, mappings, principal_field):
+        """
+        yields the entries granted by a queryset of role mappings,
+        principal_field is the field of the mappings with the principal.
+        """
+        rows = mappings.filter(role__permissions__isnull=False).values_list(
+            principal_field, 'object_ct', 'object_id', 'role__permissions__codename').distinct()
+        for principal, object_ct_id, object_id, codename in rows.iterator():
+            if principal_field == 'subject':
+                principal_type, principal_id = principal, 0
+            else:
+                principal_type, principal_id = principal_field, principal
+            yield self.model(principal_type=principal_type, principal_id=principal_id,
+                             object_ct_id=object_ct_id, object_id=object_id, codename=codename)
+
+    def _sources(self):
+        sources = [(UserObjectRoleMapping, self.model.USER), (GenericObjectRoleMapping, 'subject')]
+        if "geonode.contrib.groups" in settings.INSTALLED_APPS:
+            sources.append((GroupObjectRoleMapping, self.model.GROUP))
+        return sources
+
+    def sync(self, principal_type, principal_id, object_ct_id, object_id):
+        """
+        brings the entries of a principal on an object in line
+        with its role mappings.
+        """
+        mappings = _principal_mappings(principal_type, principal_id).filter(
+            object_ct=object_ct_id, object_id=object_id)
+        wanted = set(mappings.filter(role__permissions__isnull=False).values_list(
+            'role__permissions__codename', flat=True))
+        entries = self.filter(principal_type=principal_type, principal_id=principal_id,
+                              object_ct=object_ct_id, object_id=object_id)
+        existing = set(entries.values_list('codename', flat=True))
+        if existing - wanted:
+            entries.filter(codename__in=existing - wanted).delete()
+        self.bulk_create([self.model(principal_type=principal_type, principal_id=principal_id,
+                                     object_ct_id=object_ct_id, object_id=object_id, codename=codename)
+                          for codename in wanted - existing])
+
+    def rebuild(self, object_ct=None, chunk_size=1000):
+        """
+        recreates all the entries, or the ones on the objects of a
+        content type, from the role mappings. Returns their number.
+        """
+        entries = self.all()
+        if object_ct is not None:
+            entries = entries.filter(object_ct=object_ct)
+        entries.delete()
+        count = 0
+        for model, principal_field in self._sources():
+            mappings = model.objects.all()
+            if object_ct is not None:
+                mappings = mappings.filter(object_ct=object_ct)
+            chunk = []
+            for entry in self._from_mappings(mappings, principal_field):
+                chunk.append(entry)
+                if len(chunk) == chunk_size:
+                    self.bulk_create(chunk)
+                    count += len(chunk)
+                    chunk = []
+            self.bulk_create(chunk)
+            count += len(chunk)
+        return count
+
+    def principals_q(self, user):
+        """
+        Q object selecting the entries of all the principals a user acts as:
+        the generic roles, the user itself and its groups.
+        """
+        q = Q(principal_type=ANONYMOUS_USERS)
+        if user is not None and not user.is_anonymous():
+            q |= Q(principal_type=AUTHENTICATED_USERS)
+            q |= Q(principal_type=self.model.USER, principal_id=user.id)
+            if "geonode.contrib.groups" in settings.INSTALLED_APPS:
+                # looked up by a subquery, so the groups are read with the
+                # entries and are never older than them
+                q |= Q(principal_type=self.model.GROUP,
+                       principal_id__in=Group.groups_for_user(user).values('id'))
+        return q
+
+    def object_ids(self, user, codename, object_ct):
+        """
+        ids of the objects of a content type the user has the permission
+        codename for, as a values queryset usable as a subquery.
+        """
+        return self.filter(self.principals_q(user), object_ct=object_ct,
+                           codename=codename).values('object_id')
+
+    def codenames(self, user, object_ct, object_id):
+        """
+        codenames of the permissions of a user on an object.
+        """
+        return set(self.filter(self.principals_q(user), object_ct=object_ct,
+                               object_id=object_id).values_list('codename', flat=True))
+
+
+class AccessControlEntry(models.Model):
+    """
+    a permission of a principal on an object, materialized from the
+    role mappings so that the permissions are checked with a single
+    indexed lookup. The generic roles are principals of their own type,
+    named after the subject, with id 0.
+    """
+
+    USER = 'user'
+    GROUP = 'group'
+
+    objects = AccessControlEntryManager()
+
+    principal_type = models.CharField(max_length=100)
+    principal_id = models.PositiveIntegerField()
+
+    object_ct = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField(db_index=True)
+
+    codename = models.CharField(max_length=100)
+
+    def __unicode__(self):
+        return u"%s %s | %s %s -> %s" % (
+            self.principal_type,
+            self.principal_id,
+            self.object_ct,
+            self.object_id,
+            self.codename)
+
+    class Meta:
+        unique_together = (('principal_type', 'principal_id', 'object_ct', 'codename', 'object_id'), )
+
+
+class AccessControlChangeManager(models.Manager):
+
+    def record(self, object_ct_id=None, object_id=None):
+        """
+        records a change of the entries on an object, or of any of
+        them if no object is given, and prunes the changes that are
+        not kept anymore. Returns the new version.
+        """
+        version = self.create(object_ct_id=object_ct_id, object_id=object_id).id
+        self.prune(version, getattr(settings, 'PERMISSION_CHANGES_KEPT', 10000))
+        return version
+
+    def prune(self, version, kept):
+        """
+        deletes the changes older than the kept latest ones before version,
+        the clients that know them get all the entries again.
+        """
+        self.filter(id__lte=version - kept).delete()
+
+    def current(self):
+        """
+        the latest change, None if there is none.
+        """
+        changes = self.order_by('-id')[:1]
+        return changes[0] if changes else None
+
+    def current_version(self):
+        change = self.current()
+        return change.id if change is not None else 0
+
+    def changed_since(self, version, object_ct):
+        """
+        ids of the objects of a content type whose entries changed after
+        version, or None if they all may have, because of a change of the
+        roles or the groups or because the changes were not kept.
+        """
+        if version <= 0 or version > self.current_version():
+            return None
+        # older than the changes kept, see prune
+        if not self.filter(id__lte=version).exists():
+            return None
+        changes = self.filter(id__gt=version)
+        if changes.filter(object_ct__isnull=True).exists():
+            return None
+        return set(changes.filter(object_ct=object_ct).values_list('object_id', flat=True))
+
+
+class AccessControlChange(models.Model):
+    """
+    a change of the access control entries. The ids are the versions
+    of the entries, clients that know one get the changes since then.
+    """
+
+    objects = AccessControlChangeManager()
+
+    object_ct = models.ForeignKey(ContentType, null=True)
+    object_id = models.PositiveIntegerField(null=True, db_index=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+
 class PermissionLevelError(Exception):
     pass
 
@@ -372,6 +582,49 @@ class PermissionLevelMixin(object):
                 group = Group.objects.get(slug=group)
                 self.set_group_level(group, level)
 
+def invalidate_object_permissions(object_ct_id, object_id):
+    """Discards the cached permissions of everybody on an object.
+    """
+    AccessControlChange.objects.record(object_ct_id, object_id)
+
+
+def invalidate_all_permissions():
+    AccessControlChange.objects.record()
+
+
+def role_mapping_changed(instance, sender, **kwargs):
+    principal_type, principal_id = _mapping_principal(instance)
+    AccessControlEntry.objects.sync(principal_type, principal_id, instance.object_ct_id, instance.object_id)
+    invalidate_object_permissions(instance.object_ct_id, instance.object_id)
+
+
+def role_permissions_changed(instance, sender, **kwargs):
+    action = kwargs.get('action')
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if kwargs.get('reverse'):
+            AccessControlEntry.objects.rebuild()
+        else:
+            AccessControlEntry.objects.rebuild(object_ct=instance.content_type_id)
+    invalidate_all_permissions()
+
+
+def groups_changed(instance, sender, **kwargs):
+    invalidate_all_permissions()
+
+
+for mapping in (UserObjectRoleMapping, GenericObjectRoleMapping):
+    signals.post_save.connect(role_mapping_changed, sender=mapping)
+    signals.post_delete.connect(role_mapping_changed, sender=mapping)
+signals.m2m_changed.connect(role_permissions_changed, sender=ObjectRole.permissions.through)
+signals.post_delete.connect(role_permissions_changed, sender=ObjectRole)
+if "geonode.contrib.groups" in settings.INSTALLED_APPS:
+    signals.post_save.connect(role_mapping_changed, sender=GroupObjectRoleMapping)
+    signals.post_delete.connect(role_mapping_changed, sender=GroupObjectRoleMapping)
+    # the groups of a user depend on the memberships and on the access of the groups
+    for model in (Group, GroupMember):
+        signals.post_save.connect(groups_changed, sender=model)
+        signals.post_delete.connect(groups_changed, sender=model)
+
 # Logic to login a user automatically when it has successfully
 # activated an account:
 def autologin(sender, **kwargs):
@@ -1,4 +1,5 @@
-from django.contrib.auth.models import User, AnonymousUser
+from django.contrib.auth.models import User, AnonymousUser, Permission
+from django.contrib.contenttypes.models import ContentType
 from django.core.urlresolvers import reverse
 from django.http import HttpRequest
 from django.test import TestCase
@@ -67,3 +68,120 @@ class SecurityTest(TestCase):
             request.path = path
             response = middleware.process_request(request)
             self.assertIsNone(response)
+
+    def test_object_permissions(self):
+        """
+        Tests that the permissions on an object are read from its access control entries with a single query.
+        """
+        from geonode.security.auth import GranularBackend
+        from geonode.security.models import ObjectRole, UserObjectRoleMapping, GenericObjectRoleMapping, \
+            AccessControlEntry
+        from geonode.security.enumerations import ANONYMOUS_USERS
+
+        backend = GranularBackend()
+        user = User.objects.create(username='norman')
+        other = User.objects.create(username='other')
+        ct = ContentType.objects.get_for_model(User)
+        role = ObjectRole.objects.create(title='Editor', codename='test_editor', content_type=ct, list_order=0)
+        role.permissions.add(Permission.objects.get(content_type=ct, codename='change_user'))
+
+        def has_perm(user):
+            # the permissions are kept on the user object, as long as it lives
+            user = User.objects.get(id=user.id) if user.id else AnonymousUser()
+            return backend.has_perm(user, 'auth.change_user', other)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_all_permissions(user, other), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_all_permissions(user, other), [])
+
+        UserObjectRoleMapping.objects.create(user=user, object=other, role=role)
+        self.assertTrue(has_perm(user))
+        UserObjectRoleMapping.objects.filter(user=user).delete()
+        self.assertFalse(has_perm(user))
+
+        # whichever process wrote the entries
+        AccessControlEntry.objects.create(principal_type=AccessControlEntry.USER, principal_id=user.id,
+                                          object_ct=ct, object_id=other.id, codename='change_user')
+        self.assertTrue(has_perm(user))
+        AccessControlEntry.objects.filter(principal_id=user.id).delete()
+        self.assertFalse(has_perm(user))
+
+        self.assertFalse(has_perm(AnonymousUser()))
+        GenericObjectRoleMapping.objects.create(subject=ANONYMOUS_USERS, object=other, role=role)
+        self.assertTrue(has_perm(AnonymousUser()))
+        self.assertTrue(has_perm(user))
+
+        # the roles are shared by all the objects
+        role.permissions.clear()
+        self.assertFalse(has_perm(AnonymousUser()))
+
+    def test_access_control_changes(self):
+        """
+        Tests that the changes of the entries are pruned and that the versions older than them are refused.
+        """
+        from geonode.security.models import AccessControlChange
+
+        ct = ContentType.objects.get_for_model(User)
+        first = AccessControlChange.objects.record(ct.id, 1)
+        second = AccessControlChange.objects.record(ct.id, 2)
+        third = AccessControlChange.objects.record(ct.id, 3)
+        self.assertEqual(AccessControlChange.objects.changed_since(first, ct), set([2, 3]))
+
+        AccessControlChange.objects.prune(third, 2)
+        self.assertFalse(AccessControlChange.objects.filter(id=first).exists())
+        self.assertEqual(AccessControlChange.objects.changed_since(first, ct), None)
+        self.assertEqual(AccessControlChange.objects.changed_since(second, ct), set([3]))
+
+        with self.settings(PERMISSION_CHANGES_KEPT=1):
+            AccessControlChange.objects.record()
+        self.assertEqual(AccessControlChange.objects.count(), 1)
+        self.assertEqual(AccessControlChange.objects.changed_since(third, ct), None)
+
+    def test_access_control_entries(self):
+        """
+        Tests that the access control entries follow the role mappings and can be rebuilt.
+        """
+        from django.core.management import call_command
+        from geonode.security.models import ObjectRole, AccessControlEntry, \
+            UserObjectRoleMapping, GenericObjectRoleMapping
+        from geonode.security.auth import GranularBackend
+        from geonode.security.enumerations import AUTHENTICATED_USERS
+
+        backend = GranularBackend()
+        user = User.objects.create(username='norman')
+        other = User.objects.create(username='other')
+        ct = ContentType.objects.get_for_model(User)
+        reader = ObjectRole.objects.create(title='Reader', codename='test_reader', content_type=ct, list_order=0)
+        reader.permissions.add(Permission.objects.get(content_type=ct, codename='change_user'))
+        admin = ObjectRole.objects.create(title='Admin', codename='test_admin', content_type=ct, list_order=1)
+        admin.permissions.add(*Permission.objects.filter(content_type=ct, codename__in=['change_user', 'delete_user']))
+
+        def entries():
+            return set(AccessControlEntry.objects.filter(object_ct=ct).values_list(
+                'principal_type', 'principal_id', 'object_id', 'codename'))
+
+        UserObjectRoleMapping.objects.create(user=user, object=other, role=admin)
+        GenericObjectRoleMapping.objects.create(subject=AUTHENTICATED_USERS, object=user, role=reader)
+        expected = set([
+            ('user', user.id, other.id, 'change_user'),
+            ('user', user.id, other.id, 'delete_user'),
+            (AUTHENTICATED_USERS, 0, user.id, 'change_user'),
+        ])
+        self.assertEqual(entries(), expected)
+        self.assertEqual(backend.objects_with_perm(other, 'auth.change_user', User), set([user.id]))
+        self.assertEqual(backend.objects_with_perm(user, 'auth.delete_user', User), set([other.id]))
+        self.assertEqual(backend.objects_with_perm(AnonymousUser(), 'auth.change_user', User), set())
+
+        UserObjectRoleMapping.objects.create(user=user, object=other, role=reader)
+        UserObjectRoleMapping.objects.filter(user=user, role=admin).delete()
+        expected.remove(('user', user.id, other.id, 'delete_user'))
+        self.assertEqual(entries(), expected)
+
+        AccessControlEntry.objects.all().delete()
+        call_command('rebuild_acl', verbosity=0)
+        self.assertEqual(entries(), expected)
+
+        # the roles apply to all the objects
+        reader.permissions.clear()
+        self.assertEqual(entries(), set())
@@ -307,6 +307,8 @@ MIDDLEWARE_CLASSES = (
     'pagination.middleware.PaginationMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Memoizes the GeoServer REST requests made while handling a request
+    'geonode.geoserver.middleware.CatalogCacheMiddleware',
     # This middleware allows to print private layers for the users that have 
     # the permissions to view them.
     # It sets temporary the involved layers as public before restoring the permissions.
@@ -319,6 +321,14 @@ MIDDLEWARE_CLASSES = (
 # permissions per object.
 AUTHENTICATION_BACKENDS = ('geonode.security.auth.GranularBackend',)
 
+# number of seconds the layer_acls listings are cached, under the version of
+# the access control entries; they are only shared by the processes when
+# CACHES is a shared backend, e.g. memcached
+PERMISSION_CACHE_TIMEOUT = 600
+# number of changes of the access control entries kept, the clients of
+# layer_acls that know an older version get all the entries again
+PERMISSION_CHANGES_KEPT = 10000
+
 def get_user_url(u):
     return u.profile.get_absolute_url()
 
@@ -398,6 +408,10 @@ MODIFY_TOPICCATEGORY = False
 
 MISSING_THUMBNAIL = 'geonode/img/missing_thumb.png'
 
+# Smaller versions of the thumbnails, as (width, height), stored in
+# PNG and, if PIL supports it, WebP together with the thumbnails
+THUMBNAIL_SIZES = ((100, 75), (60, 45))
+
 # Search Snippet Cache Time in Seconds
 CACHE_TIME=0
 
@@ -422,10 +436,32 @@ OGC_SERVER = {
         'WPS_ENABLED' : True,
         # Set to name of database in DATABASES dictionary to enable
         'DATASTORE': '', #'datastore',
-        'TIMEOUT': 10  # number of seconds to allow for HTTP requests
+        'TIMEOUT': 10,  # number of seconds to allow for HTTP requests
+        # number of seconds the GeoServer REST responses are cached across
+        # requests, only when CACHES is a shared backend, e.g. memcached,
+        # otherwise the other processes would not see the invalidations
+        'CATALOG_CACHE_TIMEOUT': 30,
+        # number of seconds the parsed WMS capabilities are kept
+        'CAPABILITIES_CACHE_TIMEOUT': 300,
+        # after this many failed requests GeoServer is considered down and
+        # the requests fail right away for the number of seconds of the
+        # cool down, then one request is tried again; the processes only
+        # share this state when CACHES is a shared backend, e.g. memcached
+        'CIRCUIT_BREAKER_THRESHOLD': 5,
+        'CIRCUIT_BREAKER_COOLDOWN': 30,
+        # number of seconds the list of the stores of each workspace is kept,
+        # only when CACHES is a shared backend, e.g. memcached
+        'STORES_CACHE_TIMEOUT': 300,
+        # largest number of threads an updatelayers request may use
+        'MAX_SLURP_WORKERS': 10
     }
 }
 
+# Attribute statistics of layers with more features than this are
+# approximated with sketches (distinct count, quantiles, top values)
+# built in a single pass, set to None to always compute exact ones
+LAYER_ATTRIBUTE_SKETCH_THRESHOLD = 1000000
+
 # Uploader Settings
 UPLOADER = {
     'BACKEND' : 'geonode.rest',
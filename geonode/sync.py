@@ -0,0 +1,105 @@
+#########################################################################
+#
+# Copyright (C) 2012 OpenPlans
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+"""Coalescing of the synchronization of the resources with the OGC server
+and the catalogue.
+
+The post save handlers that push a resource to GeoServer or the catalogue
+are wrapped by deferred_handler. Inside defer_sync, used like
+transaction.commit_on_success on the views that save several resources or
+the same one several times, their calls are collected and each handler runs
+once per resource, with its last saved version, when the outermost
+defer_sync exits without an error. Elsewhere they run right away.
+"""
+
+import sys
+import logging
+import threading
+
+from functools import wraps
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+def _pending():
+    return getattr(_state, 'pending', None)
+
+
+def run_pending(pending):
+    """Runs the collected handlers, all of them even if some fail. The
+       first error is raised afterwards.
+    """
+    exc_info = None
+    for (handler, sender, pk), (instance, kwargs) in pending.iteritems():
+        try:
+            handler(instance=instance, sender=sender, **kwargs)
+        except Exception:
+            logger.exception('Could not synchronize %s', instance)
+            if exc_info is None:
+                exc_info = sys.exc_info()
+    if exc_info is not None:
+        raise exc_info[0], exc_info[1], exc_info[2]
+
+
+class defer_sync(object):
+    """Context manager, or decorator, that defers the deferred handlers
+       until it exits. Nested uses share the same handlers, which are
+       dropped if it exits with an error.
+    """
+
+    def __enter__(self):
+        if getattr(_state, 'depth', 0) == 0:
+            _state.pending = OrderedDict()
+        _state.depth = getattr(_state, 'depth', 0) + 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _state.depth -= 1
+        if _state.depth > 0:
+            return
+        pending, _state.pending = _state.pending, None
+        if exc_type is None:
+            # the saves made by the handlers are synchronized right away
+            run_pending(pending)
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with defer_sync():
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def deferred_handler(handler):
+    """Wraps a post_save handler so that its calls inside defer_sync are
+       collected, one per saved object.
+    """
+    @wraps(handler)
+    def wrapper(instance, sender, **kwargs):
+        pending = _pending()
+        if pending is None or kwargs.get('raw', False):
+            return handler(instance=instance, sender=sender, **kwargs)
+        key = (handler, sender, instance.pk)
+        if key in pending:
+            kwargs['created'] = kwargs.get('created', False) or pending[key][1].get('created', False)
+        pending[key] = (instance, kwargs)
+    return wrapper
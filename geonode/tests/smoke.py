@@ -19,12 +19,18 @@
 
 import os
 import math
+import time
+import errno
+import socket
 from django.test.client import Client
 from django.test import TestCase
 from django.core.urlresolvers import reverse
 
 from geonode import GeoNodeException
 from geonode.utils import forward_mercator, inverse_mercator
+from geonode.ogc_client import OGCClient
+from geonode.tests.utils import FakeHttp
+from geonode.sync import defer_sync, deferred_handler
 
 class GeoNodeSmokeTests(TestCase):
 
@@ -212,6 +218,99 @@ class GeoNodeUtilsTests(TestCase):
         self.assertAlmostEqual(sw[0], -180.0, msg="SW lon is correct")
         self.assertAlmostEqual(sw[1], -90.0, msg="SW lat is correct")
 
+    def test_ogc_client(self):
+        """Verify that the OGC client retries idempotent requests and reuses its connections
+        """
+        def respond(uri, method, body, headers):
+            outcome = outcomes.pop(0)
+            return outcome if isinstance(outcome, Exception) else (outcome, 'content')
+
+        outcomes = [socket.error('refused'), 503, 200, 503]
+        created = []
+        client = OGCClient(retries=2, backoff=0)
+
+        def create():
+            created.append(FakeHttp(respond))
+            return created[-1]
+        client._create = create
+
+        response, content = client.request('http://localhost:8080/geoserver/ows')
+        self.assertEquals(response.status, 200)
+        self.assertEquals(content, 'content')
+        # the instance that failed to connect was discarded
+        self.assertEquals(len(created), 2)
+
+        response, content = client.request('http://localhost:8080/geoserver/ows', 'POST', 'body')
+        self.assertEquals(response.status, 503)
+        self.assertEquals(len(created), 2)
+        self.assertEquals(outcomes, [])
+
+    def test_circuit_breaker(self):
+        """Verify that the requests fail fast while the circuit of a host is open
+        """
+        from django.core.cache import cache
+        from geonode.ogc_client import CircuitBreaker, CircuitOpenError
+
+        status = [503]
+        http = FakeHttp(lambda uri, method, body, headers: (status[0], 'content'))
+        breaker = CircuitBreaker(threshold=2, cooldown=30)
+        client = OGCClient(retries=0, backoff=0, breaker=breaker)
+        client._create = lambda: http
+        url = 'http://breaker.example.com/geoserver/ows'
+        host = 'breaker.example.com'
+
+        client.request(url)
+        self.assertEquals(breaker.state(host)['state'], CircuitBreaker.CLOSED)
+        client.request(url)
+        self.assertEquals(breaker.state(host)['state'], CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError) as cm:
+            client.request(url)
+        self.assertEquals(cm.exception.errno, errno.ECONNREFUSED)
+        self.assertEquals(len(http.requests), 2)
+
+        # once the cool down is over a single request probes the server
+        cache.set(breaker._key('opened', host), time.time() - 60)
+        self.assertEquals(breaker.state(host)['state'], CircuitBreaker.HALF_OPEN)
+        status[0] = 200
+        self.assertTrue(breaker.allow(host))
+        self.assertFalse(breaker.allow(host))
+        cache.delete(breaker._key('probe', host))
+        client.request(url)
+        self.assertEquals(breaker.state(host), {'state': CircuitBreaker.CLOSED, 'failures': 0, 'opened': None})
+
+    def test_defer_sync(self):
+        """Verify that the deferred handlers run once per object when defer_sync exits
+        """
+        class Saved(object):
+            def __init__(self, pk, version):
+                self.pk = pk
+                self.version = version
+
+        calls = []
+
+        @deferred_handler
+        def handler(instance, sender, **kwargs):
+            calls.append((instance.pk, instance.version, kwargs.get('created')))
+
+        handler(instance=Saved(1, 1), sender=Saved, created=True)
+        self.assertEquals(calls, [(1, 1, True)])
+
+        with defer_sync():
+            handler(instance=Saved(1, 1), sender=Saved, created=True)
+            with defer_sync():
+                handler(instance=Saved(2, 1), sender=Saved, created=False)
+            handler(instance=Saved(1, 2), sender=Saved, created=False)
+            self.assertEquals(len(calls), 1)
+        self.assertEquals(calls[1:], [(1, 2, True), (2, 1, False)])
+
+        try:
+            with defer_sync():
+                handler(instance=Saved(3, 1), sender=Saved, created=True)
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEquals(len(calls), 3)
+
     def test_split_query(self):
         query = 'alpha "beta gamma"   delta  '
         from geonode.utils import _split_query 
@@ -19,6 +19,11 @@
 
 import urllib, urllib2, cookielib
 import contextlib
+from xml.etree.ElementTree import fromstring
+
+import httplib2
+from geoserver.catalog import FailedRequestError
+
 from geonode.maps.models import Layer
 
 def get_web_page(url, username=None, password=None, login_url=None):
@@ -82,3 +87,113 @@ def check_layer(uploaded):
     assert type(uploaded) is Layer, msg
     msg = ('The layer does not have a valid name: %s' % uploaded.name)
     assert len(uploaded.name) > 0, msg
+
+
+class FakeHttp(object):
+    """Stands for an httplib2.Http in the tests. The requests are recorded as
+    (method, uri, body, headers) and answered by respond, which returns the
+    status and the content of the response, and optionally its headers, or
+    an exception to raise.
+    """
+
+    def __init__(self, respond=None):
+        self.requests = []
+        if respond is not None:
+            self.respond = respond
+
+    def respond(self, uri, method, body, headers):
+        return 200, ''
+
+    def request(self, uri, method="GET", body=None, headers=None):
+        self.requests.append((method, uri, body, headers))
+        outcome = self.respond(uri, method, body, headers)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = dict(outcome[2] if len(outcome) > 2 else {}, status=str(outcome[0]))
+        return httplib2.Response(response), outcome[1]
+
+
+class FakeWorkspace(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeStore(object):
+    """A store of a FakeCatalog. Its type is only known once it is fetched,
+    fetching it raises error if there is one.
+    """
+
+    def __init__(self, name, type='Shapefile', resource_type='dataStore', error=None, **connection_parameters):
+        self.name = self.href = name
+        self.type = type
+        self.resource_type = resource_type
+        self.error = error
+        self.connection_parameters = connection_parameters
+        self.dom = None
+        self.fetches = 0
+
+    def fetch(self):
+        self.fetches += 1
+        if self.error is not None:
+            raise self.error
+        self.dom = fromstring('<%s><type>%s</type></%s>' % (self.resource_type, self.type, self.resource_type))
+
+
+class FakeResource(object):
+    """A resource of a FakeCatalog, with any other attribute given.
+    """
+
+    def __init__(self, name, store=None, workspace=None, **attributes):
+        self.name = name
+        self.store = store
+        self.workspace = workspace
+        self.__dict__.update(attributes)
+
+
+class FakeLayer(object):
+
+    def __init__(self, name, styles=(), default_style=None):
+        self.name = name
+        self.styles = list(styles)
+        self.default_style = default_style
+
+
+class FakeCatalog(object):
+    """Stands for a gsconfig Catalog in the tests. Looking up the resources
+    named in errors raises a FailedRequestError, as does deleting the ones
+    named in failures. The deleted objects are recorded by name.
+    """
+
+    def __init__(self, resources=(), stores=(), errors=(), failures=()):
+        self.resources = dict((resource.name, resource) for resource in resources)
+        self.stores = list(stores)
+        self.errors = set(errors)
+        self.failures = set(failures)
+        self.deleted = []
+        self.reloads = 0
+
+    def get_workspace(self, name):
+        return FakeWorkspace(name)
+
+    def get_resource(self, name, workspace=None):
+        if name in self.errors:
+            raise FailedRequestError(name)
+        return self.resources.get(name)
+
+    def get_resources(self, store=None, workspace=None):
+        return self.resources.values()
+
+    def get_layer(self, name):
+        return FakeLayer(name) if name in self.resources else None
+
+    def get_stores(self, workspace=None):
+        return self.stores
+
+    def delete(self, obj, purge=False, recurse=False):
+        if isinstance(obj, FakeResource) and obj.name in self.failures:
+            raise FailedRequestError(obj.name)
+        self.deleted.append(getattr(obj, 'name', obj))
+
+    def reload(self):
+        self.reloads += 1
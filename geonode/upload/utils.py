@@ -24,6 +24,7 @@ from geonode.layers.models import Layer
 from geonode.upload.files import _clean_string, SpatialFiles
 from geoserver.catalog import FailedRequestError
 from geonode.geoserver.helpers import ogc_server_settings, gs_catalog, gs_uploader
+from geonode.geoserver.helpers import invalidate_stores
 from zipfile import ZipFile
 
 logger = logging.getLogger(__name__)
@@ -155,6 +156,7 @@ def create_geoserver_db_featurestore(store_type=None, store_name=None):
                 branch="master",
                 create="true")
             cat.save(ds)
+            invalidate_stores()
             ds = cat.get_store(store_name)
         else:
             logging.info(
@@ -169,6 +171,7 @@ def create_geoserver_db_featurestore(store_type=None, store_name=None):
                 passwd=db['PASSWORD'],
                 dbtype=store_type)
             cat.save(ds)
+            invalidate_stores()
             ds = cat.get_store(dsname)
 
     return ds
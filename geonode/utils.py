@@ -17,7 +17,6 @@
 #
 #########################################################################
 
-import httplib2
 import base64
 import re
 import math
@@ -32,12 +31,13 @@ from django.shortcuts import get_object_or_404
 from django.utils import simplejson as json
 from django.http import HttpResponse
 from geonode.security.enumerations import AUTHENTICATED_USERS, ANONYMOUS_USERS, INVALID_PERMISSION_MESSAGE
+from geonode.ogc_client import OGCClient
 from urlparse import urlsplit
 
 DEFAULT_TITLE=""
 DEFAULT_ABSTRACT=""
 
-http_client = httplib2.Http()
+http_client = OGCClient()
 
 def _get_basic_auth_info(request):
     """
@@ -115,41 +115,6 @@ def batch_permissions(request):
     """
     pass
 
-def batch_delete(request):
-    """
-    if not request.user.is_authenticated:
-        return HttpResponse("You must log in to delete layers", status=401)
-
-    if request.method != "POST":
-        return HttpResponse("Delete API requires POST requests", status=405)
-
-    spec = json.loads(request.raw_post_data)
-
-    if "layers" in spec:
-        lyrs = Layer.objects.filter(pk__in = spec['layers'])
-        for lyr in lyrs:
-            if not request.user.has_perm("maps.delete_layer", obj=lyr):
-                return HttpResponse("User not authorized to delete layer", status=403)
-
-    if "maps" in spec:
-        map_query = Map.objects.filter(pk__in = spec['maps'])
-        for m in map_query:
-            if not request.user.has_perm("maps.delete_map", obj=m):
-                return HttpResponse("User not authorized to delete map", status=403)
-
-    if "layers" in spec:
-        Layer.objects.filter(pk__in = spec["layers"]).delete()
-
-    if "maps" in spec:
-        Map.objects.filter(pk__in = spec["maps"]).delete()
-
-    nlayers = len(spec.get('layers', []))
-    nmaps = len(spec.get('maps', []))
-
-    return HttpResponse("Deleted %d layers and %d maps" % (nlayers, nmaps))
-    """
-    pass
-
 def _handle_perms_edit(request, obj):
     errors = []
     params = request.POST
@@ -17,11 +17,16 @@
 #
 #########################################################################
 
+import os
+
 from django import forms
 from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.models import User
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, Http404
+from django.core.files.storage import default_storage
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import etag
 from django.core.urlresolvers import reverse
 from django.utils import simplejson as json
 from django.db.models import Q
@@ -109,3 +114,21 @@ def ajax_lookup(request):
 
 def err403(request):
     return HttpResponseRedirect(reverse('account_login') + '?next=' + request.get_full_path())
+
+
+# the thumbnail files are named after their content, they never change
+THUMBNAIL_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@etag(lambda request, name: os.path.splitext(name)[0])
+def thumbnail(request, name):
+    """Serves a thumbnail file with the headers to cache it forever.
+    """
+    path = 'thumbs/' + name
+    if not default_storage.exists(path):
+        raise Http404
+    content_type = 'image/webp' if name.endswith('.webp') else 'image/png'
+    with default_storage.open(path) as f:
+        response = HttpResponse(f.read(), content_type=content_type)
+    patch_cache_control(response, public=True, max_age=THUMBNAIL_MAX_AGE)
+    return response